@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Todoist API endpoints this skill uses.
+
+Serves, over plain HTTP:
+  POST /api/v1/sync                  full and incremental reads; item_add,
+                                     item_close and item_update/item_move commands
+  GET  /api/v1/tasks/filter          paginated filter results
+  GET  /api/v1/tasks                 paginated active tasks
+  GET  /api/v1/tasks/completed/by_completion_date
+                                     paginated completed tasks in a time range
+  POST /api/v1/tasks                 add a task
+  POST /api/v1/tasks/{id}/close      complete a task
+  GET  /api/v1/projects              paginated projects
+
+Point the skill at it with TODOIST_API_BASE_URL=http://127.0.0.1:PORT and
+any TODOIST_API_TOKEN. Filter queries the skill's local evaluator supports
+are evaluated the same way here; anything else matches every active task.
+
+Usage:
+  python benchmarks/fake_todoist.py --tasks 10000 --latency 0.05 --port 8765
+  python benchmarks/fake_todoist.py --tasks 1000 --rate-limit-every 20 --retry-after 1
+
+Standard library plus the skill's own src/ package (for filter evaluation).
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+_SRC = Path(__file__).resolve().parent.parent / "src"
+if str(_SRC) not in sys.path:
+    sys.path.insert(0, str(_SRC))
+
+from todoist_mcp.dates import resolve_date  # noqa: E402
+from todoist_mcp.filters import FilterContext, build_predicate, compile_filter  # noqa: E402
+from todoist_mcp.projects import ProjectIndex  # noqa: E402
+
+TIMESTAMP = "2026-01-01T00:00:00.000000Z"
+PROJECT_NAMES = ["Work", "Home", "Errands", "Health", "Finance", "Side project", "Reading", "Travel"]
+LABELS = ["nanobot", "waiting", "quick", "deep-work", "phone"]
+RECURRING = ["every day", "every monday", "every weekday", "every month"]
+
+
+def make_dataset(tasks: int, seed: int = 1, today: Optional[date] = None) -> dict:
+    """
+    Build a deterministic account: projects (some nested), labels and tasks.
+
+    Due dates spread from 30 days ago to 30 days ahead; about 20% of tasks
+    have no due date, 10% are recurring and 10% have a time of day.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.now(timezone.utc).date()
+    projects = [{"id": "inbox", "name": "Inbox", "inbox_project": True, "child_order": 0,
+                 "parent_id": None, "is_archived": False, "is_deleted": False}]
+    project_count = min(max(len(PROJECT_NAMES), tasks // 500), 300)
+    for i in range(project_count):
+        base = PROJECT_NAMES[i % len(PROJECT_NAMES)]
+        name = base if i < len(PROJECT_NAMES) else f"{base} {i // len(PROJECT_NAMES)}"
+        parent = projects[1 + rng.randrange(i)]["id"] if i >= len(PROJECT_NAMES) and rng.random() < 0.3 else None
+        projects.append({"id": f"p{i}", "name": name, "child_order": i + 1, "parent_id": parent,
+                         "inbox_project": False, "is_archived": False, "is_deleted": False})
+    labels = [{"id": f"l{i}", "name": name, "is_deleted": False} for i, name in enumerate(LABELS)]
+
+    items = {}
+    for i in range(tasks):
+        task_id = f"t{i}"
+        due = None
+        roll = rng.random()
+        if roll >= 0.2:
+            day = today + timedelta(days=rng.randint(-30, 30))
+            due = {"date": day.isoformat(), "string": day.isoformat(), "lang": "en",
+                   "is_recurring": False, "timezone": None}
+            if roll >= 0.9:
+                due["is_recurring"] = True
+                due["string"] = rng.choice(RECURRING)
+            elif roll >= 0.8:
+                due["date"] = f"{day.isoformat()}T{rng.randint(7, 20):02d}:00:00"
+        items[task_id] = _item(
+            task_id,
+            content=f"Task {i}: {rng.choice(['Call', 'Email', 'Buy', 'Review', 'Plan', 'Fix'])} "
+                    f"{rng.choice(['report', 'groceries', 'dentist', 'invoice', 'slides', 'bike'])}",
+            project_id=rng.choice(projects)["id"],
+            priority=rng.choice([1, 1, 1, 2, 3, 4]),
+            labels=rng.sample(LABELS, rng.randint(0, 2)),
+            due=due,
+            child_order=i,
+        )
+    return {"projects": projects, "labels": labels, "items": items}
+
+
+def _resolve_due(due: Optional[dict]) -> Optional[dict]:
+    """Give a due string a date, as Todoist does (unknown phrases: today)."""
+    if not due:
+        return due
+    if "date" in due:
+        return {"string": due["date"], "lang": "en", "is_recurring": False,
+                "timezone": None, **due}
+    today = datetime.now(timezone.utc).date()
+    day = resolve_date(due["string"], today) or today
+    return {"date": day.isoformat(), "string": due["string"], "lang": "en",
+            "is_recurring": due["string"].startswith("every"), "timezone": None}
+
+
+def _item(task_id: str, **fields) -> dict:
+    item = {
+        "id": task_id, "content": "", "description": "", "project_id": "inbox",
+        "section_id": None, "parent_id": None, "labels": [], "priority": 1, "due": None,
+        "deadline": None, "duration": None, "collapsed": False, "child_order": 0,
+        "responsible_uid": None, "assigned_by_uid": None, "completed_at": None,
+        "added_by_uid": "u1", "added_at": TIMESTAMP, "updated_at": TIMESTAMP,
+        "checked": False, "is_deleted": False,
+    }
+    item.update(fields)
+    return item
+
+
+class FakeTodoist:
+    """
+    In-memory Todoist account plus fault injection.
+
+    Args:
+        dataset: Output of make_dataset().
+        latency: Seconds added to every response.
+        jitter: Extra uniformly random latency, in seconds.
+        page_size: Largest page the paginated endpoints return.
+        rate_limit_every: Answer every Nth request with 429 (0 = never).
+        retry_after: Retry-After seconds sent with injected 429s.
+    """
+
+    def __init__(
+        self,
+        dataset: dict,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        page_size: int = 200,
+        rate_limit_every: int = 0,
+        retry_after: float = 1.0,
+    ) -> None:
+        self.projects = {p["id"]: p for p in dataset["projects"]}
+        self.labels = {lb["id"]: lb for lb in dataset["labels"]}
+        self.items = dataset["items"]
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.lock = threading.RLock()
+        self.version = 1
+        self.changed: dict[str, int] = {}  # item id -> version of last change
+        self.completed: dict[str, dict] = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.seen_uuids: set[str] = set()
+        self._next_id = 0
+        self._index = ProjectIndex(self.projects)
+
+    # -- fault injection -------------------------------------------------
+
+    def admit(self) -> Optional[float]:
+        """Count a request; return a Retry-After value if it must get a 429."""
+        with self.lock:
+            self.requests += 1
+            limited = self.rate_limit_every and self.requests % self.rate_limit_every == 0
+            if limited:
+                self.rate_limited += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        return self.retry_after if limited else None
+
+    # -- state -----------------------------------------------------------
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return f"n{self._next_id}"
+
+    def _touch(self, task_id: str) -> None:
+        self.version += 1
+        self.changed[task_id] = self.version
+
+    def add(self, args: dict) -> dict:
+        due = args.get("due")
+        if "due_string" in args:
+            due = {"string": args["due_string"]}
+        elif "due_date" in args or "due_datetime" in args:
+            due = {"date": args.get("due_datetime") or args["due_date"]}
+        due = _resolve_due(due)
+        with self.lock:
+            task_id = self._new_id()
+            self.items[task_id] = _item(
+                task_id,
+                content=args["content"],
+                description=args.get("description", ""),
+                project_id=args.get("project_id") or "inbox",
+                priority=int(args.get("priority") or 1),
+                labels=list(args.get("labels") or []),
+                due=due,
+                child_order=len(self.items),
+            )
+            self._touch(task_id)
+            return self.items[task_id]
+
+    def close(self, task_id: str) -> bool:
+        with self.lock:
+            item = self.items.get(task_id)
+            if item is None or item["checked"]:
+                return False
+            item["checked"] = True
+            item["completed_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            self.completed[task_id] = item
+            self._touch(task_id)
+            return True
+
+    def update(self, task_id: str, args: dict) -> bool:
+        with self.lock:
+            item = self.items.get(task_id)
+            if item is None or item["checked"]:
+                return False
+            for key, value in args.items():
+                if key == "due":
+                    value = _resolve_due(value)
+                if key != "id":
+                    item[key] = value
+            self._touch(task_id)
+            return True
+
+    def active(self) -> list[dict]:
+        return [t for t in self.items.values() if not t["checked"]]
+
+    def completed_between(self, since: str, until: str) -> list[dict]:
+        def moment(raw: str) -> datetime:
+            return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+
+        start, end = moment(since), moment(until)
+        with self.lock:
+            return [t for t in self.completed.values() if start <= moment(t["completed_at"]) <= end]
+
+    def matching(self, query: Optional[str]) -> list[dict]:
+        tasks = self.active()
+        node = compile_filter(query) if query else None
+        if node is None:
+            return tasks
+        ctx = FilterContext(
+            now=datetime.now(timezone.utc),
+            projects=self.projects,
+            projects_by_name=self._index.by_name,
+        )
+        predicate = build_predicate(node, ctx)
+        return [t for t in tasks if predicate(t)]
+
+    # -- Sync API ---------------------------------------------------------
+
+    def sync(self, form: dict) -> dict:
+        if "commands" in form:
+            return self._commands(json.loads(form["commands"]))
+        token = form.get("sync_token", "*")
+        with self.lock:
+            if token == "*":
+                items = [t for t in self.items.values() if not t["checked"]]
+                response = {
+                    "full_sync": True,
+                    "items": items,
+                    "projects": list(self.projects.values()),
+                    "sections": [],
+                    "labels": list(self.labels.values()),
+                }
+            else:
+                since = int(token)
+                response = {
+                    "full_sync": False,
+                    "items": [self.items[i] for i, v in self.changed.items() if v > since],
+                    "projects": [], "sections": [], "labels": [],
+                }
+            response["user"] = {"id": "u1", "tz_info": {"timezone": "UTC"}}
+            response["sync_token"] = str(self.version)
+            return response
+
+    def _commands(self, commands: list[dict]) -> dict:
+        with self.lock:
+            return self._apply(commands)
+
+    def _apply(self, commands: list[dict]) -> dict:
+        statuses, temp_ids = {}, {}
+        for cmd in commands:
+            if cmd["uuid"] in self.seen_uuids:
+                statuses[cmd["uuid"]] = "ok"
+                continue
+            args = dict(cmd.get("args", {}))
+            if isinstance(args.get("id"), str) and args["id"] in temp_ids:
+                args["id"] = temp_ids[args["id"]]
+            kind = cmd["type"]
+            ok = True
+            if kind == "item_add":
+                temp_ids[cmd["temp_id"]] = self.add(args)["id"]
+            elif kind == "item_close":
+                ok = self.close(args["id"])
+            elif kind in ("item_update", "item_move"):
+                ok = self.update(args["id"], args)
+            else:
+                statuses[cmd["uuid"]] = {"error_code": 20, "error": f"Unknown command {kind}"}
+                continue
+            statuses[cmd["uuid"]] = "ok" if ok else {"error_code": 22, "error": "Item not found"}
+            self.seen_uuids.add(cmd["uuid"])
+        return {"sync_status": statuses, "temp_id_mapping": temp_ids, "sync_token": str(self.version)}
+
+    # -- REST pagination ---------------------------------------------------
+
+    def page(self, rows: list, params: dict) -> dict:
+        limit = min(int(params.get("limit", [self.page_size])[0]), self.page_size)
+        offset = int(params.get("cursor", ["0"])[0] or 0)
+        end = offset + limit
+        return {"results": rows[offset:end], "next_cursor": str(end) if end < len(rows) else None}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeTodoist
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, payload=None, headers: Optional[dict] = None) -> None:
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _handle(self, method: str) -> None:
+        body = self._body()
+        retry_after = self.fake.admit()
+        if retry_after is not None:
+            self._send(429, {"error": "Too many requests"}, {"Retry-After": f"{retry_after:g}"})
+            return
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._send(401, {"error": "Unauthorized"})
+            return
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = url.path.rstrip("/").split("/")[3:]  # drop "", "api", "v1"
+        fake = self.fake
+
+        if method == "POST" and parts == ["sync"]:
+            form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+            self._send(200, fake.sync(form))
+        elif method == "GET" and parts == ["tasks", "filter"]:
+            self._send(200, fake.page(fake.matching(params.get("query", [None])[0]), params))
+        elif method == "GET" and parts == ["tasks"]:
+            self._send(200, fake.page(fake.active(), params))
+        elif method == "GET" and parts == ["tasks", "completed", "by_completion_date"]:
+            page = fake.page(fake.completed_between(params["since"][0], params["until"][0]), params)
+            self._send(200, {"items": page["results"], "next_cursor": page["next_cursor"]})
+        elif method == "POST" and parts == ["tasks"]:
+            self._send(200, fake.add(json.loads(body or b"{}")))
+        elif method == "POST" and len(parts) == 3 and parts[0] == "tasks" and parts[2] == "close":
+            if fake.close(parts[1]):
+                self._send(204)
+            else:
+                self._send(404, {"error": "Task not found"})
+        elif method == "GET" and parts == ["projects"]:
+            self._send(200, fake.page(list(fake.projects.values()), params))
+        else:
+            self._send(404, {"error": f"Not implemented in fake: {method} {url.path}"})
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+
+def serve(fake: FakeTodoist, port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Start serving in a daemon thread; returns (server, base URL)."""
+    handler = type("Handler", (_Handler,), {"fake": fake})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-todoist", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tasks", type=int, default=1000, help="dataset size (10 to 100000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, seconds")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    fake = FakeTodoist(
+        make_dataset(args.tasks, seed=args.seed),
+        latency=args.latency, jitter=args.jitter, page_size=args.page_size,
+        rate_limit_every=args.rate_limit_every, retry_after=args.retry_after,
+    )
+    server, url = serve(fake, args.port)
+    print(f"Fake Todoist with {args.tasks} tasks on {url}")
+    print(f"  export TODOIST_API_BASE_URL={url} TODOIST_API_TOKEN=fake-{uuid.uuid4().hex[:8]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
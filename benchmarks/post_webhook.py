@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Sign and POST webhook fixture payloads to a running `run.py --http` server.
+
+Usage:
+  TODOIST_WEBHOOK_SECRET=... python benchmarks/post_webhook.py \\
+      http://127.0.0.1:8000/todoist/webhook benchmarks/fixtures/webhooks/item_added.json [...]
+
+Options:
+  --user-id ID   Rewrite the payloads' user_id (the server ignores events
+                 for an account other than the one it is synced to).
+
+Standard library only.
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from todoist_mcp.webhooks import SIGNATURE_HEADER, sign  # noqa: E402
+
+
+def post(url: str, payload: dict, secret: str) -> tuple[int, str]:
+    body = json.dumps(payload).encode()
+    request = urllib.request.Request(
+        url,
+        data=body,
+        method="POST",
+        headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign(body, secret)},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    user_id = None
+    if "--user-id" in args:
+        i = args.index("--user-id")
+        user_id = args[i + 1]
+        del args[i:i + 2]
+    secret = os.environ.get("TODOIST_WEBHOOK_SECRET")
+    if len(args) < 2 or not secret:
+        print(__doc__, file=sys.stderr)
+        return 2
+    url, files = args[0], args[1:]
+    failed = 0
+    for name in files:
+        payload = json.loads(Path(name).read_text(encoding="utf-8"))
+        if user_id:
+            payload["user_id"] = user_id
+        status, text = post(url, payload, secret)
+        print(f"{status} {name}: {text}")
+        failed += status != 200
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
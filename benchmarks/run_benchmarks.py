@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Benchmark the skill's tools against the local fake Todoist server.
+
+For each dataset size this starts benchmarks/fake_todoist.py in its own
+process and measures every tool:
+
+- cold: a fresh interpreter with an empty cache dir; import time and the
+  first call (which includes the initial Sync API fetch);
+- warm: repeated calls in one process after a warm-up call;
+- throughput: calls per second with N threads calling concurrently;
+- memory: peak RSS of the worker and the bytes retained by the replica
+  after the initial sync (measured with tracemalloc), also per task.
+
+Results are written as JSON (stdout, or --output) with enough metadata to
+compare runs; --compare reports replica memory against an earlier file and
+flags warm p50 and memory regressions.
+
+Usage:
+  python benchmarks/run_benchmarks.py                        # 10, 1000, 10000 tasks
+  python benchmarks/run_benchmarks.py --tasks 100000 --latency 0.05 --output bench.json
+  python benchmarks/run_benchmarks.py --compare bench-v1.json --output bench-v2.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+_ROOT = Path(__file__).resolve().parent.parent
+_SRC = _ROOT / "src"
+_FAKE = Path(__file__).resolve().parent / "fake_todoist.py"
+
+# Tool name -> keyword arguments for one call. "{i}" in a string is replaced
+# by the call number so every create is distinct.
+TOOLS = {
+    "list_projects": {},
+    "list_tasks_today": {},
+    "list_tasks_overdue": {},
+    "list_tasks_this_week": {},
+    "list_tasks_by_filter": {"filter_query": "#Work & (p1 | p2)"},
+    "list_tasks_by_filter_remote": {"filter_query": "assigned to: me"},
+    "create_task": {"content": "Benchmark task {i}", "due_string": "tomorrow"},
+    "create_task_queued": {"content": "Benchmark queued task {i}"},
+    "complete_task": {},
+}
+# Tools safe to call concurrently for the throughput measurement.
+THROUGHPUT_TOOLS = ("list_tasks_today", "list_tasks_overdue", "list_projects", "create_task")
+
+
+def _env(base_url: str, cache_dir: str, tasks: int) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(_SRC), env.get("PYTHONPATH")])),
+        "TODOIST_API_BASE_URL": base_url,
+        "TODOIST_API_TOKEN": f"benchmark-{tasks}",
+        "TODOIST_CACHE_DIR": cache_dir,
+        "TODOIST_WRITE_QUEUE": "off",
+        # The fake server's quota is unlimited; keep the real defaults for 429s it injects.
+        "TODOIST_RATE_LIMIT": "1000000",
+        "TODOIST_RATE_BURST": "1000",
+    })
+    env.pop("TODOIST_DAEMON_SOCKET", None)
+    return env
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 2)
+
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "min_ms": round(ordered[0] * 1000, 2),
+    }
+
+
+# -- worker side (runs inside a subprocess pointed at the fake server) ------
+
+def _call(server, tool: str, i: int, task_ids: list[str]) -> dict:
+    if tool == "complete_task":
+        return server.complete_task(task_id=task_ids[i])
+    name = tool
+    if tool == "list_tasks_by_filter_remote":
+        name = "list_tasks_by_filter"
+    if tool == "create_task_queued":
+        name = "create_task"
+    kwargs = {k: v.format(i=i) if isinstance(v, str) else v for k, v in TOOLS[tool].items()}
+    return getattr(server, name)(**kwargs)
+
+
+def _max_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def worker_cold(tool: str) -> dict:
+    started = time.perf_counter()
+    import todoist_mcp.server as server
+
+    imported = time.perf_counter()
+    if tool == "create_task_queued":
+        os.environ["TODOIST_WRITE_QUEUE"] = "on"
+    task_ids = []
+    if tool == "complete_task":
+        task_ids = [r["id"] for r in server.create_tasks_batch([{"content": "cold"}])["results"]]
+        imported = time.perf_counter()
+    result = _call(server, tool, 0, task_ids)
+    done = time.perf_counter()
+    return {
+        "import_ms": round((imported - started) * 1000, 2),
+        "first_call_ms": round((done - imported) * 1000, 2),
+        "ok": bool(result.get("success")),
+        "error": result.get("error"),
+        "max_rss_kb": _max_rss_kb(),
+    }
+
+
+def worker_warm(iterations: int, concurrency: list[int]) -> dict:
+    import tracemalloc
+
+    import todoist_mcp.server as server
+    from todoist_mcp import replica
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    replica.get_replica()
+    replica_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    calls_needed = iterations + 1 + max(concurrency, default=1) * 5
+    created = server.create_tasks_batch([{"content": f"To complete {i}"} for i in range(calls_needed)])
+    task_ids = [r["id"] for r in created["results"]]
+
+    results: dict = {}
+    for tool in TOOLS:
+        os.environ["TODOIST_WRITE_QUEUE"] = "on" if tool == "create_task_queued" else "off"
+        first = _call(server, tool, 0, task_ids)
+        samples, errors = [], 0
+        for i in range(1, iterations + 1):
+            started = time.perf_counter()
+            result = _call(server, tool, i, task_ids)
+            samples.append(time.perf_counter() - started)
+            errors += not result.get("success")
+        entry = {"warm": _summary(samples), "errors": errors, "ok": bool(first.get("success"))}
+        if not first.get("success"):
+            entry["error"] = first.get("error")
+        results[tool] = entry
+    os.environ["TODOIST_WRITE_QUEUE"] = "off"
+
+    for tool in THROUGHPUT_TOOLS:
+        rates = {}
+        for threads in concurrency:
+            total = threads * 5
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(lambda i: _call(server, tool, i, task_ids), range(total)))
+            rates[str(threads)] = round(total / (time.perf_counter() - started), 1)
+        results[tool]["throughput_per_s"] = rates
+
+    replica_tasks = len(replica.get_replica().tasks)
+    return {
+        "tools": results,
+        "memory": {
+            "replica_bytes": replica_bytes,
+            "bytes_per_task": round(replica_bytes / replica_tasks) if replica_tasks else None,
+            "max_rss_kb": _max_rss_kb(),
+        },
+        "replica_tasks": replica_tasks,
+    }
+
+
+# -- orchestrator ----------------------------------------------------------
+
+class FakeServer:
+    """fake_todoist.py running in a child process."""
+
+    def __init__(self, tasks: int, latency: float, page_size: int, rate_limit_every: int) -> None:
+        self.proc = subprocess.Popen(
+            [sys.executable, str(_FAKE), "--port", "0", "--tasks", str(tasks),
+             "--latency", str(latency), "--page-size", str(page_size),
+             "--rate-limit-every", str(rate_limit_every), "--retry-after", "0.1"],
+            stdout=subprocess.PIPE, text=True,
+        )
+        line = self.proc.stdout.readline()
+        match = re.search(r"(http://\S+)", line)
+        if not match:
+            self.proc.kill()
+            raise RuntimeError(f"fake server did not start: {line!r}")
+        self.url = match.group(1)
+
+    def close(self) -> None:
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def _run_worker(args: list[str], env: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--worker", *args],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode:
+        return {"ok": False, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout)
+
+
+def bench_dataset(tasks: int, opts: argparse.Namespace) -> dict:
+    server = FakeServer(tasks, opts.latency, opts.page_size, opts.rate_limit_every)
+    try:
+        cold = {}
+        for tool in TOOLS:
+            with tempfile.TemporaryDirectory() as cache:
+                cold[tool] = _run_worker(["cold", tool], _env(server.url, cache, tasks))
+        with tempfile.TemporaryDirectory() as cache:
+            warm = _run_worker(
+                ["warm", str(opts.iterations), ",".join(map(str, opts.concurrency))],
+                _env(server.url, cache, tasks),
+            )
+    finally:
+        server.close()
+    tools = {}
+    for tool in TOOLS:
+        tools[tool] = {"cold": cold[tool], **(warm.get("tools", {}).get(tool, {}))}
+    return {
+        "tasks": tasks,
+        "tools": tools,
+        "memory": warm.get("memory"),
+        "error": warm.get("error"),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT,
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def memory_changes(current: dict, baseline: dict) -> list[str]:
+    """Describe replica memory per dataset against an earlier run."""
+    changes = []
+    previous = {d["tasks"]: d for d in baseline.get("datasets", [])}
+    for dataset in current["datasets"]:
+        new_bytes = (dataset.get("memory") or {}).get("replica_bytes")
+        old_bytes = ((previous.get(dataset["tasks"]) or {}).get("memory") or {}).get("replica_bytes")
+        if new_bytes and old_bytes:
+            changes.append(
+                f"{dataset['tasks']} tasks: replica {old_bytes / 1e6:.1f} MB -> "
+                f"{new_bytes / 1e6:.1f} MB ({(new_bytes - old_bytes) / old_bytes:+.0%})"
+            )
+    return changes
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """List warm p50 and replica memory regressions larger than threshold (0.2 = 20%)."""
+    regressions = []
+    previous = {d["tasks"]: d for d in baseline.get("datasets", [])}
+    for dataset in current["datasets"]:
+        old = previous.get(dataset["tasks"])
+        if not old:
+            continue
+        new_bytes = (dataset.get("memory") or {}).get("replica_bytes")
+        old_bytes = (old.get("memory") or {}).get("replica_bytes")
+        if new_bytes and old_bytes and new_bytes > old_bytes * (1 + threshold):
+            regressions.append(
+                f"{dataset['tasks']} tasks: replica memory {old_bytes} -> {new_bytes} bytes"
+            )
+        for tool, entry in dataset["tools"].items():
+            new_p50 = (entry.get("warm") or {}).get("p50_ms")
+            old_p50 = ((old["tools"].get(tool) or {}).get("warm") or {}).get("p50_ms")
+            if new_p50 and old_p50 and new_p50 > old_p50 * (1 + threshold) and new_p50 - old_p50 > 0.5:
+                regressions.append(
+                    f"{dataset['tasks']} tasks / {tool}: warm p50 {old_p50} -> {new_p50} ms"
+                )
+    return regressions
+
+
+def _print_table(dataset: dict, out: Callable[[str], None]) -> None:
+    out(f"\n{dataset['tasks']} tasks  (replica {dataset['memory'] or {}})")
+    out(f"  {'tool':30} {'cold ms':>9} {'warm p50':>9} {'warm p95':>9}  throughput/s")
+    for tool, entry in dataset["tools"].items():
+        cold = entry["cold"].get("first_call_ms", "err")
+        warm = entry.get("warm") or {}
+        out(f"  {tool:30} {cold:>9} {warm.get('p50_ms', '-'):>9} {warm.get('p95_ms', '-'):>9}  "
+            f"{entry.get('throughput_per_s', '')}")
+
+
+def main() -> int:
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        mode = sys.argv[2]
+        if mode == "cold":
+            print(json.dumps(worker_cold(sys.argv[3])))
+        else:
+            concurrency = [int(c) for c in sys.argv[4].split(",") if c]
+            print(json.dumps(worker_warm(int(sys.argv[3]), concurrency)))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.02, help="fake server latency, seconds")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    opts = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(opts).items() if k not in ("output", "compare")},
+        },
+        "datasets": [],
+    }
+    log = lambda line: print(line, file=sys.stderr)  # noqa: E731
+    for tasks in opts.tasks:
+        log(f"Benchmarking {tasks} tasks ...")
+        dataset = bench_dataset(tasks, opts)
+        results["datasets"].append(dataset)
+        _print_table(dataset, log)
+
+    payload = json.dumps(results, indent=2)
+    if opts.output:
+        Path(opts.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+    if opts.compare:
+        baseline = json.loads(Path(opts.compare).read_text(encoding="utf-8"))
+        for line in memory_changes(results, baseline):
+            log(f"memory {line}")
+        regressions = compare(results, baseline, opts.threshold)
+        for line in regressions:
+            log(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,13 +9,33 @@ Usage:
   python run.py list_tasks_today        # CLI: tasks due today
   python run.py list_tasks_overdue      # CLI: overdue tasks
   python run.py list_tasks_this_week    # CLI: tasks due this week
+  python run.py agenda                  # CLI: today, overdue, this week and counts by project
+  python run.py list_tasks_today --refresh   # CLI: re-sync instead of using the local copy
+  python run.py list_tasks_overdue --sort priority --limit 20 --fields id,content,due,project
+  python run.py list_tasks_overdue --cursor NEXT_CURSOR      # CLI: next page
   python run.py create_task "Title" --due "tomorrow" --priority 3
+  python run.py create_task "Title" --project "Work/Clients"
   python run.py create_reminder "Title" --when "today"
   python run.py complete_task TASK_ID
+  python run.py create_tasks_batch '[{"content": "A"}, {"content": "B", "due_string": "friday"}]'
+  python run.py create_tasks_batch --file tasks.json   # JSON list of tasks ("-" reads stdin)
+  python run.py complete_tasks_batch TASK_ID [TASK_ID ...]
+  python run.py bulk_update "overdue" reschedule --due tomorrow --dry-run
+  python run.py bulk_update "#Errands" set_priority --priority 3   # also: move --project, add_label --label, complete
+  python run.py export tasks.ndjson      # CLI: stream all active + completed tasks (resumes if interrupted)
+  python run.py export tasks.ndjson --incremental   # only what changed since the last export
+  python run.py export tasks/ --format parquet --since 2024-01-01   # columnar (needs pyarrow)
+  python run.py queue_status            # CLI: writes still waiting to be sent to Todoist
+  python run.py stats                   # CLI: latency/error/cache metrics (of the daemon, if running)
+  python run.py --daemon                # Keep a warm process; CLI commands above are forwarded to it
+  python run.py --profile-startup [cli] # Import-time breakdown and time to first MCP initialize
 
 TODOIST_API_TOKEN: On Raspberry Pi, provided via systemd EnvironmentFile.
 For local dev/testing, loaded from .env if present (see .env.example).
 Works correctly when Nanobot spawns this process from any working directory.
+
+CLI commands are forwarded to a running `--daemon` over a Unix socket when one
+is listening (see todoist_mcp/daemon.py), and run in-process otherwise.
 """
 
 import json
@@ -24,8 +44,16 @@ from pathlib import Path
 
 _SKILL_DIR = Path(__file__).parent.resolve()
 
-_env_path = _SKILL_DIR / ".env"
-if _env_path.exists():
+_src = _SKILL_DIR / "src"
+if _src.exists() and str(_src) not in sys.path:
+    sys.path.insert(0, str(_src))
+
+
+def _load_env() -> None:
+    """Load .env for local dev (skipped on the daemon fast path)."""
+    _env_path = _SKILL_DIR / ".env"
+    if not _env_path.exists():
+        return
     try:
         from dotenv import load_dotenv
         load_dotenv(_env_path)
@@ -40,15 +68,14 @@ if _env_path.exists():
         except Exception:
             pass
 
-_src = _SKILL_DIR / "src"
-if _src.exists() and str(_src) not in sys.path:
-    sys.path.insert(0, str(_src))
-
 
 _CLI_COMMANDS = {
     "list_projects", "list_tasks_today", "list_tasks_overdue",
-    "list_tasks_this_week", "create_task", "create_reminder", "complete_task",
+    "list_tasks_this_week", "agenda", "create_task", "create_reminder", "complete_task",
+    "create_tasks_batch", "complete_tasks_batch", "bulk_update", "export", "queue_status", "stats",
 }
+# Long-running commands always run in this process, never in the daemon.
+_LOCAL_COMMANDS = {"export"}
 
 
 def _parse_cli_args(args: list[str]) -> tuple[str, dict]:
@@ -72,52 +99,149 @@ def _parse_cli_args(args: list[str]) -> tuple[str, dict]:
     return command, positional, kwargs
 
 
-def _run_cli(args: list[str]) -> None:
-    """Run a tool directly and print JSON result."""
+def _inline_file_args(args: list[str]) -> list[str]:
+    """Replace `--file PATH` (or `--file -` for stdin) with the file's contents."""
+    if "--file" not in args:
+        return args
+    i = args.index("--file")
+    source = args[i + 1] if i + 1 < len(args) else "-"
+    raw = sys.stdin.read() if source == "-" else Path(source).read_text(encoding="utf-8")
+    return args[:i] + [raw] + args[i + 2:]
+
+
+def _execute_cli(args: list[str]) -> tuple[dict, int]:
+    """Run a tool directly and return (result, exit code)."""
     from todoist_mcp.server import (
         create_task, create_reminder_task, complete_task, list_projects,
-        list_tasks_today, list_tasks_overdue, list_tasks_this_week,
+        list_tasks_today, list_tasks_overdue, list_tasks_this_week, get_agenda,
+        create_tasks_batch, complete_tasks_batch, bulk_update_tasks, get_write_queue_status,
+        get_server_stats,
     )
 
     command, positional, kwargs = _parse_cli_args(args)
+    refresh = bool(kwargs.get("refresh"))
+    paging = {
+        "refresh": refresh,
+        "fields": kwargs["fields"].split(",") if "fields" in kwargs else None,
+        "limit": int(kwargs["limit"]) if "limit" in kwargs else None,
+        "cursor": kwargs.get("cursor"),
+        "sort": kwargs.get("sort"),
+    }
 
     if command == "list_projects":
-        result = list_projects()
+        result = list_projects(refresh=refresh)
     elif command == "list_tasks_today":
-        result = list_tasks_today()
+        result = list_tasks_today(**paging)
     elif command == "list_tasks_overdue":
-        result = list_tasks_overdue()
+        result = list_tasks_overdue(**paging)
     elif command == "list_tasks_this_week":
-        result = list_tasks_this_week()
+        result = list_tasks_this_week(**paging)
+    elif command == "agenda":
+        result = get_agenda(refresh=refresh, fields=paging["fields"], limit=paging["limit"])
     elif command == "create_task":
         content = positional[0] if positional else kwargs.pop("content", "")
         if not content:
-            print(json.dumps({"success": False, "error": "content is required"}))
-            sys.exit(1)
+            return {"success": False, "error": "content is required"}, 1
         result = create_task(
             content=content,
             due_string=kwargs.get("due"),
             priority=int(kwargs["priority"]) if "priority" in kwargs else None,
             description=kwargs.get("description"),
             project_id=kwargs.get("project_id"),
+            project=kwargs.get("project"),
         )
     elif command == "create_reminder":
         content = positional[0] if positional else kwargs.pop("content", "")
         if not content:
-            print(json.dumps({"success": False, "error": "content is required"}))
-            sys.exit(1)
+            return {"success": False, "error": "content is required"}, 1
         result = create_reminder_task(content=content, when=kwargs.get("when", "today"))
     elif command == "complete_task":
         task_id = positional[0] if positional else kwargs.get("task_id")
         if not task_id:
-            print(json.dumps({"success": False, "error": "task_id is required"}))
-            sys.exit(1)
+            return {"success": False, "error": "task_id is required"}, 1
         result = complete_task(task_id=task_id)
+    elif command == "create_tasks_batch":
+        try:
+            tasks = json.loads(positional[0] if positional else "")
+        except ValueError as e:
+            return {"success": False, "error": f"tasks must be a JSON list: {e}"}, 1
+        if not isinstance(tasks, list):
+            return {"success": False, "error": "tasks must be a JSON list"}, 1
+        result = create_tasks_batch(tasks=tasks)
+    elif command == "complete_tasks_batch":
+        if not positional:
+            return {"success": False, "error": "at least one task_id is required"}, 1
+        result = complete_tasks_batch(task_ids=positional)
+    elif command == "bulk_update":
+        if len(positional) < 2:
+            return {"success": False, "error": "filter_query and action are required"}, 1
+        options = {
+            "due_string": kwargs.get("due"),
+            "priority": int(kwargs["priority"]) if "priority" in kwargs else None,
+            "project": kwargs.get("project"),
+            "label": kwargs.get("label"),
+            "dry_run": bool(kwargs.get("dry_run")),
+        }
+        if "max_tasks" in kwargs:
+            options["max_tasks"] = int(kwargs["max_tasks"])
+        result = bulk_update_tasks(filter_query=positional[0], action=positional[1], **options)
+    elif command == "export":
+        if not positional:
+            return {"success": False, "error": "an output path is required"}, 1
+        from todoist_mcp import export
+        try:
+            result = {"success": True, **export.export_tasks(
+                Path(positional[0]),
+                fmt=kwargs.get("format", "ndjson"),
+                include_completed=not kwargs.get("no_completed"),
+                since=kwargs.get("since"),
+                incremental=bool(kwargs.get("incremental")),
+                restart=bool(kwargs.get("restart")),
+            )}
+        except Exception as e:
+            return {"success": False, "error": str(e)}, 1
+    elif command == "queue_status":
+        result = get_write_queue_status()
+    elif command == "stats":
+        result = get_server_stats()
     else:
-        print(json.dumps({"success": False, "error": f"Unknown command: {command}"}))
+        return {"success": False, "error": f"Unknown command: {command}"}, 1
+
+    return result, 0
+
+
+def _run_cli(args: list[str]) -> None:
+    """Run a tool (in the daemon if one is listening) and print JSON result."""
+    from todoist_mcp import daemon
+
+    try:
+        args = _inline_file_args(args)
+    except OSError as e:
+        print(json.dumps({"success": False, "error": f"Cannot read --file: {e}"}))
         sys.exit(1)
 
-    print(json.dumps(result, default=str))
+    forwarded = None if args[0] in _LOCAL_COMMANDS else daemon.forward(args)
+    if forwarded is not None:
+        result, exit_code = forwarded
+    else:
+        _load_env()
+        result, exit_code = _execute_cli(args)
+
+    print(json.dumps(result, default=str), flush=True)
+    if forwarded is None and isinstance(result, dict) and result.get("queued"):
+        _drain_write_queue()
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def _drain_write_queue() -> None:
+    """Try to send journaled writes before this one-shot process exits."""
+    from todoist_mcp import journal
+
+    try:
+        journal.get_journal().replay_pending()
+    except Exception:
+        pass  # Stays journaled; the next server, daemon or CLI run replays it.
 
 
 def main() -> None:
@@ -125,7 +249,19 @@ def main() -> None:
 
     if args and args[0] in _CLI_COMMANDS:
         _run_cli(args)
+    elif "--profile-startup" in args:
+        from todoist_mcp.profiling import profile_startup
+        target = "cli" if "cli" in args else "server"
+        print(json.dumps(profile_startup(target, Path(__file__).resolve()), indent=2))
+    elif "--daemon" in args:
+        from todoist_mcp import agenda, daemon, journal
+        _load_env()
+        if journal.get_journal() is not None:
+            journal.start_worker()
+        agenda.start_scheduler()
+        daemon.serve(_execute_cli)
     else:
+        _load_env()
         from todoist_mcp.server import mcp
         if "--http" in args:
             mcp.run(transport="streamable-http")
@@ -0,0 +1,194 @@
+"""
+Precomputed daily agenda.
+
+The first "what do I have today?" of the day is the slowest call: the
+replica is cold or stale, and nanobot usually asks for today and overdue
+back to back. With TODOIST_AGENDA_TIMES set to comma-separated HH:MM times
+in the user's Todoist timezone (e.g. "06:30,12:00"), a background thread
+syncs the replica when the server starts, at those times and just after
+midnight, and precomputes the agenda: today, overdue, this week, and this
+week's task counts by project.
+
+The lists are stored in the result cache (see querycache.py) under the
+keys list_tasks_today, list_tasks_overdue and list_tasks_this_week use, for
+TODOIST_AGENDA_MAX_AGE seconds (default 1800) or until midnight, whichever
+comes first. Those tools and get_agenda answer from them without touching
+Todoist, and report when the rows were computed in "as_of". Writes and
+pushed changes drop the affected lists as for any cached result; the next
+call recomputes them.
+
+Each account (the default one and every HTTP tenant) is warmed in its own
+timezone.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import time as clock_time
+from typing import Hashable, Optional
+
+from . import querycache, replica, tenants
+from .filters import FilterContext, build_predicate, compile_filter
+
+DEFAULT_MAX_AGE = 1800.0
+# How often the scheduler checks whether a run is due.
+TICK = 30.0
+
+# Section name -> the filter query of the list tool that shares its rows.
+SECTIONS = {
+    "today": "today",
+    "overdue": "overdue",
+    "this_week": "due before: next week",
+}
+
+
+def times() -> list[clock_time]:
+    """The configured TODOIST_AGENDA_TIMES; malformed entries are skipped."""
+    parsed = []
+    for raw in os.environ.get("TODOIST_AGENDA_TIMES", "").split(","):
+        try:
+            parsed.append(clock_time.fromisoformat(raw.strip()))
+        except ValueError:
+            continue
+    return sorted(parsed)
+
+
+def enabled() -> bool:
+    return bool(times())
+
+
+def _max_age() -> float:
+    raw = os.environ.get("TODOIST_AGENDA_MAX_AGE")
+    try:
+        value = float(raw) if raw else DEFAULT_MAX_AGE
+    except ValueError:
+        return DEFAULT_MAX_AGE
+    return value if value > 0 else DEFAULT_MAX_AGE
+
+
+def _lifetime(now: datetime) -> float:
+    """Seconds agenda rows stay valid: the max age, cut off at midnight."""
+    midnight = datetime.combine(now.date() + timedelta(days=1), clock_time(), now.tzinfo)
+    return max(min(_max_age(), (midnight - now).total_seconds()), 1.0)
+
+
+_KEYS = {querycache.normalize(query) for query in SECTIONS.values()}
+
+
+def ttl_for(key: Hashable) -> Optional[float]:
+    """Result-cache lifetime for key: the agenda's for its lists, else None (default)."""
+    if key not in _KEYS or not enabled():
+        return None
+    return _lifetime(replica.get_metadata().now())
+
+
+def build(refresh: bool = False) -> dict[str, querycache.Entry]:
+    """
+    Return the agenda lists, computing (and caching) the ones not cached.
+
+    Args:
+        refresh: Re-sync with Todoist and recompute every list.
+
+    Returns:
+        Section name -> result-cache entry with that section's rows.
+    """
+    sections: dict[str, querycache.Entry] = {}
+    current = None
+    for name, query in SECTIONS.items():
+        key = querycache.normalize(query)
+        entry = None if refresh else querycache.get(key)
+        if entry is None:
+            if current is None:
+                current = replica.get_replica(refresh=refresh)
+            ctx = FilterContext(
+                now=current.now(),
+                projects=current.projects,
+                projects_by_name=current.projects_by_name,
+            )
+            predicate = build_predicate(compile_filter(query), ctx)
+            entry = querycache.put(
+                key, current.select_tasks(predicate), predicate, ttl=ttl_for(key)
+            )
+        sections[name] = entry
+    return sections
+
+
+class _State:
+    """When the agenda of one account was last built (user's local time)."""
+
+    def __init__(self) -> None:
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+
+_state = _State()
+
+
+def _current() -> _State:
+    state = tenants.local("agenda", _State)
+    return _state if state is None else state
+
+
+def _due(now: Optional[datetime], last: Optional[datetime]) -> bool:
+    """True if the agenda should be rebuilt: first run, new day, or a configured time passed."""
+    if now is None or last is None or now.date() != last.date():
+        return True
+    return any(last.time() < at <= now.time() for at in times())
+
+
+def run_if_due() -> bool:
+    """Rebuild the current account's agenda if a scheduled time has come."""
+    state = _current()
+    if not _due(replica.user_now(), state.last_run):
+        return False
+    try:
+        build(refresh=True)
+    except Exception as e:
+        state.last_error = str(e)  # Retried on the next tick.
+        return False
+    state.last_run = replica.user_now()
+    state.last_error = None
+    return True
+
+
+class _Scheduler:
+    """Background thread that warms every account's agenda on schedule."""
+
+    def __init__(self) -> None:
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="todoist-agenda", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            if enabled():
+                for tenant in tenants.everyone():
+                    with tenants.use(tenant, touch=False):
+                        run_if_due()
+            time.sleep(TICK)
+
+
+_scheduler = _Scheduler()
+
+
+def start_scheduler() -> None:
+    """Start the agenda scheduler if TODOIST_AGENDA_TIMES is set."""
+    if enabled():
+        _scheduler.start()
+
+
+def stats() -> dict:
+    state = _current()
+    return {
+        "times": [at.strftime("%H:%M") for at in times()],
+        "last_run": state.last_run.isoformat(timespec="seconds") if state.last_run else None,
+        "last_error": state.last_error,
+    }
@@ -0,0 +1,309 @@
+"""
+Process-wide Todoist API client.
+
+All tools share one TodoistAPI instance backed by a pooled keep-alive HTTP
+session, so chained tool calls reuse the same TLS connection instead of
+paying a new handshake each time. The client is rebuilt automatically when
+TODOIST_API_TOKEN changes. Every request goes through the session's
+RequestScheduler (see scheduler.py) for rate limiting and retries.
+
+While a tool call serves an HTTP tenant (see tenants.py), the same functions
+return that tenant's own session and client instead.
+
+Paginated REST reads go through rest_pages(), which follows the API's
+public next_cursor, so a page can be resumed from a stored cursor without
+reaching into the SDK's paginator.
+
+Tuning (environment variables):
+    TODOIST_POOL_SIZE        Max keep-alive connections kept open (default 4).
+    TODOIST_CONNECT_TIMEOUT  Seconds to wait for a connection (default 10).
+    TODOIST_READ_TIMEOUT     Seconds to wait for a response (default 60).
+    TODOIST_API_BASE_URL     Send requests meant for https://api.todoist.com
+                             to this origin instead, e.g. the local fake
+                             server in benchmarks/ (default unset).
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics, tenants
+from .scheduler import RequestScheduler
+
+if TYPE_CHECKING:
+    from todoist_api_python.api import TodoistAPI
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+TODOIST_ORIGIN = "https://api.todoist.com"
+API_URL = f"{TODOIST_ORIGIN}/api/v1"
+SYNC_URL = f"{API_URL}/sync"
+
+
+def _env_number(name: str, default: float, cast=float):
+    """Read a positive number from the environment, falling back to default."""
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+class PooledSession(requests.Session):
+    """requests Session with a sized keep-alive pool, timeouts and a scheduler."""
+
+    def __init__(self, pool_size: int, timeout: tuple[float, float]) -> None:
+        super().__init__()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.scheduler = RequestScheduler()
+        self.base_url = os.environ.get("TODOIST_API_BASE_URL", "").rstrip("/") or None
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", self._adapter)
+        self.mount("http://", self._adapter)
+
+    def request(self, method, url, **kwargs):
+        # The SDK hard-codes its own timeout; ours is the configured one.
+        kwargs["timeout"] = self.timeout
+        if self.base_url and url.startswith(TODOIST_ORIGIN):
+            url = self.base_url + url[len(TODOIST_ORIGIN):]
+        send = super().request
+        attempts = 0
+
+        def attempt(**attempt_kwargs):
+            nonlocal attempts
+            attempts += 1
+            return send(method, url, **attempt_kwargs)
+
+        endpoint = metrics.endpoint_of(url)
+        started = time.perf_counter()
+        with metrics.upstream_span(method.upper(), endpoint):
+            try:
+                response = self.scheduler.execute(method, kwargs, attempt)
+            except Exception as e:
+                metrics.observe_upstream(
+                    endpoint, method.upper(), type(e).__name__,
+                    time.perf_counter() - started, max(attempts - 1, 0), 0,
+                )
+                raise
+        metrics.observe_upstream(
+            endpoint, method.upper(), str(response.status_code),
+            time.perf_counter() - started, attempts - 1, len(response.content),
+        )
+        return response
+
+    def connection_counts(self) -> tuple[int, int]:
+        """Return (requests sent, new connections opened) across all pools."""
+        pools = self._adapter.poolmanager.pools
+        sent = opened = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                sent += pool.num_requests
+                opened += pool.num_connections
+        return sent, opened
+
+
+_lock = threading.Lock()
+_client: Optional["TodoistAPI"] = None
+_session: Optional[PooledSession] = None
+_token: Optional[str] = None
+_rebuilds = 0
+# Counters from sessions closed after a token rotation.
+_retired_requests = 0
+_retired_connections = 0
+
+
+def _build_session() -> PooledSession:
+    pool_size = _env_number("TODOIST_POOL_SIZE", DEFAULT_POOL_SIZE, int)
+    timeout = (
+        _env_number("TODOIST_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+        _env_number("TODOIST_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+    )
+    return PooledSession(pool_size, timeout)
+
+
+def get_session() -> PooledSession:
+    """
+    Return the shared pooled session, rebuilding it if the token changed.
+
+    Raises:
+        ValueError: If TODOIST_API_TOKEN is not set.
+    """
+    global _client, _session, _token, _rebuilds
+    global _retired_requests, _retired_connections
+
+    tenant = tenants.current()
+    if tenant is not None:
+        return tenant.local("session", _build_session)
+
+    token = os.environ.get("TODOIST_API_TOKEN")
+    if not token:
+        raise ValueError(
+            "TODOIST_API_TOKEN environment variable is not set. "
+            "Get your API token from https://app.todoist.com/prefs/integrations"
+        )
+
+    with _lock:
+        if _session is None or token != _token:
+            if _session is not None:
+                sent, opened = _session.connection_counts()
+                _retired_requests += sent
+                _retired_connections += opened
+                _session.close()
+                _rebuilds += 1
+            _session = _build_session()
+            _client = None
+            _token = token
+        return _session
+
+
+def get_api() -> "TodoistAPI":
+    """
+    Return the shared Todoist API client, building it on first use.
+
+    The SDK is imported here rather than at module load: reads served by the
+    Sync API replica never need it.
+
+    Raises:
+        ValueError: If TODOIST_API_TOKEN is not set.
+    """
+    global _client
+
+    session = get_session()
+    tenant = tenants.current()
+    if tenant is not None:
+        def build() -> "TodoistAPI":
+            from todoist_api_python.api import TodoistAPI
+
+            return TodoistAPI(tenant.token, session=session)
+
+        return tenant.local("api", build)
+    with _lock:
+        if _client is None:
+            from todoist_api_python.api import TodoistAPI
+
+            _client = TodoistAPI(_token, session=session)
+        return _client
+
+
+def client_generation() -> int:
+    """Return how many times the client was rebuilt (changes on token rotation)."""
+    # A tenant's token never changes; only the default account rotates.
+    return 0 if tenants.current() is not None else _rebuilds
+
+
+def account_key() -> str:
+    """Return a stable, non-reversible key for the current token's account."""
+    tenant = tenants.current()
+    if tenant is not None:
+        return tenant.key
+    get_session()
+    with _lock:
+        return hashlib.sha256(_token.encode()).hexdigest()[:16]
+
+
+def _session_and_token() -> tuple[PooledSession, str]:
+    tenant = tenants.current()
+    if tenant is not None:
+        return get_session(), tenant.token
+    get_session()
+    with _lock:
+        return _session, _token
+
+
+def sync(**fields: str) -> dict:
+    """
+    POST form fields to the Todoist Sync endpoint over the shared session.
+
+    Args:
+        fields: Form fields such as sync_token, resource_types or commands
+            (list values must already be JSON-encoded strings).
+
+    Returns:
+        The decoded JSON response.
+    """
+    session, token = _session_and_token()
+    response = session.post(
+        SYNC_URL,
+        data=fields,
+        headers={
+            "Authorization": f"Bearer {token}",
+            "X-Request-Id": str(uuid.uuid4()),
+        },
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def rest_pages(
+    path: str, cursor: Optional[str] = None, **params: Any
+) -> Iterator[tuple[list[dict], Optional[str]]]:
+    """
+    GET a paginated REST endpoint page by page over the shared session.
+
+    Args:
+        path: Endpoint below the API root, e.g. "tasks/filter".
+        cursor: A next_cursor from an earlier page, to resume after it.
+        params: Query parameters (limit, query, since, ...).
+
+    Yields:
+        (rows, next_cursor) per page; next_cursor is None on the last one.
+        Pages are only requested as the iterator advances.
+    """
+    session, token = _session_and_token()
+    while True:
+        response = session.get(
+            f"{API_URL}/{path}",
+            params={**params, "cursor": cursor} if cursor else params,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "X-Request-Id": str(uuid.uuid4()),
+            },
+        )
+        response.raise_for_status()
+        body = response.json()
+        cursor = body.get("next_cursor") or None
+        yield body.get("results", body.get("items", [])), cursor
+        if cursor is None:
+            return
+
+
+def connection_stats() -> dict:
+    """Return connection pool settings and reuse counters for the shared client."""
+    tenant = tenants.current()
+    if tenant is not None:
+        session = get_session()
+        sent, opened = session.connection_counts()
+        return {
+            "pool_size": session.pool_size,
+            "timeout": list(session.timeout),
+            "requests": sent,
+            "new_connections": opened,
+            "reused_connections": max(sent - opened, 0),
+            "client_rebuilds": 0,
+            "scheduler": session.scheduler.stats(),
+        }
+    with _lock:
+        sent, opened = _session.connection_counts() if _session else (0, 0)
+        sent += _retired_requests
+        opened += _retired_connections
+        return {
+            "pool_size": _session.pool_size if _session else None,
+            "timeout": list(_session.timeout) if _session else None,
+            "requests": sent,
+            "new_connections": opened,
+            "reused_connections": max(sent - opened, 0),
+            "client_rebuilds": _rebuilds,
+            "scheduler": _session.scheduler.stats() if _session else None,
+        }
@@ -0,0 +1,90 @@
+"""
+Sync API command queue for batched writes.
+
+Builds Sync API commands and sends them up to 100 per request, so N writes
+cost ceil(N / 100) round trips instead of N. Every command carries a uuid
+(which Todoist uses to de-duplicate retries) and item_add commands carry a
+temp_id that the response maps to the real task id.
+"""
+
+import json
+import uuid
+from typing import Optional
+
+from . import client
+
+MAX_COMMANDS_PER_REQUEST = 100
+
+
+def command(kind: str, args: dict, temp_id: Optional[str] = None) -> dict:
+    """Build one Sync API command."""
+    cmd = {"type": kind, "uuid": str(uuid.uuid4()), "args": args}
+    if temp_id is not None:
+        cmd["temp_id"] = temp_id
+    return cmd
+
+
+def item_add(args: dict) -> dict:
+    """Build an item_add command with a fresh temp_id."""
+    return command("item_add", args, temp_id=str(uuid.uuid4()))
+
+
+def item_close(task_id: str) -> dict:
+    """Build an item_close command (completes, or advances a recurring task)."""
+    return command("item_close", {"id": task_id})
+
+
+def item_update(task_id: str, **fields) -> dict:
+    """Build an item_update command setting the given task fields."""
+    return command("item_update", {"id": task_id, **fields})
+
+
+def item_move(task_id: str, project_id: str) -> dict:
+    """Build an item_move command moving a task to another project."""
+    return command("item_move", {"id": task_id, "project_id": project_id})
+
+
+def send_chunk(chunk: list[dict]) -> tuple[dict, dict]:
+    """
+    Send up to MAX_COMMANDS_PER_REQUEST commands in one request.
+
+    Network and HTTP errors propagate, so the caller can tell "Todoist was
+    unreachable" apart from per-command errors.
+
+    Returns:
+        (statuses, temp_id_mapping) as in run_commands.
+    """
+    response = client.sync(commands=json.dumps(chunk))
+    statuses: dict[str, str] = {}
+    for cmd in chunk:
+        status = response.get("sync_status", {}).get(cmd["uuid"], "missing from response")
+        if isinstance(status, dict):
+            status = status.get("error") or json.dumps(status)
+        statuses[cmd["uuid"]] = status
+    return statuses, response.get("temp_id_mapping", {})
+
+
+def run_commands(commands: list[dict]) -> tuple[dict, dict]:
+    """
+    Send commands in chunks of MAX_COMMANDS_PER_REQUEST.
+
+    A chunk that fails as a whole (network or HTTP error) marks each of its
+    commands as failed and the remaining chunks are still sent.
+
+    Returns:
+        (statuses, temp_id_mapping): statuses maps each command uuid to "ok"
+        or an error message; temp_id_mapping maps temp ids to real ids.
+    """
+    statuses: dict[str, str] = {}
+    temp_ids: dict[str, str] = {}
+    for start in range(0, len(commands), MAX_COMMANDS_PER_REQUEST):
+        chunk = commands[start:start + MAX_COMMANDS_PER_REQUEST]
+        try:
+            chunk_statuses, chunk_temp_ids = send_chunk(chunk)
+        except Exception as e:
+            for cmd in chunk:
+                statuses[cmd["uuid"]] = str(e)
+            continue
+        statuses.update(chunk_statuses)
+        temp_ids.update(chunk_temp_ids)
+    return statuses, temp_ids
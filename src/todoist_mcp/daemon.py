@@ -0,0 +1,169 @@
+"""
+Persistent daemon for the run.py CLI.
+
+`python run.py --daemon` keeps one warm process (imports, pooled connection,
+replica) listening on a Unix domain socket. Later CLI invocations forward
+their arguments to it and print its JSON answer, which turns a multi-second
+cold start into a few milliseconds. If no daemon is listening, run.py runs
+the command in-process as before.
+
+This module is imported on the CLI fast path, so it must only use the
+standard library.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"args": [...], "token": "<sha256 of TODOIST_API_TOKEN or null>"}
+    response: {"result": {...}, "exit_code": 0} or {"declined": "<reason>"}
+
+The socket path is TODOIST_DAEMON_SOCKET, else $XDG_RUNTIME_DIR/todoist-mcp.sock,
+else /tmp/todoist-mcp-<uid>.sock. It is created with mode 0600.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+# Tool calls can take as long as a Todoist request plus retries.
+RESPONSE_TIMEOUT = 180.0
+
+
+def socket_path() -> Path:
+    """Return where the daemon listens."""
+    configured = os.environ.get("TODOIST_DAEMON_SOCKET")
+    if configured:
+        return Path(configured).expanduser()
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return Path(runtime) / "todoist-mcp.sock"
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return Path(tempfile.gettempdir()) / f"todoist-mcp-{uid}.sock"
+
+
+def _token_fingerprint() -> Optional[str]:
+    token = os.environ.get("TODOIST_API_TOKEN")
+    return hashlib.sha256(token.encode()).hexdigest() if token else None
+
+
+def _read_line(sock: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    return b"".join(chunks)
+
+
+def forward(args: list[str]) -> Optional[tuple[dict, int]]:
+    """
+    Run a CLI command in the daemon.
+
+    Returns:
+        (result, exit_code), or None if no daemon is available (or it declined
+        because it serves a different token), meaning run in-process instead.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path()
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return None
+        request = {"args": args, "token": _token_fingerprint()}
+        sock.settimeout(RESPONSE_TIMEOUT)
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            response = json.loads(_read_line(sock) or b"null")
+        except (OSError, ValueError) as e:
+            # The command may already have run; do not risk repeating a write.
+            return {"success": False, "error": f"Lost connection to daemon: {e}"}, 1
+    finally:
+        sock.close()
+    if not isinstance(response, dict) or "declined" in response:
+        return None
+    return response.get("result"), int(response.get("exit_code", 0))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            args = [str(a) for a in request["args"]]
+        except (ValueError, KeyError, TypeError):
+            self._reply({"result": {"success": False, "error": "Malformed request"}, "exit_code": 1})
+            return
+        own = _token_fingerprint()
+        if request.get("token") and own and request["token"] != own:
+            self._reply({"declined": "daemon serves a different TODOIST_API_TOKEN"})
+            return
+        try:
+            result, exit_code = self.server.execute(args)
+        except Exception as e:
+            result, exit_code = {"success": False, "error": str(e)}, 1
+        self._reply({"result": result, "exit_code": exit_code})
+
+    def _reply(self, payload: dict) -> None:
+        self.wfile.write(json.dumps(payload, default=str).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, execute: Callable[[list[str]], tuple[dict, int]]) -> None:
+        self.execute = execute
+        super().__init__(str(path), _Handler)
+
+
+def serve(execute: Callable[[list[str]], tuple[dict, int]]) -> None:
+    """
+    Serve CLI commands on the daemon socket until SIGTERM/SIGINT.
+
+    Args:
+        execute: Runs one CLI command (argument list) and returns
+            (result dict, exit code).
+    """
+    path = socket_path()
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()  # Stale socket left by a daemon that did not exit cleanly.
+        else:
+            raise SystemExit(f"A daemon is already listening on {path}")
+        finally:
+            probe.close()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    old_umask = os.umask(0o177)
+    try:
+        server = _Server(path, execute)
+    finally:
+        os.umask(old_umask)
+
+    def stop(signum, frame) -> None:
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,209 @@
+"""
+Date helpers for evaluating Todoist due dates locally.
+
+Todoist stores due dates in three shapes: a plain date ("2025-02-15"), a
+floating local datetime ("2025-02-15T09:00:00") and a fixed UTC datetime
+("2025-02-15T09:00:00Z"). These helpers normalize them into the user's
+timezone so "today" and "overdue" mean the same thing as in the Todoist app.
+"""
+
+import re
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def get_tz(name: Optional[str]) -> tzinfo:
+    """Return the tzinfo for an IANA name, or the local timezone if unknown."""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return datetime.now().astimezone().tzinfo
+
+
+def parse_due(due: Optional[dict], tz: tzinfo) -> tuple[Optional[date], Optional[datetime]]:
+    """
+    Split a Todoist due object into (local date, local datetime or None).
+
+    The datetime part is only set when the due has a time of day.
+    """
+    if not due:
+        return None, None
+    parsed = getattr(due, "parsed", None)
+    if parsed is not None:
+        return parsed(tz)  # records.Due caches the result.
+    if not due.get("date"):
+        return None, None
+    return parse_due_date(due["date"], tz)
+
+
+def parse_due_date(raw: str, tz: tzinfo) -> tuple[date, Optional[datetime]]:
+    """parse_due() for the raw "date" string of a due object."""
+    if "T" not in raw:
+        return date.fromisoformat(raw), None
+    if raw.endswith("Z"):
+        moment = datetime.fromisoformat(raw[:-1]).replace(tzinfo=timezone.utc).astimezone(tz)
+    else:
+        moment = datetime.fromisoformat(raw).replace(tzinfo=tz)
+    return moment.date(), moment
+
+
+def start_of_next_week(today: date) -> date:
+    """Return the Monday after today, which is what Todoist means by "next week"."""
+    return today + timedelta(days=7 - today.weekday())
+
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+_MONTH_DAY = re.compile(r"^([a-z]+)\.? (\d{1,2})(?:,? (\d{4}))?$")
+_DAY_MONTH = re.compile(r"^(\d{1,2}) ([a-z]+)\.?(?: (\d{4}))?$")
+
+
+def _month(name: str) -> Optional[int]:
+    """Match a full or abbreviated (3+ letters) English month name."""
+    if len(name) < 3:
+        return None
+    for index, month in enumerate(MONTHS, start=1):
+        if month.startswith(name):
+            return index
+    return None
+
+
+def _weekday(name: str) -> Optional[int]:
+    """Match a full or abbreviated (3+ letters) English weekday name."""
+    if len(name) < 3:
+        return None
+    for index, day in enumerate(WEEKDAYS):
+        if day.startswith(name):
+            return index
+    return None
+
+
+def _calendar_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def resolve_date(phrase: str, today: date) -> Optional[date]:
+    """
+    Resolve a date phrase the way Todoist filters do, relative to today.
+
+    Supports "today", "tomorrow", "yesterday", "next week", weekday names
+    ("monday", "next fri"), ISO dates and month-day dates ("March 2",
+    "2 Mar 2026"). Month-day dates without a year mean the next occurrence.
+    Returns None for anything else.
+    """
+    phrase = " ".join(phrase.lower().split())
+    if phrase == "today":
+        return today
+    if phrase == "tomorrow":
+        return today + timedelta(days=1)
+    if phrase == "yesterday":
+        return today - timedelta(days=1)
+    if phrase == "next week":
+        return start_of_next_week(today)
+    try:
+        return date.fromisoformat(phrase)
+    except ValueError:
+        pass
+
+    skip_today = phrase.startswith("next ")
+    weekday = _weekday(phrase[5:] if skip_today else phrase)
+    if weekday is not None:
+        ahead = (weekday - today.weekday()) % 7
+        if ahead == 0 and skip_today:
+            ahead = 7
+        return today + timedelta(days=ahead)
+
+    match = _MONTH_DAY.match(phrase)
+    if match:
+        month_name, day, year = match.groups()
+    else:
+        match = _DAY_MONTH.match(phrase)
+        if not match:
+            return None
+        day, month_name, year = match.groups()
+    month = _month(month_name)
+    if month is None:
+        return None
+    if year:
+        return _calendar_date(int(year), month, int(day))
+    resolved = _calendar_date(today.year, month, int(day))
+    if resolved is not None and resolved < today:
+        resolved = _calendar_date(today.year + 1, month, int(day))
+    return resolved
+
+
+_RELATIVE = re.compile(r"^in (\d+|an?) (minute|min|hour|hr|day|week)s?$")
+_TIME = re.compile(r"^(?:at |@ ?)?(\d{1,2})(?::(\d{2}))? ?(am|pm)?$")
+_DATE_TIME = re.compile(r"^(.+?),?( at | @ ?| )(\d{1,2}(?::\d{2})? ?(?:am|pm)?)$")
+
+
+def _clock(text: str) -> Optional[tuple[int, int]]:
+    """Parse "5pm", "5:30 pm", "17:00" or "at 9" into (hour, minute)."""
+    match = _TIME.match(text)
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    elif match.group(2) is None and not text.startswith(("at", "@")):
+        return None  # A bare number is not a time.
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def parse_due_phrase(phrase: str, now: datetime) -> Optional[tuple[Optional[date], Optional[datetime]]]:
+    """
+    Resolve a create_task due phrase locally, relative to now (user's timezone).
+
+    Understands everything resolve_date() does, plus "in 2 days" / "in 3
+    weeks" (a date), "in 2 hours" / "in 30 minutes" (a fixed moment), and a
+    time of day after a date phrase or on its own ("tomorrow at 5pm",
+    "friday 9:30", "at 17:00").
+
+    Returns:
+        (date, None) for an all-day due, (None, datetime in now's timezone)
+        for a timed one. None when the phrase is not understood or is
+        recurring ("every monday"); Todoist should parse those.
+    """
+    phrase = " ".join(phrase.lower().split())
+    if not phrase or phrase.startswith("every"):
+        return None
+    today = now.date()
+
+    match = _RELATIVE.match(phrase)
+    if match:
+        count, unit = match.groups()
+        amount = 1 if count in ("a", "an") else int(count)
+        if unit in ("minute", "min", "hour", "hr"):
+            delta = timedelta(minutes=amount) if unit.startswith("m") else timedelta(hours=amount)
+            return None, (now + delta).replace(second=0, microsecond=0)
+        return today + timedelta(days=amount * (7 if unit == "week" else 1)), None
+
+    resolved = resolve_date(phrase, today)
+    if resolved is not None:
+        return resolved, None
+
+    clock = _clock(phrase)
+    day: Optional[date] = today
+    if clock is None:
+        match = _DATE_TIME.match(phrase)
+        if not match:
+            return None
+        phrase_date, separator, time_of_day = match.groups()
+        day = resolve_date(phrase_date, today)
+        clock = _clock(("at " if separator.strip() else "") + time_of_day)
+        if day is None or clock is None:
+            return None
+    return None, datetime(day.year, day.month, day.day, *clock, tzinfo=now.tzinfo)
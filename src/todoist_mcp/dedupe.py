@@ -0,0 +1,289 @@
+"""
+Duplicate detection for create_task and create_reminder_task.
+
+Agents re-issue "remind me to call the dentist" across turns or after a
+timeout, and every repeat used to add another copy. Before writing, the
+task content is normalized (case, punctuation and spacing folded), hashed
+and looked up among the open tasks of the target project, a single dict
+lookup. With TODOIST_DEDUPE_SIMILARITY set to a threshold between 0 and 1
+(e.g. 0.8), near-duplicates are caught too: tasks whose 3-character
+shingles overlap the new content's at least that much (Jaccard similarity),
+found through a per-project shingle index.
+
+The mode comes from the call's dedupe argument, else TODOIST_DEDUPE:
+    block: nothing is created; the existing task is returned instead;
+    warn (default): the task is created and the response names the likely
+        duplicate in "duplicate_of";
+    off: no check.
+
+The index is built from the replica as it is, without syncing, and follows
+its changes. Tasks created through the server are indexed right away, queued
+ones under their provisional id, and kept for PENDING_TTL seconds until a
+sync brings them in. Each HTTP tenant (see tenants.py) has its own index.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from . import replica, tenants
+
+MODES = ("block", "warn", "off")
+DEFAULT_MODE = "warn"
+SHINGLE = 3
+# Seconds a task created here counts as open before a sync has seen it.
+PENDING_TTL = 600.0
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def check_mode(mode: Optional[str]) -> str:
+    """Validate a dedupe mode; None means TODOIST_DEDUPE (default warn)."""
+    mode = (mode or os.environ.get("TODOIST_DEDUPE") or DEFAULT_MODE).lower()
+    if mode not in MODES:
+        raise ValueError(f"dedupe must be one of: {', '.join(MODES)}")
+    return mode
+
+
+def _similarity() -> float:
+    raw = os.environ.get("TODOIST_DEDUPE_SIMILARITY")
+    try:
+        value = float(raw) if raw else 0.0
+    except ValueError:
+        return 0.0
+    return value if 0 < value <= 1 else 0.0
+
+
+def normalize(content: str) -> str:
+    """Fold case, punctuation and spacing: "Call the dentist!" -> "call the dentist"."""
+    return " ".join(_NON_WORD.sub(" ", content.casefold()).split())
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+
+def _shingles(text: str) -> frozenset:
+    if len(text) <= SHINGLE:
+        return frozenset((text,))
+    return frozenset(text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1))
+
+
+class _Entry:
+    __slots__ = ("task_id", "content", "project_id", "digest", "shingles", "pending_until")
+
+    def __init__(
+        self, task_id: str, content: str, project_id: Optional[str],
+        shingles: bool, pending_until: float = 0.0,
+    ) -> None:
+        text = normalize(content)
+        self.task_id = task_id
+        self.content = content
+        self.project_id = project_id
+        self.digest = _digest(text)
+        self.shingles = _shingles(text) if shingles else frozenset()
+        self.pending_until = pending_until
+
+    def summary(self, inbox: Optional[str], similarity: float = 1.0) -> dict:
+        return {
+            "id": self.task_id,
+            "content": self.content,
+            "project_id": self.project_id or inbox,
+            "similarity": round(similarity, 2),
+        }
+
+
+class DedupeIndex:
+    """
+    Open tasks by (project, content hash), plus shingle postings.
+
+    Inbox tasks are filed under project None, the project a create without
+    project_id lands in, so the two match before the Inbox id is known.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inbox: Optional[str] = None
+        self._entries: dict[str, _Entry] = {}
+        self._by_key: dict[tuple, dict[str, _Entry]] = {}
+        self._postings: dict[tuple, set[str]] = {}
+        # Similarity threshold the index was built for; None: rebuild first.
+        self._built_for: Optional[float] = None
+        self.blocked = 0
+        self.warned = 0
+
+    def _project(self, project_id: Optional[str]) -> Optional[str]:
+        return None if project_id == self._inbox else project_id
+
+    def _add(self, entry: _Entry) -> None:
+        self._remove(entry.task_id)
+        self._entries[entry.task_id] = entry
+        self._by_key.setdefault((entry.project_id, entry.digest), {})[entry.task_id] = entry
+        for shingle in entry.shingles:
+            self._postings.setdefault((entry.project_id, shingle), set()).add(entry.task_id)
+
+    def _remove(self, task_id: str) -> None:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return
+        key = (entry.project_id, entry.digest)
+        self._by_key[key].pop(task_id, None)
+        if not self._by_key[key]:
+            del self._by_key[key]
+        for shingle in entry.shingles:
+            ids = self._postings[(entry.project_id, shingle)]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[(entry.project_id, shingle)]
+
+    def _ensure_built(self, current: replica.Replica, threshold: float) -> None:
+        """(Re)build from the replica if it changed wholesale or the threshold did."""
+        if self._built_for == threshold:
+            return
+        pending = [e for e in self._entries.values() if e.pending_until]
+        self._entries, self._by_key, self._postings = {}, {}, {}
+        self._inbox = next(
+            (p["id"] for p in current.list_projects() if p.get("inbox_project")), None
+        )
+        for task in current.select_tasks(lambda _: True):
+            self._add(_Entry(
+                task["id"], task["content"], self._project(task.get("project_id")), threshold > 0
+            ))
+        for entry in pending:
+            if entry.task_id not in self._entries:
+                self._add(_Entry(
+                    entry.task_id, entry.content, entry.project_id, threshold > 0, entry.pending_until
+                ))
+        self._built_for = threshold
+
+    def find(self, content: str, project_id: Optional[str]) -> Optional[dict]:
+        """
+        Return the open task in project_id that content duplicates, or None.
+
+        Exact matches (after normalize()) win; with a similarity threshold
+        set, otherwise the most similar task at or above it.
+        """
+        threshold = _similarity()
+        text = normalize(content)
+        # Outside the lock: catching up may call on_change().
+        current = replica.cached()
+        now = time.monotonic()
+        with self._lock:
+            self._ensure_built(current, threshold)
+            project_id = self._project(project_id)
+            for entry in self._by_key.get((project_id, _digest(text)), {}).values():
+                if not entry.pending_until or entry.pending_until > now:
+                    return entry.summary(self._inbox)
+            if not threshold:
+                return None
+            shingles = _shingles(text)
+            overlap: dict[str, int] = {}
+            for shingle in shingles:
+                for task_id in self._postings.get((project_id, shingle), ()):
+                    overlap[task_id] = overlap.get(task_id, 0) + 1
+            best, best_score = None, threshold
+            for task_id, shared in overlap.items():
+                entry = self._entries[task_id]
+                if entry.pending_until and entry.pending_until <= now:
+                    continue
+                score = shared / (len(shingles) + len(entry.shingles) - shared)
+                if score >= best_score:
+                    best, best_score = entry, score
+            return best.summary(self._inbox, best_score) if best else None
+
+    def add_created(self, task_id: str, content: str, project_id: Optional[str]) -> None:
+        """Index a task just created (or queued) through the server."""
+        with self._lock:
+            self._add(_Entry(
+                task_id, content, self._project(project_id), bool(self._built_for),
+                time.monotonic() + PENDING_TTL,
+            ))
+
+    def forget(self, task_id: str) -> None:
+        """Drop a task completed or deleted through the server."""
+        with self._lock:
+            self._remove(task_id)
+
+    def on_change(self, task_ids: Optional[set], project_ids: Optional[set]) -> None:
+        """Replica listener: follow task changes; rebuild after a full change."""
+        with self._lock:
+            if self._built_for is None:
+                return
+            if task_ids is replica.ALL:
+                self._built_for = None
+                return
+            shingles = self._built_for > 0
+            rows = {t["id"]: t for t in replica.get_tasks(task_ids)}
+            for task_id in task_ids:
+                task = rows.get(task_id)
+                if task is None:
+                    self._remove(task_id)
+                else:
+                    self._add(_Entry(
+                        task_id, task["content"], self._project(task.get("project_id")), shingles
+                    ))
+
+    def stats(self) -> dict:
+        with self._lock:
+            indexed = len(self._entries)
+        return {
+            "mode": check_mode(None),
+            "similarity": _similarity() or None,
+            "indexed": indexed,
+            "blocked": self.blocked,
+            "warned": self.warned,
+        }
+
+
+_index = DedupeIndex()
+
+
+def _current() -> DedupeIndex:
+    index = tenants.local("dedupe", DedupeIndex)
+    return _index if index is None else index
+
+
+def _on_change(task_ids: Optional[set], project_ids: Optional[set]) -> None:
+    _current().on_change(task_ids, project_ids)
+
+
+replica.subscribe(_on_change)
+
+
+def check(content: str, project_id: Optional[str], mode: str) -> Optional[dict]:
+    """
+    Look up a duplicate of a task about to be created.
+
+    Args:
+        content: The new task's content.
+        project_id: Where it will be created (None for the Inbox).
+        mode: A checked mode; "off" skips the lookup.
+
+    Returns:
+        The existing task (id, content, project_id, similarity), or None.
+    """
+    if mode == "off":
+        return None
+    index = _current()
+    duplicate = index.find(content, project_id)
+    if duplicate is not None:
+        if mode == "block":
+            index.blocked += 1
+        else:
+            index.warned += 1
+    return duplicate
+
+
+def add_created(task_id: str, content: str, project_id: Optional[str]) -> None:
+    _current().add_created(task_id, content, project_id)
+
+
+def forget(task_id: str) -> None:
+    _current().forget(task_id)
+
+
+def stats() -> dict:
+    return _current().stats()
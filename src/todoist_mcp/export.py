@@ -0,0 +1,390 @@
+"""
+Streaming export of the account's tasks for offline analysis.
+
+Active tasks are read page by page from the REST API and completed tasks
+window by window (Todoist serves at most three months of completion history
+per request range). Each page is written out as soon as it arrives, so
+memory use does not grow with the account. One row per task, flat columns:
+
+    id, status (active / completed / deleted), content, description,
+    project_id, section_id, parent_id, labels, priority, due_date,
+    due_string, is_recurring, created_at, completed_at, exported_at
+
+Formats:
+    ndjson   One JSON object per line.
+    parquet  A directory of Parquet part files (needs pyarrow), read as
+             one table by pandas, DuckDB, Polars, ...
+
+Progress is checkpointed next to the output (<path>.checkpoint.json) after
+every durable write. An interrupted export resumes where it stopped: rows
+written after the last checkpoint are cut off and the pages after it
+fetched again, so no row is lost or duplicated.
+
+The checkpoint also remembers where the last finished export ended. An
+incremental export appends only what changed since then: tasks added,
+edited or deleted (through a Sync API token taken when that export started)
+and tasks completed since. When a task appears more than once across runs,
+its latest row wins.
+
+The export_tasks MCP tool only writes inside TODOIST_EXPORT_DIR (default:
+the cache directory's exports/ folder, one sub-folder per HTTP tenant);
+`run.py export` writes wherever it is told.
+"""
+
+import json
+import os
+import shutil
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from . import client, tenants
+from .store import cache_dir
+
+FORMATS = ("ndjson", "parquet")
+COLUMNS = (
+    "id", "status", "content", "description", "project_id", "section_id",
+    "parent_id", "labels", "priority", "due_date", "due_string", "is_recurring",
+    "created_at", "completed_at", "exported_at",
+)
+PAGE_SIZE = 200
+# Todoist limits a completed-tasks query to about three months.
+WINDOW = timedelta(days=89)
+DEFAULT_HISTORY_DAYS = 365
+ROWS_PER_PART = 50_000
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _bound(value: datetime) -> str:
+    """A completion window bound, to the microsecond (unlike row timestamps)."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _moment(value: Any) -> datetime:
+    """Parse a bound or completed_at into an aware UTC datetime."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _iso(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+            return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _field(task: Any, name: str) -> Any:
+    return task.get(name) if isinstance(task, dict) else getattr(task, name, None)
+
+
+def export_row(task: Any, status: str, exported_at: str) -> dict:
+    """Flatten a REST Task model or a Sync API item into an export row."""
+    due = _field(task, "due")
+    return {
+        "id": str(_field(task, "id")),
+        "status": status,
+        "content": _field(task, "content") or "",
+        "description": _field(task, "description") or "",
+        "project_id": _field(task, "project_id"),
+        "section_id": _field(task, "section_id"),
+        "parent_id": _field(task, "parent_id"),
+        "labels": list(_field(task, "labels") or ()),
+        "priority": _field(task, "priority") or 1,
+        "due_date": _iso(_field(due, "date")) if due else None,
+        "due_string": _field(due, "string") if due else None,
+        "is_recurring": bool(_field(due, "is_recurring")) if due else False,
+        "created_at": _iso(_field(task, "created_at") or _field(task, "added_at")),
+        "completed_at": _iso(_field(task, "completed_at")),
+        "exported_at": exported_at,
+    }
+
+
+class _NdjsonWriter:
+    """Appends lines to one file; durable position = byte offset."""
+
+    def __init__(self, path: Path, position: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        self._file = open(path, "r+b")
+        self._file.truncate(position)
+        self._file.seek(position)
+        self.position = position
+        self.pending = 0
+
+    def write(self, rows: list[dict]) -> None:
+        self._file.writelines(
+            json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode() + b"\n" for row in rows
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.position = self._file.tell()
+
+    def finish(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Writes part-NNNNN.parquet files; durable position = parts written."""
+
+    def __init__(self, path: Path, position: int) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("The parquet format needs pyarrow: pip install pyarrow") from e
+        self._pa, self._pq = pa, pq
+        self._schema = pa.schema([
+            (name, pa.list_(pa.string()) if name == "labels" else
+             pa.int64() if name == "priority" else
+             pa.bool_() if name == "is_recurring" else pa.string())
+            for name in COLUMNS
+        ])
+        path.mkdir(parents=True, exist_ok=True)
+        # Parts written after the last checkpoint belong to pages fetched again.
+        for part in path.glob("part-*.parquet"):
+            if int(part.stem.split("-")[1]) >= position:
+                part.unlink()
+        self._path = path
+        self._buffer: list[dict] = []
+        self.position = position
+
+    @property
+    def pending(self) -> int:
+        """Rows not yet in a part file."""
+        return len(self._buffer)
+
+    def write(self, rows: list[dict]) -> None:
+        self._buffer.extend(rows)
+        if len(self._buffer) >= ROWS_PER_PART:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        table = self._pa.Table.from_pylist(self._buffer, schema=self._schema)
+        target = self._path / f"part-{self.position:05d}.parquet"
+        temporary = target.with_suffix(".tmp")
+        self._pq.write_table(table, temporary, compression="zstd")
+        os.replace(temporary, target)
+        self._buffer = []
+        self.position += 1
+
+    def finish(self) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        pass
+
+
+def export_dir() -> Path:
+    """Where the MCP tool writes exports for the current account."""
+    configured = os.environ.get("TODOIST_EXPORT_DIR")
+    if configured:
+        base = Path(configured).expanduser()
+    else:
+        cache = cache_dir()
+        if cache is None:
+            raise ValueError("Set TODOIST_EXPORT_DIR (the cache directory is disabled)")
+        base = cache / "exports"
+    tenant = tenants.current()
+    return base / tenant.key if tenant is not None else base
+
+
+def resolve_name(name: str) -> Path:
+    """Path of an export named by a tool caller; plain names only."""
+    if not name or name != Path(name).name or name.startswith("."):
+        raise ValueError("name must be a plain file name such as tasks.ndjson")
+    return export_dir() / name
+
+
+def _checkpoint_path(path: Path) -> Path:
+    return path.with_name(path.name + ".checkpoint.json")
+
+
+def load_checkpoint(path: Path) -> dict:
+    try:
+        return json.loads(_checkpoint_path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def _save_checkpoint(path: Path, checkpoint: dict) -> None:
+    target = _checkpoint_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_suffix(".tmp")
+    temporary.write_text(json.dumps(checkpoint, indent=1), encoding="utf-8")
+    os.replace(temporary, target)
+
+
+def _clear_output(path: Path, fmt: str) -> None:
+    if fmt == "parquet":
+        if path.is_dir():
+            shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def _new_run(checkpoint: dict, since: Optional[str], incremental: bool) -> dict:
+    """Plan a run: which phases to go through and from where."""
+    now = _utc_now()
+    last = checkpoint.get("last")
+    if incremental and last:
+        completed_since = last["completed_until"]
+        phase = "changes"
+    else:
+        incremental = False
+        start = date.fromisoformat(since) if since else now.date() - timedelta(days=DEFAULT_HISTORY_DAYS)
+        completed_since = _bound(datetime.combine(start, datetime.min.time(), timezone.utc))
+        phase = "active"
+    # Taken before reading anything, so the next incremental run sees every
+    # change made while this one was in progress.
+    token = client.sync(sync_token="*", resource_types=json.dumps(["user"]))["sync_token"]
+    return {
+        "incremental": incremental,
+        "phase": phase,
+        "cursor": "",
+        "changes_token": last.get("sync_token") if incremental else None,
+        "next_sync_token": token,
+        "window_since": completed_since,
+        "until": _bound(now),
+        "position": 0,
+        "rows": {"active": 0, "completed": 0, "deleted": 0},
+        "started_at": _iso(now),
+    }
+
+
+def _pages(run: dict, include_completed: bool) -> Iterator[tuple[list[dict], dict]]:
+    """Yield (rows, run state after them) until every phase is done."""
+    from todoist_api_python.models import Task
+
+    exported_at = run["started_at"]
+    if run["phase"] == "changes":
+        response = client.sync(sync_token=run["changes_token"], resource_types=json.dumps(["items"]))
+        rows = [
+            export_row(item, "deleted" if item.get("is_deleted") else "active", exported_at)
+            for item in response.get("items", [])
+            if item.get("is_deleted") or not item.get("checked")  # Completions come below.
+        ]
+        run = dict(run, phase="completed", cursor="")
+        yield rows, run
+    if run["phase"] == "active":
+        # run["cursor"] is the public next_cursor of the last page written;
+        # the last page moves on to the next phase, so a resume never
+        # fetches a phase (or a window, below) again.
+        for batch, cursor in client.rest_pages("tasks", cursor=run["cursor"] or None, limit=PAGE_SIZE):
+            run = dict(run, cursor=cursor) if cursor else dict(run, phase="completed", cursor="")
+            yield [export_row(Task.from_dict(t), "active", exported_at) for t in batch], run
+    if run["phase"] == "completed" and include_completed:
+        # Windows are half-open, [since, until): the API includes both ends,
+        # so a task completed exactly at a bound is kept by the window (or
+        # the run) that starts there and dropped by the one that ends there.
+        until = _moment(run["until"])
+        while True:
+            since = _moment(run["window_since"])
+            if since >= until:
+                break
+            window_until = min(since + WINDOW, until)
+            pages = client.rest_pages(
+                "tasks/completed/by_completion_date", cursor=run["cursor"] or None,
+                since=_bound(since), until=_bound(window_until), limit=PAGE_SIZE,
+            )
+            for batch, cursor in pages:
+                if cursor:
+                    run = dict(run, cursor=cursor)
+                else:
+                    run = dict(run, window_since=_bound(window_until), cursor="")
+                tasks = [Task.from_dict(t) for t in batch]
+                yield [
+                    export_row(t, "completed", exported_at)
+                    for t in tasks
+                    if _moment(t.completed_at) < window_until
+                ], run
+    yield [], dict(run, phase="done")
+
+
+def export_tasks(
+    path: Path,
+    fmt: str = "ndjson",
+    include_completed: bool = True,
+    since: Optional[str] = None,
+    incremental: bool = False,
+    restart: bool = False,
+) -> dict:
+    """
+    Export tasks to path, resuming an interrupted run unless restart is set.
+
+    Args:
+        path: Output file (ndjson) or directory (parquet).
+        fmt: "ndjson" or "parquet".
+        include_completed: Also export completed tasks.
+        since: ISO date the completed history starts at (full exports;
+            default one year back).
+        incremental: Append only what changed since the last finished
+            export to this path (a full export if there was none).
+        restart: Discard an unfinished run instead of resuming it.
+
+    Returns:
+        Counts of rows written per status, whether the run was resumed, and
+        the time the export covers up to.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    path = Path(path).expanduser()
+    checkpoint = load_checkpoint(path)
+    if checkpoint.get("format") not in (None, fmt):
+        raise ValueError(f"{path} holds a {checkpoint['format']} export; use another path")
+    run = checkpoint.get("run")
+    resumed = bool(run) and not restart
+    if not resumed:
+        run = _new_run(checkpoint, since, incremental)
+        if not run["incremental"]:
+            _clear_output(path, fmt)
+            checkpoint.pop("last", None)
+        last = checkpoint.get("last") or {}
+        run["position"] = last.get("position", 0)
+    checkpoint.update(format=fmt, run=run)
+    _save_checkpoint(path, checkpoint)
+
+    writer = (_ParquetWriter if fmt == "parquet" else _NdjsonWriter)(path, run["position"])
+    rows = dict(run["rows"])
+    try:
+        for batch, state in _pages(run, include_completed):
+            for row in batch:
+                rows[row["status"]] += 1
+            writer.write(batch)
+            if not writer.pending:
+                # Everything up to state is on disk.
+                checkpoint["run"] = dict(state, position=writer.position, rows=rows)
+                _save_checkpoint(path, checkpoint)
+        writer.finish()
+    finally:
+        writer.close()
+    checkpoint["run"] = None
+    checkpoint["last"] = {
+        "sync_token": run["next_sync_token"],
+        "completed_until": run["until"],
+        "finished_at": _iso(_utc_now()),
+        "position": writer.position,
+    }
+    _save_checkpoint(path, checkpoint)
+    return {
+        "path": str(path),
+        "format": fmt,
+        "rows": rows,
+        "resumed": resumed,
+        "incremental": run["incremental"],
+        "until": run["until"],
+    }
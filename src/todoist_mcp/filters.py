@@ -0,0 +1,221 @@
+"""
+Local evaluator for the common subset of the Todoist filter language.
+
+Supported terms: today, tomorrow, yesterday, overdue (od), no date,
+due: <date>, due before: <date>, due after: <date>, #Project, ##Project
+(with sub-projects), @label, p1-p4 and search: <text>, combined with
+& (and), | (or), ! (not) and parentheses. Dates accept the phrases handled
+by dates.resolve_date.
+
+Queries are parsed once and cached. Anything outside this subset compiles
+to None so the caller can send the query to Todoist instead.
+
+A queued task whose due phrase is still to be parsed (see replica.py) has a
+due without a date; it matches every due term, so it shows up in each list
+it may belong to until Todoist has parsed the phrase.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, Optional, Union
+
+from .dates import parse_due, resolve_date
+
+Predicate = Callable[[dict], bool]
+# Parsed query: ("and"|"or", left, right), ("not", node) or ("term", kind, arg).
+Node = tuple
+
+_TOKEN = re.compile(r"\s*(?:([&|!()])|([^&|!()]+))")
+_DUE_TERM = re.compile(r"^due(?: (before|after))?:? ?(.+)$")
+_PRIORITY = re.compile(r"^p([1-4])$")
+
+
+class UnsupportedFilter(ValueError):
+    """Raised when a query uses syntax the local evaluator does not handle."""
+
+
+@dataclass(frozen=True)
+class FilterContext:
+    """Per-evaluation inputs: the user's current time and the project tables."""
+
+    now: datetime
+    projects: dict
+    projects_by_name: dict
+
+    @property
+    def today(self) -> date:
+        return self.now.date()
+
+
+def _tokenize(query: str) -> list[str]:
+    if "," in query or "\\" in query:
+        # Comma-separated multi-list views and escapes stay server-side.
+        raise UnsupportedFilter(query)
+    tokens = []
+    for match in _TOKEN.finditer(query):
+        op, text = match.groups()
+        if op:
+            tokens.append(op)
+        elif text.strip():
+            tokens.append(" ".join(text.lower().split()))
+    return tokens
+
+
+def _term(text: str) -> Node:
+    """Classify one operand of the query, validating any date phrase."""
+    if text.startswith("##"):
+        return ("term", "project_tree", text[2:].strip())
+    if text.startswith("#"):
+        return ("term", "project", text[1:].strip())
+    if text.startswith("@"):
+        if "*" in text:
+            raise UnsupportedFilter(text)
+        return ("term", "label", text[1:].strip())
+    match = _PRIORITY.match(text)
+    if match:
+        # Filter p1 is the highest priority, which the API stores as 4.
+        return ("term", "priority", 5 - int(match.group(1)))
+    if text in ("overdue", "od"):
+        return ("term", "overdue", None)
+    if text in ("no date", "no due date"):
+        return ("term", "no_date", None)
+    if text.startswith("search:"):
+        return ("term", "search", text[7:].strip())
+
+    match = _DUE_TERM.match(text)
+    if match:
+        kind, phrase = "due_" + (match.group(1) or "on"), match.group(2)
+    else:
+        kind, phrase = "due_on", text
+    if kind == "due_on" and phrase in ("overdue", "no date"):
+        return _term(phrase)
+    # Validate against a fixed day; the real date is resolved at evaluation.
+    if resolve_date(phrase, date(2000, 1, 1)) is None:
+        raise UnsupportedFilter(text)
+    return ("term", kind, phrase)
+
+
+class _Parser:
+    """Recursive-descent parser: or-expr := and-expr ('|' and-expr)*, etc."""
+
+    def __init__(self, tokens: list[str]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise UnsupportedFilter("unexpected end of query")
+        self.pos += 1
+        return token
+
+    def parse(self) -> Node:
+        node = self._or()
+        if self._peek() is not None:
+            raise UnsupportedFilter(f"unexpected {self._peek()!r}")
+        return node
+
+    def _or(self) -> Node:
+        node = self._and()
+        while self._peek() == "|":
+            self._take()
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self) -> Node:
+        node = self._unary()
+        while self._peek() == "&":
+            self._take()
+            node = ("and", node, self._unary())
+        return node
+
+    def _unary(self) -> Node:
+        token = self._take()
+        if token == "!":
+            return ("not", self._unary())
+        if token == "(":
+            node = self._or()
+            if self._take() != ")":
+                raise UnsupportedFilter("unbalanced parentheses")
+            return node
+        if token in ("&", "|", ")"):
+            raise UnsupportedFilter(f"unexpected {token!r}")
+        return _term(token)
+
+
+@lru_cache(maxsize=256)
+def compile_filter(query: str) -> Optional[Node]:
+    """Parse a filter query, returning None if it must be evaluated remotely."""
+    try:
+        tokens = _tokenize(query)
+        if not tokens:
+            return None
+        return _Parser(tokens).parse()
+    except UnsupportedFilter:
+        return None
+
+
+def _project_ids(name: str, ctx: FilterContext, with_children: bool) -> set:
+    ids = set(ctx.projects_by_name.get(name, ()))
+    if with_children:
+        frontier = set(ids)
+        while frontier:
+            frontier = {pid for pid, p in ctx.projects.items() if p.get("parent_id") in frontier}
+            ids |= frontier
+    return ids
+
+
+def _term_predicate(kind: str, arg: Union[str, int, None], ctx: FilterContext) -> Predicate:
+    tz = ctx.now.tzinfo
+
+    def due_date(task: dict) -> Optional[date]:
+        return parse_due(task.get("due"), tz)[0]
+
+    def unparsed(task: dict) -> bool:
+        due = task.get("due")
+        return bool(due) and not due.get("date")
+
+    if kind == "overdue":
+        def overdue(task: dict) -> bool:
+            day, moment = parse_due(task.get("due"), tz)
+            if day is None:
+                return unparsed(task)
+            return moment < ctx.now if moment else day < ctx.today
+        return overdue
+    if kind == "no_date":
+        return lambda t: not t.get("due")
+    if kind == "priority":
+        return lambda t: t.get("priority") == arg
+    if kind == "label":
+        return lambda t: any(lb.lower() == arg for lb in t.get("labels") or ())
+    if kind == "search":
+        return lambda t: arg in t.get("content", "").lower()
+    if kind in ("project", "project_tree"):
+        ids = _project_ids(arg, ctx, kind == "project_tree")
+        return lambda t: t.get("project_id") in ids
+
+    day = resolve_date(arg, ctx.today)
+    if kind == "due_before":
+        return lambda t: (d := due_date(t)) is not None and d < day or unparsed(t)
+    if kind == "due_after":
+        return lambda t: (d := due_date(t)) is not None and d > day or unparsed(t)
+    return lambda t: due_date(t) == day or unparsed(t)
+
+
+def build_predicate(node: Node, ctx: FilterContext) -> Predicate:
+    """Turn a compiled query into a task predicate for the given context."""
+    op = node[0]
+    if op == "term":
+        return _term_predicate(node[1], node[2], ctx)
+    if op == "not":
+        inner = build_predicate(node[1], ctx)
+        return lambda t: not inner(t)
+    left, right = build_predicate(node[1], ctx), build_predicate(node[2], ctx)
+    if op == "and":
+        return lambda t: left(t) and right(t)
+    return lambda t: left(t) or right(t)
@@ -0,0 +1,394 @@
+"""
+Durable write journal for offline-first task creation and completion.
+
+create_task, create_reminder_task and complete_task append a Sync API
+command to a local SQLite journal (WAL mode, fsync on commit) and return
+right away, so a write costs a local disk commit instead of a Todoist round
+trip, and a reminder is not lost when the Pi is offline or Todoist is slow.
+New tasks get a provisional id ("local-...") until Todoist confirms them.
+
+A background worker replays pending entries in journal order, up to 100
+per Sync request. Each entry keeps the uuid it was journaled with, so a
+replay that is retried after an ambiguous network failure is de-duplicated
+by Todoist. Closes of the same task are coalesced, closes of tasks that
+are still queued are rewritten to the real id (or the temp_id in the same
+request), and confirmed item_add entries record the real task id.
+
+Network failures leave entries pending and back off; per-command errors
+from Todoist (e.g. an invalid project) mark the entry failed so it cannot
+block the queue. Entries are kept per account, and the worker replays each
+HTTP tenant's (see tenants.py) with that tenant's token. Set
+TODOIST_WRITE_QUEUE=off to send writes directly. The journal lives next to
+the metadata cache (see store.py), so TODOIST_CACHE_DIR=off disables it too.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from . import client, tenants
+from . import commands as _commands
+from .store import cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process replay serialization.
+    fcntl = None
+
+PROVISIONAL_PREFIX = "local-"
+MAX_BACKOFF = 60.0
+# Even when idle, look for entries journaled by other processes (the CLI,
+# an earlier stdio server that exited before replaying).
+IDLE_POLL = 30.0
+KEEP_DONE_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    args TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    real_id TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    done_at REAL
+);
+CREATE INDEX IF NOT EXISTS journal_by_state ON journal (account, state, seq);
+CREATE INDEX IF NOT EXISTS journal_by_target ON journal (target);
+"""
+
+
+def queue_enabled() -> bool:
+    """
+    Whether write tools should journal instead of calling Todoist directly.
+
+    On unless TODOIST_WRITE_QUEUE=off. Queued creates answer with a
+    provisional id and no url, and Todoist's errors only surface later in
+    status(); see create_task in server.py.
+    """
+    return os.environ.get("TODOIST_WRITE_QUEUE", "on").lower() not in ("off", "0", "false", "no")
+
+
+def is_provisional(task_id: str) -> bool:
+    return task_id.startswith(PROVISIONAL_PREFIX)
+
+
+class WriteJournal:
+    """Append-only SQLite journal of Sync API commands awaiting replay."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.last_replay_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.executescript(_SCHEMA)
+            conn.execute("PRAGMA synchronous = FULL")
+            self._conn = conn
+        return self._conn
+
+    def append(self, kind: str, args: dict, target: Optional[str] = None) -> str:
+        """
+        Durably journal one command for the current account.
+
+        Returns:
+            The entry's target: a new provisional task id for item_add, else
+            the task id the command applies to.
+        """
+        if target is None:
+            target = PROVISIONAL_PREFIX + uuid.uuid4().hex[:12]
+        row = (
+            client.account_key(), kind, target, json.dumps(args),
+            str(uuid.uuid4()), time.time(),
+        )
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO journal (account, kind, target, args, uuid, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+        return target
+
+    def real_id(self, target: str) -> Optional[str]:
+        """Return the confirmed Todoist id for a provisional id, if known."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT real_id FROM journal WHERE target = ? AND kind = 'item_add'"
+                " AND real_id IS NOT NULL",
+                (target,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def has_task(self, target: str) -> bool:
+        """Whether a provisional id was issued by this journal."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM journal WHERE target = ? AND kind = 'item_add'", (target,)
+            ).fetchone()
+        return row is not None
+
+    def pending_targets(self, targets: set) -> set:
+        """Those of targets (task ids) that still have a pending entry."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT DISTINCT target FROM journal WHERE account = ? AND state = 'pending'",
+                (client.account_key(),),
+            ).fetchall()
+        return {row[0] for row in rows} & set(targets)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM journal WHERE account = ? AND state = 'pending'",
+                (client.account_key(),),
+            ).fetchone()
+        return row[0]
+
+    def _file_lock(self):
+        """Serialize replay across processes sharing the journal."""
+        if fcntl is None:
+            return None
+        handle = open(self.path.with_suffix(".lock"), "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        return handle
+
+    def replay_once(self) -> int:
+        """
+        Send the next batch of pending entries to Todoist.
+
+        Returns:
+            How many entries were settled (done or failed); 0 if the queue is
+            empty or another process is replaying it.
+
+        Raises:
+            Whatever client.sync raises when Todoist cannot be reached; the
+            batch then stays pending.
+        """
+        with self._replay_lock:
+            lock = self._file_lock()
+            if lock is False:
+                return 0
+            try:
+                return self._replay_batch()
+            finally:
+                if lock is not None:
+                    lock.close()
+
+    def _replay_batch(self) -> int:
+        account = client.account_key()
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT seq, kind, target, args, uuid FROM journal"
+                " WHERE account = ? AND state = 'pending' ORDER BY seq LIMIT ?",
+                (account, _commands.MAX_COMMANDS_PER_REQUEST),
+            ).fetchall()
+        if not rows:
+            return 0
+
+        chunk: list[dict] = []
+        queued_adds = {target for _, kind, target, _, _ in rows if kind == "item_add"}
+        closes: dict[str, str] = {}  # task id -> uuid of the close actually sent
+        sent_as: dict[int, str] = {}  # seq -> uuid whose status applies
+        for seq, kind, target, args, cmd_uuid in rows:
+            args = json.loads(args)
+            if kind == "item_close":
+                task_id = target
+                if is_provisional(target) and target not in queued_adds:
+                    task_id = self.real_id(target) or target
+                if task_id in closes:
+                    sent_as[seq] = closes[task_id]
+                    continue
+                closes[task_id] = cmd_uuid
+                args = {**args, "id": task_id}
+            cmd = {"type": kind, "uuid": cmd_uuid, "args": args}
+            if kind == "item_add":
+                cmd["temp_id"] = target
+            chunk.append(cmd)
+            sent_as[seq] = cmd_uuid
+
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE journal SET attempts = attempts + 1 WHERE seq IN (%s)"
+                    % ",".join("?" * len(rows)),
+                    [row[0] for row in rows],
+                )
+        try:
+            statuses, temp_ids = _commands.send_chunk(chunk)
+        except Exception as e:
+            self.last_error = str(e)
+            with self._lock:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE journal SET error = ? WHERE seq IN (%s)"
+                        % ",".join("?" * len(rows)),
+                        [str(e)] + [row[0] for row in rows],
+                    )
+            raise
+
+        now = time.time()
+        updates = []
+        for seq, kind, target, _, _ in rows:
+            status = statuses.get(sent_as[seq], "missing from response")
+            if status == "ok":
+                real = temp_ids.get(target) if kind == "item_add" else None
+                updates.append(("done", real, None, now, seq))
+            else:
+                updates.append(("failed", None, status, now, seq))
+        with self._lock:
+            with self._connect() as conn:
+                conn.executemany(
+                    "UPDATE journal SET state = ?, real_id = ?, error = ?, done_at = ?"
+                    " WHERE seq = ?",
+                    updates,
+                )
+                conn.execute(
+                    "DELETE FROM journal WHERE state = 'done' AND done_at < ?",
+                    (now - KEEP_DONE_SECONDS,),
+                )
+        self.last_replay_at = now
+        self.last_error = None
+        return len(rows)
+
+    def replay_pending(self) -> int:
+        """Replay until the queue is empty; returns how many entries settled."""
+        settled = 0
+        while True:
+            count = self.replay_once()
+            if not count:
+                break
+            settled += count
+        if settled:
+            from . import querycache, replica
+
+            replica.settle_queued()
+            replica.invalidate()
+            # Replayed creates carry unresolved due strings: drop everything.
+            querycache.clear()
+        return settled
+
+    def status(self, recent: int = 5) -> dict:
+        """Queue depth, replay lag and the most recent failures."""
+        account = client.account_key()
+        with self._lock:
+            conn = self._connect()
+            counts = dict(conn.execute(
+                "SELECT state, COUNT(*) FROM journal WHERE account = ? GROUP BY state",
+                (account,),
+            ).fetchall())
+            oldest = conn.execute(
+                "SELECT MIN(created_at), MAX(attempts) FROM journal"
+                " WHERE account = ? AND state = 'pending'",
+                (account,),
+            ).fetchone()
+            failures = conn.execute(
+                "SELECT kind, target, args, error, created_at FROM journal"
+                " WHERE account = ? AND state = 'failed' ORDER BY seq DESC LIMIT ?",
+                (account, recent),
+            ).fetchall()
+        now = time.time()
+        return {
+            "pending": counts.get("pending", 0),
+            "failed": counts.get("failed", 0),
+            "replayed": counts.get("done", 0),
+            "replay_lag_seconds": round(now - oldest[0], 1) if oldest[0] else 0.0,
+            "max_attempts": oldest[1] or 0,
+            "last_replay_seconds_ago": (
+                round(now - self.last_replay_at, 1) if self.last_replay_at else None
+            ),
+            "last_error": self.last_error,
+            "recent_failures": [
+                {
+                    "kind": kind,
+                    "task_id": target,
+                    "content": json.loads(args).get("content"),
+                    "error": error,
+                    "queued_at": created_at,
+                }
+                for kind, target, args, error, created_at in failures
+            ],
+        }
+
+
+_journal: Optional[WriteJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> Optional[WriteJournal]:
+    """Return the process-wide journal, or None if the write queue is off."""
+    global _journal
+    directory = cache_dir()
+    if directory is None or not queue_enabled():
+        return None
+    with _journal_lock:
+        path = directory / "journal.sqlite3"
+        if _journal is None or _journal.path != path:
+            _journal = WriteJournal(path)
+        return _journal
+
+
+class _Worker:
+    """Background thread that replays the journal with exponential backoff."""
+
+    def __init__(self) -> None:
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def wake(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="todoist-journal", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while True:
+            self._wake.wait(backoff or IDLE_POLL)
+            self._wake.clear()
+            journal = get_journal()
+            if journal is None:
+                continue
+            failed = False
+            # Each account's entries are sent with its own token.
+            for tenant in tenants.everyone():
+                with tenants.use(tenant, touch=False):
+                    try:
+                        journal.replay_pending()
+                    except Exception:
+                        # Already recorded in journal.last_error; retry later.
+                        failed = True
+            backoff = min(max(backoff * 2, 1.0), MAX_BACKOFF) if failed else 0.0
+
+
+_worker = _Worker()
+
+
+def start_worker() -> None:
+    """Start (or nudge) the background replay worker."""
+    _worker.wake()
@@ -0,0 +1,183 @@
+"""
+Shaping of list-tool results: field selection, sorting and pagination.
+
+List tools return a page of tasks at a time (default 50) with a compact
+representation, so a user with hundreds of overdue tasks does not blow up
+the MCP payload or the model's context. Tasks are handled as compact
+records (see records.py); REST tasks are converted with rest_task_row().
+
+Cursors are opaque to callers. Each one records the position (an offset
+into the locally sorted result, or Todoist's own page cursor when pages are
+streamed from the REST API) and a fingerprint of the query and sort, so a
+cursor cannot silently be replayed against a different query.
+"""
+
+import base64
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from .records import TaskRecord, make_due
+
+DEFAULT_LIMIT = 50
+# Largest page the Todoist REST API serves.
+MAX_LIMIT = 200
+
+FIELDS = (
+    "id", "content", "due", "priority", "project_id", "project",
+    "labels", "description", "due_string", "url",
+)
+DEFAULT_FIELDS = ("id", "content", "due", "priority", "project_id")
+SORTS = ("priority", "due", "project")
+TASK_URL = "https://app.todoist.com/app/task"
+
+
+def check_fields(fields: Optional[list[str]]) -> tuple[str, ...]:
+    """Validate requested fields; None means DEFAULT_FIELDS."""
+    if not fields:
+        return DEFAULT_FIELDS
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(FIELDS)}")
+    return tuple(dict.fromkeys(["id", *fields]))
+
+
+def check_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_LIMIT
+    return min(max(int(limit), 1), MAX_LIMIT)
+
+
+def check_sort(sort: Optional[str]) -> Optional[str]:
+    if sort and sort not in SORTS:
+        raise ValueError(f"Unknown sort {sort!r}; choose from {', '.join(SORTS)}")
+    return sort or None
+
+
+def _fingerprint(query: str, sort: Optional[str]) -> str:
+    return hashlib.sha256(f"{query}\0{sort}".encode()).hexdigest()[:8]
+
+
+def encode_cursor(query: str, sort: Optional[str], **position: Any) -> str:
+    payload = {"q": _fingerprint(query, sort), **position}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], query: str, sort: Optional[str]) -> dict:
+    """Return the position stored in a cursor ({} for the first page)."""
+    if not cursor:
+        return {}
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+    if payload.pop("q", None) != _fingerprint(query, sort):
+        raise ValueError("Cursor belongs to a different query or sort; start without a cursor")
+    return payload
+
+
+def compact_due(due: Optional[dict]) -> Optional[str]:
+    """Return the due date as ISO "YYYY-MM-DD" or "YYYY-MM-DDTHH:MM:SS[Z]"."""
+    return due.get("date") if due else None
+
+
+def as_of(timestamp: float) -> str:
+    """Format when a result was computed, as an ISO UTC timestamp."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _due_date(value: Any) -> str:
+    """
+    A REST due date in the Sync API's form.
+
+    "YYYY-MM-DD", "YYYY-MM-DDTHH:MM:SS" (floating) or "YYYY-MM-DDTHH:MM:SSZ"
+    (fixed timezone, in UTC), which is what dates.parse_due_date reads.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return value.isoformat(timespec="seconds")
+    return value.isoformat()
+
+
+def task_url(task_id: str, content: Optional[str]) -> str:
+    """The task's link in the Todoist web app, as the app itself slugs it."""
+    if not content:
+        return f"{TASK_URL}/{task_id}"
+    slug = unicodedata.normalize("NFKD", content).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[-\s]+", "-", re.sub(r"[^\w\s-]", "", slug.lower())).strip("-_")
+    return f"{TASK_URL}/{slug}-{task_id}"
+
+
+def rest_task_row(task: Any) -> TaskRecord:
+    """Convert a REST task (JSON row or Task model) into the record type the replica holds."""
+    if isinstance(task, dict):
+        from todoist_api_python.models import Task
+
+        task = Task.from_dict(task)
+    due = None
+    if task.due:
+        due = make_due(
+            _due_date(task.due.date), task.due.string,
+            task.due.is_recurring, getattr(task.due, "timezone", None),
+        )
+    return TaskRecord(
+        id=task.id,
+        content=task.content,
+        description=task.description,
+        project_id=task.project_id,
+        section_id=task.section_id,
+        parent_id=task.parent_id,
+        labels=task.labels,
+        priority=task.priority,
+        child_order=task.order,
+        due=due,
+    )
+
+
+def sort_key(sort: str, project_key: Callable[[Optional[str]], Any]) -> Callable[[dict], Any]:
+    """
+    Key function for a sort order.
+
+    priority: most urgent first; due: earliest first, undated last;
+    project: by project_key(project_id). Ties keep Todoist order.
+    """
+
+    def due_key(task: dict) -> tuple:
+        due = compact_due(task.get("due"))
+        return (due is None, due or "")
+
+    def order(task: dict) -> tuple:
+        return (task.get("child_order", 0), task["id"])
+
+    if sort == "priority":
+        return lambda t: (-(t.get("priority") or 1), due_key(t), order(t))
+    if sort == "due":
+        return lambda t: (due_key(t), -(t.get("priority") or 1), order(t))
+    return lambda t: (project_key(t.get("project_id")), order(t))
+
+
+def shape(task: dict, fields: tuple[str, ...], project_path: Callable[[str], Optional[str]]) -> dict:
+    """Project a task dict onto the requested fields."""
+    due = task.get("due")
+    row: dict = {}
+    for name in fields:
+        if name == "due":
+            row["due"] = compact_due(due)
+            if due and due.get("is_recurring"):
+                row["recurring"] = True
+        elif name == "due_string":
+            row["due_string"] = due.get("string") if due else None
+        elif name == "project":
+            row["project"] = project_path(task.get("project_id"))
+        elif name == "url":
+            row["url"] = task_url(task["id"], task["content"])
+        elif name == "labels":
+            row["labels"] = list(task.get("labels") or ())
+        else:
+            row[name] = task.get(name)
+    return row
@@ -0,0 +1,301 @@
+"""
+In-process metrics for MCP tools and upstream Todoist requests.
+
+Records, per tool: calls, errors (a raised exception or success=false),
+latency and response payload size; per upstream endpoint: requests by
+status, retries, latency and response size; hit/miss counts for the
+local caches; and calls coalesced into an identical in-flight request.
+Exposed three ways:
+
+- Prometheus text format on GET /metrics when serving with --http;
+- the get_server_stats MCP tool;
+- `python run.py stats` (the daemon's numbers when one is running).
+
+Upstream requests can also be wrapped in OpenTelemetry spans: set
+TODOIST_OTEL=on and install opentelemetry-api (plus whatever SDK/exporter
+you configure). Without it, no OpenTelemetry code is imported.
+
+Standard library only; it is imported on every path, including the CLI.
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_ID_SEGMENT = re.compile(r"\d")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (max if beyond the last)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Registry:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, Histogram] = {}
+
+    def inc(self, name: str, labels: dict, amount: float = 1.0) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: dict, value: float, buckets: tuple) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+
+_registry = Registry()
+
+
+def endpoint_of(url: str) -> str:
+    """Reduce a request URL to a low-cardinality label: /api/v1/tasks/{id}/close."""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    path = "/" + path.split("/", 1)[1] if "/" in path else "/"
+    return "/".join("{id}" if _ID_SEGMENT.search(seg) and i > 2 else seg
+                    for i, seg in enumerate(path.split("/")))
+
+
+def observe_tool(tool: str, seconds: float, ok: bool, payload_bytes: int) -> None:
+    labels = {"tool": tool}
+    _registry.inc("tool_calls_total", labels)
+    if not ok:
+        _registry.inc("tool_errors_total", labels)
+    _registry.observe("tool_duration_seconds", labels, seconds, LATENCY_BUCKETS)
+    _registry.observe("tool_response_bytes", labels, payload_bytes, SIZE_BUCKETS)
+
+
+def observe_upstream(
+    endpoint: str, method: str, status: str, seconds: float, retries: int, response_bytes: int
+) -> None:
+    _registry.inc("upstream_requests_total", {"endpoint": endpoint, "method": method, "status": status})
+    if retries:
+        _registry.inc("upstream_retries_total", {"endpoint": endpoint}, retries)
+    labels = {"endpoint": endpoint}
+    _registry.observe("upstream_duration_seconds", labels, seconds, LATENCY_BUCKETS)
+    _registry.observe("upstream_response_bytes", labels, response_bytes, SIZE_BUCKETS)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a lookup in one of the local caches (replica, metadata, ...)."""
+    _registry.inc("cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+
+
+def record_coalesced(call: str) -> None:
+    """Count a call that waited for an identical one instead of going upstream."""
+    _registry.inc("coalesced_calls_total", {"call": call})
+
+
+_tracer: Any = None
+_tracer_checked = False
+
+
+def _get_tracer() -> Any:
+    global _tracer, _tracer_checked
+    if not _tracer_checked:
+        _tracer_checked = True
+        if os.environ.get("TODOIST_OTEL", "").lower() in ("1", "on", "true", "yes"):
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                pass
+            else:
+                _tracer = trace.get_tracer("todoist_mcp")
+    return _tracer
+
+
+@contextmanager
+def upstream_span(method: str, endpoint: str) -> Iterator[Any]:
+    """OpenTelemetry client span around an upstream request, if enabled."""
+    tracer = _get_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(
+        f"todoist {method} {endpoint}",
+        attributes={"http.request.method": method, "url.template": endpoint},
+    ) as span:
+        yield span
+
+
+def _label_text(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+_HELP = {
+    "tool_calls_total": ("counter", "MCP tool calls"),
+    "tool_errors_total": ("counter", "MCP tool calls that raised or returned success=false"),
+    "tool_duration_seconds": ("histogram", "MCP tool latency"),
+    "tool_response_bytes": ("histogram", "Size of MCP tool results as JSON"),
+    "upstream_requests_total": ("counter", "Requests to Todoist by endpoint and final status"),
+    "upstream_retries_total": ("counter", "Retried attempts of requests to Todoist"),
+    "upstream_duration_seconds": ("histogram", "Todoist request latency including retries"),
+    "upstream_response_bytes": ("histogram", "Size of Todoist response bodies"),
+    "cache_requests_total": ("counter", "Local cache lookups by result"),
+    "coalesced_calls_total": ("counter", "Calls that shared an identical in-flight request"),
+}
+
+
+def render_prometheus(prefix: str = "todoist_mcp_") -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    with _registry._lock:
+        counters = sorted(_registry.counters.items())
+        histograms = sorted(
+            (key, (h.buckets, list(h.counts), h.count, h.sum))
+            for key, h in _registry.histograms.items()
+        )
+    lines: list[str] = []
+    described: set[str] = set()
+
+    def describe(name: str) -> None:
+        if name not in described:
+            described.add(name)
+            kind, text = _HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {prefix}{name} {text}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+    for (name, labels), value in counters:
+        describe(name)
+        lines.append(f"{prefix}{name}{_label_text(labels)} {value:g}")
+    for (name, labels), (buckets, counts, count, total) in histograms:
+        describe(name)
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{prefix}{name}_bucket{_label_text(labels + (('le', f'{bound:g}'),))} {cumulative}")
+        lines.append(f"{prefix}{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{prefix}{name}_sum{_label_text(labels)} {total:g}")
+        lines.append(f"{prefix}{name}_count{_label_text(labels)} {count}")
+    lines.append(f"# TYPE {prefix}uptime_seconds gauge")
+    lines.append(f"{prefix}uptime_seconds {time.time() - _registry.started:.1f}")
+    return "\n".join(lines) + "\n"
+
+
+def _latency_summary(h: Histogram) -> dict:
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "count": h.count,
+        "mean_ms": ms(h.sum / h.count) if h.count else None,
+        "p50_ms": ms(h.quantile(0.5)),
+        "p95_ms": ms(h.quantile(0.95)),
+        "max_ms": ms(h.max),
+    }
+
+
+def snapshot() -> dict:
+    """Summarize all metrics as JSON-friendly dicts (for get_server_stats)."""
+    with _registry._lock:
+        counters = dict(_registry.counters)
+        histograms = dict(_registry.histograms)
+        started = _registry.started
+
+    def counter(name: str, **labels: str) -> float:
+        return counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    tools: dict[str, dict] = {}
+    upstream: dict[str, dict] = {}
+    for (name, labels), h in histograms.items():
+        label = dict(labels)
+        if name == "tool_duration_seconds":
+            tool = label["tool"]
+            tools.setdefault(tool, {}).update(
+                calls=int(counter("tool_calls_total", tool=tool)),
+                errors=int(counter("tool_errors_total", tool=tool)),
+                latency=_latency_summary(h),
+            )
+        elif name == "tool_response_bytes":
+            tools.setdefault(label["tool"], {})["mean_response_bytes"] = int(h.sum / h.count)
+        elif name == "upstream_duration_seconds":
+            endpoint = label["endpoint"]
+            upstream.setdefault(endpoint, {}).update(
+                retries=int(counter("upstream_retries_total", endpoint=endpoint)),
+                latency=_latency_summary(h),
+            )
+        elif name == "upstream_response_bytes":
+            upstream.setdefault(label["endpoint"], {})["mean_response_bytes"] = int(h.sum / h.count)
+    for (name, labels), value in counters.items():
+        if name == "upstream_requests_total":
+            label = dict(labels)
+            statuses = upstream.setdefault(label["endpoint"], {}).setdefault("requests", {})
+            statuses[label["status"]] = statuses.get(label["status"], 0) + int(value)
+
+    caches: dict[str, dict] = {}
+    for (name, labels), value in counters.items():
+        if name == "cache_requests_total":
+            label = dict(labels)
+            caches.setdefault(label["cache"], {"hit": 0, "miss": 0})[label["result"]] = int(value)
+    for entry in caches.values():
+        lookups = entry["hit"] + entry["miss"]
+        entry["hit_ratio"] = round(entry["hit"] / lookups, 3) if lookups else None
+    coalesced = {
+        dict(labels)["call"]: int(value)
+        for (name, labels), value in counters.items() if name == "coalesced_calls_total"
+    }
+
+    return {
+        "uptime_seconds": round(time.time() - started, 1),
+        "tools": tools,
+        "upstream": upstream,
+        "caches": caches,
+        "coalesced": coalesced,
+    }
+
+
+def reset() -> None:
+    """Clear all metrics (for benchmarks)."""
+    _registry.reset()
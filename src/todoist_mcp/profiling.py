@@ -0,0 +1,127 @@
+"""
+Startup-time profiling for the stdio server and the CLI.
+
+Backs `python run.py --profile-startup [server|cli]`. Imports are measured
+in a fresh interpreter with `-X importtime` and summarized per top-level
+package; for the server target the time until the first MCP `initialize`
+response is measured too, since that is what nanobot waits for on every
+conversation.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+_SRC_DIR = Path(__file__).resolve().parent.parent
+
+# What each entry point imports before it can do useful work.
+TARGETS = {
+    "server": "import todoist_mcp.server as s; s.mcp",
+    "cli": "import todoist_mcp.daemon, todoist_mcp.server, todoist_mcp.client",
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_SRC_DIR), env.get("PYTHONPATH")]))
+    return env
+
+
+def import_profile(code: str, top: int = 10) -> dict:
+    """
+    Run code in a fresh interpreter with -X importtime and summarize it.
+
+    Returns:
+        Total import time, the heaviest top-level packages and the slowest
+        individual modules (by self time), all in milliseconds.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=_env(),
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    by_package: dict[str, int] = {}
+    for name, self_us, _ in modules:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    def ms(us: int) -> float:
+        return round(us / 1000, 1)
+
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "total_ms": ms(sum(self_us for _, self_us, _ in modules)),
+        "modules_imported": len(modules),
+        "by_package": [
+            {"package": package, "ms": ms(us)}
+            for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+        ],
+        "slowest_modules": [
+            {"module": name, "self_ms": ms(self_us), "cumulative_ms": ms(cumulative_us)}
+            for name, self_us, cumulative_us in sorted(modules, key=lambda m: -m[1])[:top]
+        ],
+    }
+
+
+def time_to_initialize(run_py: Path, timeout: float = 60.0) -> Optional[float]:
+    """Spawn the stdio server and return seconds until it answers `initialize`."""
+    request = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2025-06-18",
+            "capabilities": {},
+            "clientInfo": {"name": "profile-startup", "version": "1.0"},
+        },
+    }
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(run_py)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, env=_env(),
+    )
+    answered: list[float] = []
+
+    def wait_for_response() -> None:
+        for line in proc.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("id") == 1:
+                answered.append(time.perf_counter() - started)
+                return
+
+    try:
+        proc.stdin.write(json.dumps(request) + "\n")
+        proc.stdin.flush()
+        reader = threading.Thread(target=wait_for_response, daemon=True)
+        reader.start()
+        reader.join(timeout)
+        return round(answered[0], 3) if answered else None
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def profile_startup(target: str, run_py: Path) -> dict:
+    """Profile the "server" or "cli" startup path."""
+    if target not in TARGETS:
+        return {"success": False, "error": f"Unknown target: {target} (use server or cli)"}
+    result = {"success": True, "target": target, "imports": import_profile(TARGETS[target])}
+    if target == "server":
+        result["initialize_seconds"] = time_to_initialize(run_py)
+    return result
@@ -0,0 +1,90 @@
+"""
+Project-name resolution index.
+
+Lets tools accept a project name or path ("Work", "work/clients") instead of
+an opaque id. Lookups try, in order: exact id, exact path or name
+(case-insensitive), unique prefix, then a close fuzzy match.
+"""
+
+import difflib
+from dataclasses import dataclass, field
+from typing import Optional
+
+FUZZY_CUTOFF = 0.75
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _normalize_path(text: str) -> str:
+    return "/".join(_normalize(part) for part in text.split("/") if part.strip())
+
+
+@dataclass
+class Resolution:
+    """Result of a lookup: the project id, or the ambiguous candidates."""
+
+    project_id: Optional[str] = None
+    candidates: list[str] = field(default_factory=list)
+
+
+class ProjectIndex:
+    """Name, path and prefix index over an id -> project mapping."""
+
+    def __init__(self, projects: dict) -> None:
+        self.projects = projects
+        self.by_name: dict[str, list[str]] = {}
+        self.by_path: dict[str, str] = {}
+        self.paths: dict[str, str] = {}
+        for pid, project in projects.items():
+            self.by_name.setdefault(_normalize(project.get("name", "")), []).append(pid)
+            path = self._path(pid)
+            self.paths[pid] = path
+            self.by_path[_normalize_path(path)] = pid
+
+    def _path(self, pid: str) -> str:
+        parts, seen = [], set()
+        while pid in self.projects and pid not in seen:
+            seen.add(pid)
+            project = self.projects[pid]
+            parts.append(project.get("name", ""))
+            pid = project.get("parent_id")
+        return "/".join(reversed(parts))
+
+    def _single(self, ids: list[str]) -> Resolution:
+        if len(ids) == 1:
+            return Resolution(project_id=ids[0])
+        return Resolution(candidates=sorted(self.paths[i] for i in ids))
+
+    def resolve(self, query: str) -> Resolution:
+        """Resolve a name, path or id; see Resolution for the outcome."""
+        if query in self.projects:
+            return Resolution(project_id=query)
+        key = _normalize_path(query)
+        if not key:
+            return Resolution()
+        if "/" in key:
+            if key in self.by_path:
+                return Resolution(project_id=self.by_path[key])
+            keys = self.by_path
+            # Allow a prefix on the last segment: "work/cli" -> "Work/Clients".
+            prefix = [pid for path, pid in keys.items() if path.startswith(key)]
+        else:
+            if key in self.by_name:
+                return self._single(self.by_name[key])
+            keys = self.by_name
+            prefix = [pid for name, ids in keys.items() if name.startswith(key) for pid in ids]
+        if prefix:
+            return self._single(prefix)
+
+        close = difflib.get_close_matches(key, list(keys), n=1, cutoff=FUZZY_CUTOFF)
+        if not close:
+            return Resolution()
+        if "/" in key:
+            return Resolution(project_id=keys[close[0]])
+        return self._single(keys[close[0]])
+
+    def path_of(self, project_id: str) -> Optional[str]:
+        """Return the "Parent/Child" path of a project id."""
+        return self.paths.get(project_id)
@@ -0,0 +1,297 @@
+"""
+Short-lived cache of list-tool results, keyed by normalized filter query.
+
+A single agent turn often asks overlapping questions back to back
+(list_tasks_today, then list_tasks_by_filter("due: today")). The rows that
+match each distinct query are kept for TODOIST_RESULT_CACHE_TTL seconds
+(default 10, 0 disables the cache) in an LRU of at most
+TODOIST_RESULT_CACHE_SIZE entries (default 64). Repeats skip the replica
+scan or the Todoist round trip. Sorting, paging and field selection are
+applied on top of the cached rows, so they all share one entry.
+
+Queries the local filter evaluator understands are keyed by their parsed
+form, so "today", "due: today" and "due today" share an entry. Other
+queries are keyed by their case- and whitespace-folded text.
+
+An entry is dropped as soon as something it may depend on changes:
+    - a write in this process (see discard());
+    - a replica sync or webhook push that touched one of its tasks, or
+      brought in a task its filter now matches;
+    - any project change, or a token rotation.
+Results Todoist computed (queries the evaluator does not handle) cannot be
+checked against a changed task, so any task change drops them.
+
+Results are also saved to the shared on-disk cache (see store.py), tagged
+with the replica version they were computed from, so other server and CLI
+processes of the account reuse them until they expire or anything changes.
+Entries loaded from there have no local predicate, so any task change
+drops them. While writes are queued (see journal.py) the shared entries are
+neither used nor saved, as they cannot reflect this process's queued
+writes. Changes saved by other processes reach the in-memory entries too:
+each lookup first catches the replica up, which drops what they touch.
+
+Each HTTP tenant (see tenants.py) has a cache of its own. The agenda
+scheduler (see agenda.py) stores its precomputed lists here too, with a
+longer lifetime of their own.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Hashable, Iterable, Optional
+
+from . import client, metrics, replica, tenants
+from .filters import compile_filter
+from .records import TaskRecord
+from .store import get_store
+
+DEFAULT_TTL = 10.0
+DEFAULT_SIZE = 64
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+@dataclass
+class Entry:
+    """Rows matching one query (or one Todoist page of it)."""
+
+    rows: list[dict]
+    # Local filter predicate; None for results computed by Todoist.
+    predicate: Optional[Callable[[dict], bool]] = None
+    # Todoist's cursor for the page after this one (streamed remote pages).
+    next_page: Optional[str] = None
+    expires: float = 0.0
+    ids: frozenset = field(default_factory=frozenset)
+    # Wall-clock time the rows were computed (epoch seconds).
+    as_of: float = field(default_factory=time.time)
+
+
+def normalize(query: str) -> Hashable:
+    """Cache key for a filter query; equivalent spellings map to one key."""
+    compiled = compile_filter(query)
+    if compiled is not None:
+        return ("local", compiled)
+    return ("remote", " ".join(query.lower().split()))
+
+
+def _generation() -> int:
+    client.get_session()
+    return client.client_generation()
+
+
+def _unresolved(task: dict) -> bool:
+    """True for a row whose due date Todoist has not parsed yet."""
+    due = task.get("due")
+    return bool(due) and not due.get("date")
+
+
+class ResultCache:
+    """TTL + LRU map from normalized query to its matching rows."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._generation: Optional[int] = None
+
+    def get(self, key: Hashable) -> Optional[Entry]:
+        """Return the live entry for key, or None (expired, evicted, disabled)."""
+        if _env_number("TODOIST_RESULT_CACHE_TTL", DEFAULT_TTL) <= 0 and not self._entries:
+            return None
+        generation = _generation()
+        replica.catch_up()
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = _load_shared(key)
+            if entry is not None:
+                with self._lock:
+                    self._entries[key] = entry
+        metrics.record_cache("results", entry is not None)
+        return entry
+
+    def put(
+        self,
+        key: Hashable,
+        rows: list[dict],
+        predicate: Optional[Callable[[dict], bool]] = None,
+        next_page: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> Entry:
+        """
+        Store rows under key and return the entry (also when disabled).
+
+        ttl overrides TODOIST_RESULT_CACHE_TTL for this entry.
+        """
+        if ttl is None:
+            ttl = _env_number("TODOIST_RESULT_CACHE_TTL", DEFAULT_TTL)
+        entry = Entry(
+            rows=rows,
+            predicate=predicate,
+            next_page=next_page,
+            expires=time.monotonic() + ttl,
+            ids=frozenset(t["id"] for t in rows),
+        )
+        if ttl <= 0:
+            return entry
+        size = max(int(_env_number("TODOIST_RESULT_CACHE_SIZE", DEFAULT_SIZE)), 1)
+        generation = _generation()
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+        _save_shared(key, entry, ttl)
+        return entry
+
+    def _check_generation(self, generation: int) -> None:
+        """Forget everything cached for a previous token (call with the lock held)."""
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def discard(self, task_ids: Iterable[str] = (), tasks: Iterable[dict] = ()) -> int:
+        """
+        Drop the entries a task change may affect.
+
+        Args:
+            task_ids: Tasks that were completed, deleted or edited.
+            tasks: Current rows of new or edited tasks; entries whose filter
+                matches one of them are dropped too.
+
+        Returns:
+            How many entries were dropped.
+        """
+        task_ids = set(task_ids)
+        tasks = list(tasks)
+        if any(_unresolved(t) for t in tasks):
+            return self.clear()
+        task_ids.update(t["id"] for t in tasks)
+        if not task_ids:
+            return 0
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.predicate is None
+                or not entry.ids.isdisjoint(task_ids)
+                or any(_matches(entry.predicate, t) for t in tasks)
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        return dropped
+
+    def on_change(self, task_ids: Optional[set], project_ids: Optional[set]) -> None:
+        """Replica listener: drop what a sync or push invalidated."""
+        if task_ids is replica.ALL or project_ids is replica.ALL or project_ids:
+            self.clear()
+        elif task_ids:
+            self.discard(task_ids, replica.get_tasks(task_ids))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _matches(predicate: Callable[[dict], bool], task: dict) -> bool:
+    try:
+        return bool(predicate(task))
+    except Exception:
+        return True  # When in doubt, drop the entry.
+
+
+def _load_shared(key: Hashable) -> Optional[Entry]:
+    """The entry another process saved for key, if still current."""
+    store = get_store()
+    if store is None or replica.has_queued():
+        return None
+    try:
+        saved = store.load_result(client.account_key(), repr(key))
+    except (sqlite3.Error, OSError, ValueError):
+        return None
+    if saved is None:
+        return None
+    rows = [TaskRecord.from_sync(row) for row in saved["rows"]]
+    return Entry(
+        rows=rows,
+        next_page=saved["next_page"],
+        expires=time.monotonic() + saved["expires_at"] - time.time(),
+        ids=frozenset(t["id"] for t in rows),
+        as_of=saved["as_of"],
+    )
+
+
+def _save_shared(key: Hashable, entry: Entry, ttl: float) -> None:
+    store = get_store()
+    if store is None or replica.has_queued():
+        return
+    try:
+        store.save_result(
+            client.account_key(), repr(key), replica.shared_version(),
+            [t.to_dict() for t in entry.rows], entry.next_page, time.time() + ttl, entry.as_of,
+        )
+    except (sqlite3.Error, OSError):
+        pass
+
+
+_cache = ResultCache()
+
+
+def _current() -> ResultCache:
+    """The cache of the account the running tool call serves."""
+    cache = tenants.local("results", ResultCache)
+    return _cache if cache is None else cache
+
+
+def _on_change(task_ids: Optional[set], project_ids: Optional[set]) -> None:
+    _current().on_change(task_ids, project_ids)
+
+
+replica.subscribe(_on_change)
+
+
+def get(key: Hashable) -> Optional[Entry]:
+    return _current().get(key)
+
+
+def put(
+    key: Hashable,
+    rows: list[dict],
+    predicate: Optional[Callable[[dict], bool]] = None,
+    next_page: Optional[str] = None,
+    ttl: Optional[float] = None,
+) -> Entry:
+    return _current().put(key, rows, predicate, next_page, ttl)
+
+
+def discard(task_ids: Iterable[str] = (), tasks: Iterable[dict] = ()) -> int:
+    """Drop the entries affected by a write; see ResultCache.discard."""
+    return _current().discard(task_ids, tasks)
+
+
+def clear() -> int:
+    """Drop every cached result."""
+    return _current().clear()
+
+
+def size() -> int:
+    return len(_current())
@@ -0,0 +1,164 @@
+"""
+Compact in-memory task records.
+
+The replica keeps every active task of the account in memory. As Sync API
+dicts each task carries two dozen keys, most of which no tool reads, and
+for accounts with tens of thousands of tasks that dominates the process's
+memory. TaskRecord keeps only the fields the tools use, in __slots__.
+Project ids, labels, due dates and due strings are interned, so tasks that
+share them share one object. Identical due objects are shared as well.
+
+Records answer task["key"] and task.get("key") like the dicts they
+replace, so filters, sorting and shaping work on either. REST Task models
+from list pages are converted straight into records (see
+listing.rest_task_row), so only one copy of each task is held.
+"""
+
+import sys
+import weakref
+from datetime import tzinfo
+from typing import Any, Iterable, Optional
+
+from .dates import parse_due_date
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+_label_sets: dict[tuple, tuple] = {}
+
+
+def _labels(labels: Optional[Iterable[str]]) -> tuple:
+    """Return a shared tuple of interned label names."""
+    key = tuple(_intern(label) for label in labels or ())
+    return _label_sets.setdefault(key, key)
+
+
+class _Fields:
+    """Dict-style read access to __slots__ fields."""
+
+    __slots__ = ()
+    _names: frozenset = frozenset()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Hot path for filter predicates: every slot is always set.
+        return getattr(self, key, default) if key in self._names else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._names:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._names
+
+    def to_dict(self) -> dict:
+        return {
+            name: value.to_dict() if isinstance(value, _Fields) else
+            list(value) if isinstance(value, tuple) else value
+            for name in self.__slots__ if name in self._names
+            for value in (getattr(self, name),)
+        }
+
+
+class Due(_Fields):
+    """A task's due date; immutable and shared between tasks."""
+
+    __slots__ = ("date", "string", "is_recurring", "timezone", "_parsed", "__weakref__")
+    _names = frozenset(("date", "string", "is_recurring", "timezone"))
+
+    def __init__(self, date: Optional[str], string: str, is_recurring: bool, timezone: Optional[str]) -> None:
+        self.date = date
+        self.string = string
+        self.is_recurring = is_recurring
+        self.timezone = timezone
+        self._parsed: Optional[tuple] = None
+
+    def parsed(self, tz: tzinfo) -> tuple:
+        """dates.parse_due() of this due, computed once per timezone."""
+        if not self.date:
+            return None, None
+        cached = self._parsed
+        if cached is None or cached[0] != tz:
+            cached = self._parsed = (tz, parse_due_date(self.date, tz))
+        return cached[1]
+
+
+_dues: "weakref.WeakValueDictionary[tuple, Due]" = weakref.WeakValueDictionary()
+
+
+def make_due(
+    date: Optional[str], string: Optional[str] = None,
+    is_recurring: bool = False, timezone: Optional[str] = None,
+) -> Optional[Due]:
+    """
+    Return the shared Due for these values (None without a date or string).
+
+    Only a queued task (see replica.py) has a string but no date: its due
+    phrase is still to be parsed.
+    """
+    if not date and not string:
+        return None
+    key = (date, string, bool(is_recurring), timezone)
+    due = _dues.get(key)
+    if due is None:
+        due = Due(_intern(date), _intern(string), bool(is_recurring), _intern(timezone))
+        _dues[key] = due
+    return due
+
+
+class TaskRecord(_Fields):
+    """One active task, holding only what the tools read."""
+
+    __slots__ = (
+        "id", "content", "description", "project_id", "section_id",
+        "parent_id", "labels", "priority", "child_order", "due",
+    )
+    _names = frozenset(__slots__)
+
+    def __init__(
+        self,
+        id: str,
+        content: str,
+        description: str = "",
+        project_id: Optional[str] = None,
+        section_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        labels: Optional[Iterable[str]] = None,
+        priority: int = 1,
+        child_order: int = 0,
+        due: Optional[Due] = None,
+    ) -> None:
+        self.id = id
+        self.content = content
+        self.description = description or ""
+        self.project_id = _intern(project_id)
+        self.section_id = _intern(section_id)
+        self.parent_id = parent_id
+        self.labels = _labels(labels)
+        self.priority = priority
+        self.child_order = child_order
+        self.due = due
+
+    @classmethod
+    def from_sync(cls, item: dict) -> "TaskRecord":
+        """Build a record from a Sync API item (or webhook event_data)."""
+        due = item.get("due") or {}
+        return cls(
+            id=item["id"],
+            content=item.get("content", ""),
+            description=item.get("description"),
+            project_id=item.get("project_id"),
+            section_id=item.get("section_id"),
+            parent_id=item.get("parent_id"),
+            labels=item.get("labels"),
+            priority=item.get("priority") or 1,
+            child_order=item.get("child_order") or 0,
+            due=make_due(
+                due.get("date"), due.get("string"), due.get("is_recurring", False), due.get("timezone")
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return f"TaskRecord(id={self.id!r}, content={self.content!r})"
@@ -0,0 +1,637 @@
+"""
+Local replica of the user's Todoist tasks, projects and labels.
+
+The first read does a full Sync API fetch; later reads only pull the delta
+since the stored sync_token. Reads are served from memory as long as the
+replica is younger than TODOIST_REPLICA_MAX_AGE seconds (default 30), and
+successful writes mark it stale so the next read picks up the change.
+
+The replica is also kept in the on-disk store (see store.py), shared by
+every server and CLI process of the account. A freshly started process
+loads it instead of fetching everything: metadata reads are answered
+immediately and revalidated in the background, and task reads only need a
+delta sync, or none if another process synced recently. Before serving from
+memory each read picks up what other processes saved since (catch_up()).
+
+Changes can also be pushed in (Todoist webhooks, see webhooks.py). Once a
+push has arrived the replica is known to be kept current, so reads trust it
+for TODOIST_WEBHOOK_MAX_AGE seconds (default 600) instead of 30. Listeners
+registered with subscribe() hear which task and project ids changed, from
+pushes and syncs alike.
+
+Writes waiting in the write queue (see journal.py) are overlaid on the
+synced tasks until they are replayed: queued tasks are listed under their
+provisional id (until their real row has been synced in) and queued
+completions are hidden, so the agent never sees its own write missing. A
+queued task whose due phrase could not be resolved locally (the timezone
+was not known yet, or the phrase is recurring) keeps the phrase; it is
+resolved once the timezone is known, and until then the local filters let
+it match any due term (see filters.py).
+
+Each HTTP tenant (see tenants.py) has its own replica; the module functions
+below act on the one for the account the current tool call serves.
+"""
+
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Optional
+
+from . import client, metrics, tenants
+from .dates import get_tz, parse_due_phrase
+from .projects import ProjectIndex, Resolution
+from .records import TaskRecord, make_due
+from .store import METADATA_KINDS, SharedState, get_store
+
+DEFAULT_MAX_AGE = 30.0
+DEFAULT_PUSH_MAX_AGE = 600.0
+RESOURCE_TYPES = ["items", "projects", "sections", "labels", "user"]
+
+
+def _env_seconds(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def _max_age() -> float:
+    return _env_seconds("TODOIST_REPLICA_MAX_AGE", DEFAULT_MAX_AGE)
+
+
+def _task_removed(task: dict) -> bool:
+    return bool(task.get("is_deleted") or task.get("checked"))
+
+
+def _project_removed(project: dict) -> bool:
+    return bool(project.get("is_deleted") or project.get("is_archived"))
+
+
+# Passed to listeners when every id may have changed (full sync, token rotation).
+ALL = None
+
+
+def _user_summary(user: dict) -> dict:
+    """The part of the user resource kept in the snapshot (no token or e-mail)."""
+    return {"id": user.get("id"), "tz_info": user.get("tz_info")}
+
+
+def _merge(
+    target: dict, rows: list[dict], removed: Callable[[dict], bool],
+    make: Optional[Callable[[dict], Any]] = None,
+) -> None:
+    """Apply a list of sync rows to an id-keyed collection (converted by make)."""
+    for row in rows:
+        if removed(row):
+            target.pop(row["id"], None)
+        else:
+            target[row["id"]] = make(row) if make else row
+
+
+class Replica:
+    """In-memory copy of Todoist state kept current via incremental sync."""
+
+    def __init__(self) -> None:
+        # _sync_lock serializes network syncs; _lock guards the collections
+        # and is only held briefly, so reads never wait on the network.
+        self._sync_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._generation: Optional[int] = None
+        self._revalidating = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.sync_token = "*"
+        self.tasks: dict[str, TaskRecord] = {}
+        self.projects: dict[str, dict] = {}
+        self.sections: dict[str, dict] = {}
+        self.labels: dict[str, dict] = {}
+        self.project_index = ProjectIndex({})
+        self.projects_by_name: dict[str, list[str]] = {}
+        self.user: dict = {}
+        self.synced_at = 0.0
+        self.pushed_at = 0.0
+        self.stale = True
+        self.has_metadata = False
+        # Queued writes not yet replayed: provisional id -> task, closed ids.
+        self.queued_adds: dict[str, TaskRecord] = {}
+        self.queued_closes: set[str] = set()
+        # Replayed creates: provisional id -> (real id or None if it failed,
+        # row), shown until the real row has been merged in.
+        self.replayed_adds: dict[str, tuple[Optional[str], TaskRecord]] = {}
+        # Version of the shared cache this replica's data corresponds to.
+        self.shared_version = 0
+
+    def _check_account(self) -> None:
+        """Drop everything if the token rotated, then warm up from disk."""
+        client.get_session()
+        generation = client.client_generation()
+        if generation == self._generation:
+            return
+        with self._lock:
+            self._reset()
+            self._generation = generation
+            self._load_snapshot()
+        self._notify(ALL, ALL)
+
+    def invalidate(self) -> None:
+        """Force the next read, in this process or any other, to sync with Todoist first."""
+        self.stale = True
+        store = get_store()
+        if store is None:
+            return
+        try:
+            store.save_changes(client.account_key(), stale=True)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def is_fresh(self) -> bool:
+        if self.stale:
+            return False
+        if self.pushed_at:
+            max_age = _env_seconds("TODOIST_WEBHOOK_MAX_AGE", DEFAULT_PUSH_MAX_AGE)
+        else:
+            max_age = _max_age()
+        return time.monotonic() - max(self.synced_at, self.pushed_at) <= max_age
+
+    def _notify(self, task_ids: Optional[set], project_ids: Optional[set]) -> None:
+        for listener in _listeners:
+            try:
+                listener(task_ids, project_ids)
+            except Exception:
+                pass  # A broken listener must not break reads.
+
+    def apply_push(self, tasks: list[dict] = (), projects: list[dict] = ()) -> bool:
+        """
+        Merge task/project rows pushed by Todoist (webhook payloads).
+
+        Returns:
+            False if the replica has not synced yet (the next read does a
+            full sync anyway), True once the rows were applied.
+        """
+        with self._lock:
+            if not self.synced_at:
+                return False
+            _merge(self.tasks, tasks, _task_removed, TaskRecord.from_sync)
+            self._overlay_queued()
+            if projects:
+                _merge(self.projects, projects, _project_removed)
+                self._index_projects()
+            self.pushed_at = time.monotonic()
+        self._share(tasks, metadata=bool(projects))
+        self._notify({t["id"] for t in tasks}, {p["id"] for p in projects})
+        return True
+
+    def ensure_fresh(self, force: bool = False) -> None:
+        """Sync if forced, marked stale, or older than the staleness bound."""
+        with self._sync_lock:
+            self._check_account()
+            self._catch_up()
+            hit = not force and self.is_fresh()
+            metrics.record_cache("replica", hit)
+            if not hit:
+                self._sync()
+
+    def ensure_metadata(self, force: bool = False) -> None:
+        """
+        Make projects, sections and labels available.
+
+        A cached snapshot (from disk or an earlier sync) is served as-is and
+        revalidated in a background thread; only a cold start without any
+        snapshot blocks on Todoist.
+        """
+        if force:
+            self.ensure_fresh(force=True)
+            return
+        client.get_session()
+        if client.client_generation() != self._generation or not self.has_metadata:
+            with self._sync_lock:
+                self._check_account()
+                warm = self.has_metadata
+            if not warm:
+                metrics.record_cache("metadata", False)
+                self.ensure_fresh()
+                return
+        metrics.record_cache("metadata", True)
+        self.catch_up()
+        if not self.is_fresh():
+            self._revalidate_in_background()
+
+    def _revalidate_in_background(self) -> None:
+        with self._lock:
+            if self._revalidating:
+                return
+            self._revalidating = True
+
+        def run() -> None:
+            try:
+                self.ensure_fresh()
+            except Exception:
+                pass  # The next foreground read will retry and report errors.
+            finally:
+                self._revalidating = False
+
+        # Carry the tenant over so the sync uses this replica's account.
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run, args=(run,), name="todoist-revalidate", daemon=True
+        ).start()
+
+    def _sync(self) -> None:
+        self.settle_queued()
+        with self._lock:
+            # Replayed before this sync started: it has their real rows, if still active.
+            replayed = set(self.replayed_adds)
+        response = client.sync(
+            sync_token=self.sync_token,
+            resource_types=json.dumps(RESOURCE_TYPES),
+        )
+        full = bool(response.get("full_sync"))
+        with self._lock:
+            if full:
+                self.tasks, self.projects, self.sections, self.labels = {}, {}, {}, {}
+            _merge(self.tasks, response.get("items", []), _task_removed, TaskRecord.from_sync)
+            _merge(self.projects, response.get("projects", []), _project_removed)
+            _merge(self.sections, response.get("sections", []), lambda s: s.get("is_deleted"))
+            _merge(self.labels, response.get("labels", []), lambda lb: lb.get("is_deleted"))
+            user = response.get("user")
+            user_changed = bool(user) and _user_summary(user) != _user_summary(self.user)
+            if user:
+                self.user = user
+            for task_id in replayed:
+                self.replayed_adds.pop(task_id, None)
+                self.tasks.pop(task_id, None)
+            resolved = self._overlay_queued()
+            self.sync_token = response["sync_token"]
+            self.synced_at = time.monotonic()
+            self.stale = False
+            self.has_metadata = True
+            metadata_changed = full or user_changed or any(
+                response.get(kind) for kind in METADATA_KINDS
+            )
+            if metadata_changed:
+                self._index_projects()
+        self._share(
+            response.get("items", []), full=full, metadata=metadata_changed,
+            sync_token=response["sync_token"],
+        )
+        if full:
+            self._notify(ALL, ALL)
+        elif response.get("items") or response.get("projects") or resolved:
+            self._notify(
+                {t["id"] for t in response.get("items", [])} | resolved,
+                {p["id"] for p in response.get("projects", [])},
+            )
+
+    def _index_projects(self) -> None:
+        self.project_index = ProjectIndex(dict(self.projects))
+        self.projects_by_name = self.project_index.by_name
+
+    def _load_snapshot(self) -> None:
+        store = get_store()
+        if store is None:
+            return
+        account = client.account_key()
+        try:
+            snapshot = store.load(account)
+            state = store.state(account)
+            rows = store.load_tasks(account) if snapshot and state and state.sync_token else None
+        except (sqlite3.Error, OSError, ValueError):
+            return
+        metrics.record_cache("shared", rows is not None)
+        if snapshot is None:
+            return
+        self._apply_snapshot(snapshot)
+        if rows is not None:
+            self.tasks = {task_id: TaskRecord.from_sync(row) for task_id, row in rows}
+            self._overlay_queued()
+            self._adopt(state)
+
+    def _apply_snapshot(self, snapshot: dict) -> None:
+        self.projects = {p["id"]: p for p in snapshot["projects"]}
+        self.sections = {s["id"]: s for s in snapshot["sections"]}
+        self.labels = {lb["id"]: lb for lb in snapshot["labels"]}
+        if snapshot["user"] and not self.user:
+            self.user = snapshot["user"][0]
+        self._index_projects()
+        self.has_metadata = True
+
+    def _adopt(self, state: SharedState) -> None:
+        """Take over the shared sync position; the data must match state's version."""
+        if state.sync_token:
+            self.sync_token = state.sync_token
+        if state.synced_at:
+            # Wall-clock sync time of whichever process synced, as our monotonic time.
+            synced_at = time.monotonic() - max(time.time() - state.synced_at, 0.0)
+            self.synced_at = max(self.synced_at, synced_at)
+        self.stale = state.stale
+        self.shared_version = state.version
+
+    def catch_up(self) -> None:
+        """Apply what other processes saved to the shared cache since we last looked."""
+        client.get_session()
+        if client.client_generation() != self._generation:
+            with self._sync_lock:
+                self._check_account()
+        self._catch_up()
+
+    def _catch_up(self) -> None:
+        store = get_store()
+        if store is None:
+            return
+        account = client.account_key()
+        with self._lock:
+            try:
+                state = store.state(account)
+                if state is None or state.version == self.shared_version:
+                    if state is not None:
+                        self._adopt(state)  # Picks up syncs that changed nothing.
+                    return
+                full = state.base_version > self.shared_version
+                rows = store.load_tasks(account, after=None if full else self.shared_version)
+                snapshot = store.load(account) if state.metadata_version > self.shared_version else None
+            except (sqlite3.Error, OSError, ValueError):
+                return
+            was_stale = self.stale
+            if full:
+                self.tasks = {}
+            for task_id, row in rows:
+                if row is None:
+                    self.tasks.pop(task_id, None)
+                else:
+                    self.tasks[task_id] = TaskRecord.from_sync(row)
+            if snapshot is not None:
+                self._apply_snapshot(snapshot)
+            self._overlay_queued()
+            self._adopt(state)
+        if full or snapshot is not None or (state.stale and not was_stale):
+            # A full reload, or another process wrote something we cannot see.
+            self._notify(ALL, ALL)
+        elif rows:
+            self._notify({task_id for task_id, _ in rows}, set())
+
+    def _share(
+        self, items: list[dict], full: bool = False, metadata: bool = False,
+        sync_token: Optional[str] = None,
+    ) -> None:
+        """Save these changed task rows (and metadata) to the shared cache."""
+        store = get_store()
+        if store is None:
+            return
+        # From the rows themselves, not self.tasks: queued writes stay local.
+        tasks = [TaskRecord.from_sync(i).to_dict() for i in items if not _task_removed(i)]
+        removed = [] if full else [i["id"] for i in items if _task_removed(i)]
+        with self._lock:
+            collections = {
+                "projects": list(self.projects.values()),
+                "sections": list(self.sections.values()),
+                "labels": list(self.labels.values()),
+                "user": [_user_summary(self.user)] if self.user.get("id") else [],
+            } if metadata else None
+            base = self.shared_version
+        try:
+            version = store.save_changes(
+                client.account_key(), tasks, removed, full, collections, sync_token,
+                stale=False if sync_token else None,
+            )
+        except (sqlite3.Error, OSError):
+            return
+        with self._lock:
+            # Only if no other process saved in between; else catch_up() loads theirs too.
+            if self.shared_version == base and version in (base, base + 1):
+                self.shared_version = version
+
+    def _overlay_queued(self) -> set:
+        """
+        Apply queued writes on top of synced rows (call with _lock held).
+
+        Returns:
+            The queued tasks whose due phrase got resolved just now.
+        """
+        resolved = self._resolve_queued_dues()
+        for task_id, task in self.queued_adds.items():
+            if task_id not in self.queued_closes:
+                self.tasks[task_id] = task
+        for task_id in self.queued_closes:
+            self.tasks.pop(task_id, None)
+        for task_id, (real_id, task) in list(self.replayed_adds.items()):
+            if real_id is None or real_id in self.tasks:
+                self.tasks.pop(task_id, None)
+                del self.replayed_adds[task_id]
+            else:
+                self.tasks[task_id] = task
+        return resolved
+
+    def _resolve_queued_dues(self) -> set:
+        """Resolve the due phrases of queued tasks once the timezone is known."""
+        now = self.user_now()
+        if now is None:
+            return set()
+        resolved = set()
+        for task_id, task in self.queued_adds.items():
+            due = task.due
+            if due is None or due.date:
+                continue
+            parsed = parse_due_phrase(due.string, now)
+            if parsed is None:
+                continue  # Recurring or unusual: only Todoist can parse it.
+            day, moment = parsed
+            if moment is None:
+                task.due = make_due(day.isoformat(), due.string)
+            else:
+                task.due = make_due(
+                    moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    due.string, False, getattr(moment.tzinfo, "key", None),
+                )
+            resolved.add(task_id)
+        return resolved
+
+    def queue_write(self, added: Optional[TaskRecord] = None, closed: Optional[str] = None) -> None:
+        """Show a write the journal has queued (a new task or a completion) right away."""
+        with self._lock:
+            if added is not None:
+                self.queued_adds[added["id"]] = added
+            if closed is not None:
+                self.queued_closes.add(closed)
+            changed = self._overlay_queued()
+        if added is not None:
+            changed.add(added["id"])
+        if closed is not None:
+            changed.add(closed)
+        self._notify(changed, set())
+
+    def settle_queued(self) -> None:
+        """Drop queued writes the journal has replayed (in any process)."""
+        with self._lock:
+            queued = set(self.queued_adds) | self.queued_closes
+        if not queued:
+            return
+        from . import journal
+
+        current = journal.get_journal()
+        pending = current.pending_targets(queued) if current is not None else set()
+        real_ids = {
+            task_id: current.real_id(task_id) if current is not None else None
+            for task_id in queued - pending
+        }
+        with self._lock:
+            done_adds = set(self.queued_adds) - pending
+            done_closes = self.queued_closes - pending
+            if not done_adds and not done_closes:
+                return
+            for task_id in done_adds:
+                task = self.queued_adds.pop(task_id)
+                if task_id not in self.queued_closes:
+                    self.replayed_adds[task_id] = (real_ids.get(task_id), task)
+            self.queued_closes -= done_closes
+            self._overlay_queued()
+            # Todoist now has them; the next read fetches the real rows.
+            self.stale = True
+        self._notify(done_adds | done_closes, set())
+
+    def now(self) -> datetime:
+        """Current time in the user's Todoist timezone."""
+        tz_name = (self.user.get("tz_info") or {}).get("timezone")
+        return datetime.now(get_tz(tz_name))
+
+    def user_now(self) -> Optional[datetime]:
+        """now(), or None while the user's timezone is not known yet."""
+        if not (self.user.get("tz_info") or {}).get("timezone"):
+            return None
+        return self.now()
+
+    def today(self) -> date:
+        """Current date in the user's Todoist timezone."""
+        return self.now().date()
+
+    def select_tasks(self, predicate: Callable[[TaskRecord], bool]) -> list[TaskRecord]:
+        """Return the active tasks matching predicate, in Todoist order."""
+        with self._lock:
+            matched = [t for t in self.tasks.values() if predicate(t)]
+        matched.sort(key=lambda t: (t.get("child_order", 0), t["id"]))
+        return matched
+
+    def get_tasks(self, task_ids) -> list[TaskRecord]:
+        """Return the rows of those task_ids that are still active."""
+        with self._lock:
+            return [self.tasks[i] for i in task_ids if i in self.tasks]
+
+    def list_projects(self) -> list[dict]:
+        """Return the active projects in Todoist order."""
+        with self._lock:
+            projects = list(self.projects.values())
+        projects.sort(key=lambda p: (p.get("child_order", 0), p["id"]))
+        return projects
+
+
+_replica = Replica()
+_listeners: list[Callable[[Optional[set], Optional[set]], None]] = []
+
+
+def _current() -> Replica:
+    """The replica of the account the running tool call serves."""
+    return tenants.local("replica", Replica) or _replica
+
+
+def get_replica(refresh: bool = False) -> Replica:
+    """Return the current account's replica, synced per the staleness bound."""
+    replica = _current()
+    replica.ensure_fresh(force=refresh)
+    return replica
+
+
+def get_metadata(refresh: bool = False) -> Replica:
+    """Return the replica with at least cached project/section/label data."""
+    replica = _current()
+    replica.ensure_metadata(force=refresh)
+    return replica
+
+
+def cached() -> Replica:
+    """The current account's replica as it is, caught up with the shared cache; never syncs."""
+    replica = _current()
+    replica.catch_up()
+    return replica
+
+
+def resolve_project(name: str) -> Resolution:
+    """
+    Resolve a project name or path to an id.
+
+    Uses cached metadata first and re-syncs once if nothing matches, in case
+    the project was created since the last sync.
+    """
+    resolution = get_metadata().project_index.resolve(name)
+    if resolution.project_id is None and not resolution.candidates:
+        resolution = get_metadata(refresh=True).project_index.resolve(name)
+    return resolution
+
+
+def invalidate() -> None:
+    """Mark the replica stale after a write."""
+    _current().invalidate()
+
+
+def apply_push(tasks: list[dict] = (), projects: list[dict] = ()) -> bool:
+    """Merge rows pushed by Todoist into the replica; see Replica.apply_push."""
+    return _current().apply_push(tasks, projects)
+
+
+def get_tasks(task_ids) -> list[TaskRecord]:
+    """Return the active replica rows for task_ids, without syncing."""
+    return _current().get_tasks(task_ids)
+
+
+def catch_up() -> None:
+    """Apply changes other processes saved to the shared cache; never syncs."""
+    _current().catch_up()
+
+
+def shared_version() -> int:
+    """Version of the shared cache the current replica's data corresponds to."""
+    return _current().shared_version
+
+
+def queue_write(added: Optional[TaskRecord] = None, closed: Optional[str] = None) -> None:
+    """Overlay a write the journal queued; see Replica.queue_write."""
+    _current().queue_write(added, closed)
+
+
+def settle_queued() -> None:
+    """Drop writes the journal has replayed from the overlay."""
+    _current().settle_queued()
+
+
+def has_queued() -> bool:
+    """Whether queued writes are overlaid on the current replica."""
+    replica = _current()
+    return bool(replica.queued_adds or replica.queued_closes or replica.replayed_adds)
+
+
+def user_id() -> Optional[str]:
+    """Todoist user id of the synced account, if known."""
+    return _current().user.get("id")
+
+
+def user_now() -> Optional[datetime]:
+    """
+    The user's current time if their timezone is known; never syncs.
+
+    A fresh process learns the timezone from the on-disk snapshot.
+    """
+    return cached().user_now()
+
+
+def subscribe(listener: Callable[[Optional[set], Optional[set]], None]) -> None:
+    """
+    Call listener(task_ids, project_ids) after every change to a replica.
+
+    Either argument is ALL (None) when everything may have changed. The
+    listener runs in the context of the account whose replica changed.
+    """
+    _listeners.append(listener)
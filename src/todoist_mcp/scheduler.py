@@ -0,0 +1,222 @@
+"""
+Rate-limit-aware request scheduler for Todoist calls.
+
+Every HTTP request made through the shared session passes through a
+RequestScheduler, which:
+
+- waits on a token bucket sized to Todoist's per-user quota
+  (TODOIST_RATE_LIMIT requests per 15 minutes, default 1000, with bursts of
+  up to TODOIST_RATE_BURST, default 50);
+- retries 429 responses after the server's Retry-After delay, and pauses the
+  bucket so concurrent callers back off too;
+- retries 5xx responses and connection errors with exponential backoff and
+  full jitter, up to TODOIST_MAX_RETRIES times (default 3);
+- gives each request at most TODOIST_RETRY_BUDGET seconds (default 30) of
+  waiting to retry, counted from its first attempt. A Retry-After or backoff
+  that does not fit in what is left is not waited out: the 429 / 5xx
+  response (or the connection error) goes straight back to the caller, so a
+  tool call never holds a worker for minutes.
+
+Writes are safe to retry because every non-idempotent request carries an
+X-Request-Id header, which Todoist uses to drop duplicates; the scheduler
+adds one if the caller did not. Sync API commands are additionally
+de-duplicated by their command uuid.
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+import requests
+
+QUOTA_WINDOW = 15 * 60
+DEFAULT_RATE_LIMIT = 1000
+DEFAULT_BURST = 50
+DEFAULT_MAX_RETRIES = 3
+BASE_DELAY = 0.5
+MAX_DELAY = 8.0
+# Seconds of retry waiting allowed per request; also caps the Retry-After honoured.
+DEFAULT_RETRY_BUDGET = 30.0
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {500, 502, 503, 504}
+TOO_MANY_REQUESTS = 429
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name)
+    try:
+        value = int(raw) if raw else default
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def _env_seconds(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    try:
+        value = float(raw) if raw else default
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    raw = response.headers.get("Retry-After")
+    if not raw:
+        return None
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is free."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, returning how long the caller had to wait."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now > self._updated:
+                    refill = (now - self._updated) * self.rate
+                    self._tokens = min(self.capacity, self._tokens + refill)
+                    self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a while (after a 429).
+
+        When the pause ends a single request may go through; the bucket then
+        refills at the steady rate rather than allowing a full burst.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._updated = self._paused_until
+            self._tokens = 1.0
+
+
+class RequestScheduler:
+    """Rate limiting and retry policy applied to each outgoing request."""
+
+    def __init__(self) -> None:
+        limit = _env_int("TODOIST_RATE_LIMIT", DEFAULT_RATE_LIMIT) or DEFAULT_RATE_LIMIT
+        burst = _env_int("TODOIST_RATE_BURST", DEFAULT_BURST) or DEFAULT_BURST
+        self.bucket = TokenBucket(rate=limit / QUOTA_WINDOW, capacity=burst)
+        self.max_retries = _env_int("TODOIST_MAX_RETRIES", DEFAULT_MAX_RETRIES)
+        self.retry_budget = _env_seconds("TODOIST_RETRY_BUDGET", DEFAULT_RETRY_BUDGET)
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0, "retries": 0, "rate_limited": 0, "gave_up": 0,
+            "throttle_wait_seconds": 0.0,
+        }
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[key] += amount
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+    def _over_budget(self, delay: float, deadline: float) -> bool:
+        """Whether waiting delay more seconds would overrun the request's retry budget."""
+        if delay <= deadline - time.monotonic():
+            return False
+        self._count("gave_up")
+        return True
+
+    def execute(
+        self,
+        method: str,
+        kwargs: dict,
+        send: Callable[..., requests.Response],
+    ) -> requests.Response:
+        """
+        Send a request under the rate limit, retrying when it is safe to.
+
+        Args:
+            method: HTTP method, used to decide whether retries are safe.
+            kwargs: Keyword arguments for send(); an X-Request-Id header is
+                added to non-idempotent requests that lack one.
+            send: Performs one attempt, e.g. requests.Session.request.
+
+        Returns:
+            The final response, which may still be a 429 or 5xx once the
+            retries or the retry budget are used up.
+        """
+        method = method.upper()
+        if method not in IDEMPOTENT_METHODS:
+            headers = dict(kwargs.get("headers") or {})
+            if not any(k.lower() == "x-request-id" for k in headers):
+                headers["X-Request-Id"] = str(uuid.uuid4())
+            kwargs = {**kwargs, "headers": headers}
+
+        attempt = 0
+        deadline: Optional[float] = None
+        while True:
+            self._count("throttle_wait_seconds", self.bucket.acquire())
+            self._count("requests")
+            if deadline is None:
+                deadline = time.monotonic() + self.retry_budget
+            try:
+                response = send(**kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                if self._over_budget(delay, deadline):
+                    raise
+            else:
+                if response.status_code == TOO_MANY_REQUESTS:
+                    self._count("rate_limited")
+                    delay = _retry_after(response)
+                    if delay is None:
+                        delay = self._backoff(attempt)
+                    if attempt >= self.max_retries or self._over_budget(delay, deadline):
+                        return response
+                    # The paused bucket makes this and every other caller wait.
+                    self.bucket.pause(delay)
+                    delay = 0.0
+                elif response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self._backoff(attempt)
+                    if self._over_budget(delay, deadline):
+                        return response
+                else:
+                    return response
+                response.close()
+            attempt += 1
+            self._count("retries")
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        """Return request, retry and throttling counters."""
+        with self._lock:
+            stats = dict(self.counters)
+        stats["throttle_wait_seconds"] = round(stats["throttle_wait_seconds"], 3)
+        return stats
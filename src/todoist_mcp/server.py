@@ -3,36 +3,199 @@ Todoist MCP Server for Nanobot.
 
 Exposes Todoist API functionality as MCP tools so nanobot can create
 and manage todos when reminding the user about items.
+
+Tools are plain synchronous functions (the CLI and tests call them directly).
+MCP registers async wrappers that run them in a bounded worker-thread pool,
+so concurrent requests on the HTTP transport overlap instead of queueing
+behind one blocking Todoist call. TODOIST_MAX_CONCURRENCY (default 4) caps
+how many Todoist calls run at once.
+
+Importing this module is cheap: the FastMCP server (`mcp`) is only built,
+and the MCP SDK only imported, the first time `mcp` is accessed. CLI
+commands therefore never load the MCP stack.
 """
 
+import functools
+import json
 import os
-from typing import Optional
+import time
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from . import agenda as _agenda
+from . import commands as _commands
+from . import dedupe as _dedupe
+from . import export as _export
+from . import journal as _journal
+from . import listing as _listing
+from . import metrics as _metrics
+from . import querycache as _querycache
+from . import replica as _replica
+from . import singleflight as _singleflight
+from . import tenants as _tenants
+from . import webhooks as _webhooks
+from .client import account_key, connection_stats, get_api, rest_pages
+from .dates import parse_due_phrase
+from .filters import FilterContext, build_predicate, compile_filter
+from .records import TaskRecord
+from .store import get_store
+
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import FastMCP
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from todoist_api_python.api import TodoistAPI
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def _max_concurrency() -> int:
+    raw = os.environ.get("TODOIST_MAX_CONCURRENCY")
+    try:
+        value = int(raw) if raw else DEFAULT_MAX_CONCURRENCY
+    except ValueError:
+        value = DEFAULT_MAX_CONCURRENCY
+    return max(value, 1)
+
+
+_TOOLS: list[Callable[..., dict]] = []
+_mcp: Optional["FastMCP"] = None
+
+
+def _tool() -> Callable[[Callable[..., dict]], Callable[..., dict]]:
+    """
+    Mark a function as an MCP tool.
+
+    The function stays synchronous, so the CLI and tests can call it
+    directly; it is only wrapped to record latency, errors and payload size
+    (see metrics.py). _build_mcp() registers it.
+    """
+
+    def decorator(fn: Callable[..., dict]) -> Callable[..., dict]:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs) -> dict:
+            started = time.perf_counter()
+            result: Any = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                ok = isinstance(result, dict) and result.get("success") is not False
+                payload = len(json.dumps(result, default=str)) if result is not None else 0
+                _metrics.observe_tool(fn.__name__, time.perf_counter() - started, ok, payload)
+
+        _TOOLS.append(timed)
+        return timed
+
+    return decorator
+
+
+def _build_mcp() -> "FastMCP":
+    """Create the FastMCP server with async, thread-offloaded tool wrappers."""
+    import anyio
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("Todoist")
+    limiter = anyio.CapacityLimiter(_max_concurrency())
+
+    for fn in _TOOLS:
+        def wrap(fn: Callable[..., dict]) -> Callable[..., Any]:
+            @functools.wraps(fn)
+            async def run_in_worker(*args, **kwargs) -> dict:
+                try:
+                    tenant = _request_tenant(server)
+                except (PermissionError, OSError, ValueError) as e:
+                    return {
+                        "success": False,
+                        "error": str(e),
+                        "message": f"Failed to authenticate: {e}",
+                    }
+                call = functools.partial(fn, *args, **kwargs)
+                if tenant is not None:
+                    call = functools.partial(_tenants.run_as, tenant, call)
+                return await anyio.to_thread.run_sync(call, limiter=limiter)
+
+            return run_in_worker
+
+        server.add_tool(wrap(fn))
+
+    @server.custom_route("/metrics", methods=["GET"], include_in_schema=False)
+    async def metrics_endpoint(request: "Request") -> "Response":
+        from starlette.responses import PlainTextResponse
+
+        return PlainTextResponse(
+            _metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+        )
+
+    if _webhooks.secret():
+        @server.custom_route(_webhooks.path(), methods=["POST"], include_in_schema=False)
+        async def webhook_endpoint(request: "Request") -> "Response":
+            from starlette.responses import JSONResponse
+
+            body = await request.body()
+            # Verification and the store / replica updates block: keep them
+            # off the event loop, in the tools' worker pool.
+            status, payload = await anyio.to_thread.run_sync(
+                _webhooks.handle, body, request.headers.get(_webhooks.SIGNATURE_HEADER),
+                limiter=limiter,
+            )
+            return JSONResponse(payload, status_code=status)
+
+    # Replay writes a previous process journaled but did not get to send.
+    if _journal.get_journal() is not None:
+        _journal.start_worker()
+    _agenda.start_scheduler()
+    return server
+
+
+def _request_tenant(server: "FastMCP") -> Optional["_tenants.Tenant"]:
+    """Tenant named by the HTTP request's Authorization header, if any."""
+    if not _tenants.enabled():
+        return None
+    try:
+        request = server.get_context().request_context.request
+    except (LookupError, ValueError):
+        return None  # Not inside an MCP request (e.g. stdio start-up).
+    headers = getattr(request, "headers", None)
+    return _tenants.resolve(headers.get("authorization") if headers is not None else None)
 
-from mcp.server.fastmcp import FastMCP
-from todoist_api_python.api import TodoistAPI
 
-# Initialize FastMCP server
-mcp = FastMCP("Todoist")
+def __getattr__(name: str) -> Any:
+    # PEP 562: build the MCP server on first access to `server.mcp`.
+    global _mcp
+    if name == "mcp":
+        if _mcp is None:
+            _mcp = _build_mcp()
+        return _mcp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def _get_api() -> TodoistAPI:
-    """Get Todoist API client with token from environment."""
-    token = os.environ.get("TODOIST_API_TOKEN")
-    if not token:
+def _get_api() -> "TodoistAPI":
+    """Get the shared, connection-pooled Todoist API client."""
+    return get_api()
+
+
+def _resolve_project(project: str) -> str:
+    """Resolve a project name or path to its id, or raise ValueError."""
+    resolution = _replica.resolve_project(project)
+    if resolution.project_id:
+        return resolution.project_id
+    if resolution.candidates:
         raise ValueError(
-            "TODOIST_API_TOKEN environment variable is not set. "
-            "Get your API token from https://app.todoist.com/prefs/integrations"
+            f"Project {project!r} is ambiguous; use one of: " + ", ".join(resolution.candidates)
         )
-    return TodoistAPI(token)
+    raise ValueError(f"No project matches {project!r}")
 
 
-@mcp.tool()
+@_tool()
 def create_task(
     content: str,
     project_id: Optional[str] = None,
     due_string: Optional[str] = None,
     priority: Optional[int] = None,
     description: Optional[str] = None,
+    project: Optional[str] = None,
+    dedupe: Optional[str] = None,
 ) -> dict:
     """
     Create a new task in Todoist.
@@ -43,16 +206,32 @@ def create_task(
 
     Args:
         content: The task content/title (required). Be concise and actionable.
-        project_id: Optional project ID. If not provided, task goes to Inbox.
+        project_id: Optional project ID. If neither project_id nor project is
+            provided, task goes to Inbox.
         due_string: Optional due date. Supports natural language: "today", "tomorrow",
-            "next monday", "in 2 days", "2025-02-15", etc.
+            "next monday", "in 2 days", "2025-02-15", etc. Common phrases are
+            resolved locally in the user's timezone; others go to Todoist as-is.
         priority: Optional priority 1-4 (1=normal, 2=medium, 3=high, 4=urgent).
         description: Optional longer description for the task.
+        project: Optional project name or path instead of project_id, e.g. "Work"
+            or "Work/Clients". Matching is case-insensitive and tolerates prefixes
+            and small typos, so there is no need to call list_projects first.
+        dedupe: What to do if the project already has an open task with the
+            same content (ignoring case and punctuation): "block" returns that
+            task instead of creating another (duplicate=true), "warn" creates
+            the task and names the existing one in duplicate_of, "off" skips
+            the check. Defaults to TODOIST_DEDUPE, else "warn".
 
     Returns:
-        The created task details including id, url, and content.
+        The created task details including id, url, content, and project_id.
+        With the write queue on (TODOIST_WRITE_QUEUE, the default) the task
+        is journaled locally and sent to Todoist in the background instead:
+        the response has queued=true, provisional=true and url=null. The id
+        is provisional ("local-..."): complete_task and the list tools accept
+        it, but Todoist does not. Errors Todoist reports later (e.g. an
+        unknown project_id) appear in get_write_queue_status, not here.
+        With TODOIST_WRITE_QUEUE=off the task is created before returning.
     """
-    api = _get_api()
     kwargs = {"content": content, "labels": ["nanobot"]}
     if project_id:
         kwargs["project_id"] = project_id
@@ -64,16 +243,42 @@ def create_task(
         kwargs["description"] = description
 
     try:
-        task = api.add_task(**kwargs)
-        return {
-            "success": True,
-            "id": task.id,
-            "content": task.content,
-            "url": task.url,
-            "due": str(task.due) if task.due else None,
-            "priority": getattr(task, "priority", None),
-            "message": f"Created task: {task.content}",
-        }
+        if project and not project_id:
+            kwargs["project_id"] = _resolve_project(project)
+        mode = _dedupe.check_mode(dedupe)
+        duplicate = _dedupe.check(content, kwargs.get("project_id"), mode)
+        if duplicate is not None and mode == "block":
+            return {
+                "success": True,
+                "duplicate": True,
+                **duplicate,
+                "message": f"Not created: task already exists: {duplicate['content']}",
+            }
+        journal = _journal.get_journal()
+        if journal is not None:
+            result = _queue_task(journal, kwargs)
+        else:
+            fields = dict(kwargs)
+            if due_string:
+                fields.update(_due_fields(fields.pop("due_string")))
+            task = _get_api().add_task(**fields)
+            _replica.invalidate()
+            _querycache.discard(tasks=[_listing.rest_task_row(task)])
+            result = {
+                "success": True,
+                "id": task.id,
+                "content": task.content,
+                "project_id": task.project_id,
+                "url": task.url,
+                "due": str(task.due) if task.due else None,
+                "priority": getattr(task, "priority", None),
+                "message": f"Created task: {task.content}",
+            }
+        _dedupe.add_created(result["id"], content, kwargs.get("project_id"))
+        if duplicate is not None:
+            result["duplicate_of"] = duplicate
+            result["message"] += f" (an open task looks the same: {duplicate['id']})"
+        return result
     except Exception as e:
         return {
             "success": False,
@@ -82,30 +287,101 @@ def create_task(
         }
 
 
-@mcp.tool()
-def list_projects() -> dict:
+def _due_fields(due_string: str) -> dict:
+    """
+    add_task arguments for a due phrase.
+
+    Phrases dates.parse_due_phrase understands are resolved here, in the
+    user's Todoist timezone, and sent as due_date / due_datetime, so Todoist
+    has nothing left to parse. Anything else (recurring or unusual phrases)
+    is sent as due_string. Until the timezone is known (no sync or snapshot
+    yet) only ISO dates are resolved locally.
+    """
+    now = _replica.user_now()
+    if now is not None:
+        resolved = parse_due_phrase(due_string, now)
+    else:
+        try:
+            resolved = date.fromisoformat(due_string.strip()), None
+        except ValueError:
+            resolved = None
+    _metrics.record_cache("due_phrases", resolved is not None)
+    if resolved is None:
+        return {"due_string": due_string}
+    day, moment = resolved
+    return {"due_date": day} if moment is None else {"due_datetime": moment}
+
+
+def _sync_due(due_string: str) -> dict:
+    """Sync API due object for a due phrase; see _due_fields."""
+    fields = _due_fields(due_string)
+    if "due_date" in fields:
+        return {"date": fields["due_date"].isoformat()}
+    if "due_datetime" in fields:
+        moment: datetime = fields["due_datetime"]
+        due = {"date": moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        zone = getattr(moment.tzinfo, "key", None)
+        if zone:
+            due["timezone"] = zone
+        return due
+    return {"string": due_string}
+
+
+def _queue_task(journal: "_journal.WriteJournal", kwargs: dict) -> dict:
+    """Journal an item_add for background replay and acknowledge it."""
+    args = _sync_item_args(kwargs)
+    provisional_id = journal.append("item_add", args)
+    _replica.queue_write(added=TaskRecord.from_sync({**args, "id": provisional_id}))
+    due = args.get("due") or {}
+    if due and not due.get("date"):
+        # Todoist has yet to parse the due string; any filter may match.
+        _querycache.clear()
+    _journal.start_worker()
+    return {
+        "success": True,
+        "queued": True,
+        "provisional": True,
+        "id": provisional_id,
+        "content": kwargs["content"],
+        "project_id": kwargs.get("project_id"),
+        "url": None,
+        "due": due.get("date") or due.get("string"),
+        "priority": kwargs.get("priority"),
+        "message": (
+            f"Queued task: {kwargs['content']} (provisional id {provisional_id};"
+            " it will be sent to Todoist in the background)"
+        ),
+    }
+
+
+@_tool()
+def list_projects(refresh: bool = False) -> dict:
     """
     List all Todoist projects.
 
     Use this to help the user choose which project to add a task to,
     or to get project IDs for the create_task tool.
 
+    Args:
+        refresh: Re-sync with Todoist before answering instead of using the
+            local copy (only needed if the user just changed something in Todoist).
+
     Returns:
         List of projects with id, name, and whether it's the inbox.
     """
-    api = _get_api()
     try:
-        # get_projects() returns Iterator[list[Project]] in todoist-api-python 3.x
-        all_projects = [p for batch in api.get_projects() for p in batch]
+        replica = _singleflight.do(
+            "list_projects", refresh, lambda: _replica.get_metadata(refresh=refresh)
+        )
         return {
             "success": True,
             "projects": [
                 {
-                    "id": p.id,
-                    "name": p.name,
-                    "is_inbox": getattr(p, "is_inbox_project", False),
+                    "id": p["id"],
+                    "name": p["name"],
+                    "is_inbox": bool(p.get("inbox_project", False)),
                 }
-                for p in all_projects
+                for p in replica.list_projects()
             ],
         }
     except Exception as e:
@@ -116,8 +392,8 @@ def list_projects() -> dict:
         }
 
 
-@mcp.tool()
-def create_reminder_task(content: str, when: str = "today") -> dict:
+@_tool()
+def create_reminder_task(content: str, when: str = "today", dedupe: Optional[str] = None) -> dict:
     """
     Create a task optimized for reminders - quick and simple.
 
@@ -128,33 +404,120 @@ def create_reminder_task(content: str, when: str = "today") -> dict:
         content: What to be reminded about (e.g., "Call the dentist").
         when: When to be reminded. Default "today". Supports: "today", "tomorrow",
             "next week", "in 2 hours", etc.
+        dedupe: "block", "warn" or "off"; see create_task.
 
     Returns:
-        The created task details.
+        The created task details; queued with a provisional id while the
+        write queue is on (see create_task).
     """
-    return create_task(content=content, due_string=when)
+    return create_task(content=content, due_string=when, dedupe=dedupe)
+
 
+def _list_tasks_with_filter(
+    filter_query: str,
+    refresh: bool = False,
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> dict:
+    """
+    Fetch one page of tasks matching a Todoist filter query.
 
-def _list_tasks_with_filter(filter_query: str) -> dict:
-    """Fetch tasks matching a Todoist filter query. Returns standardized task list."""
-    api = _get_api()
+    Queries the local filter evaluator understands are answered from the
+    replica; anything else is sent to Todoist. Unsorted remote results are
+    streamed one Todoist page per call; a remote query with sort= has to
+    fetch every page before it can order them. Matching rows are cached
+    briefly per normalized query (see querycache.py), and for longer when
+    the agenda scheduler precomputed them (see agenda.py); refresh bypasses
+    that. Concurrent identical calls share one computation (see
+    singleflight.py).
+    """
     try:
-        # filter_tasks() returns Iterator[list[Task]] in todoist-api-python 3.x
-        all_tasks = [t for batch in api.filter_tasks(query=filter_query) for t in batch]
+        fields = _listing.check_fields(fields)
+        limit = _listing.check_limit(limit)
+        sort = _listing.check_sort(sort)
+        position = _listing.decode_cursor(cursor, filter_query, sort)
+
+        index = None
+        if "project" in fields or sort == "project":
+            index = _replica.get_metadata().project_index
+
+        def project_path(project_id: Optional[str]) -> Optional[str]:
+            return index.path_of(project_id) if index and project_id else None
+
+        compiled = compile_filter(filter_query)
+        key = _querycache.normalize(filter_query)
+        if compiled is None and not sort:
+            # Fetch only the page asked for and hand Todoist's own cursor back.
+            page_key = (key, position.get("page"), limit)
+            entry = None if refresh else _querycache.get(page_key)
+            if entry is None:
+                def fetch_page() -> _querycache.Entry:
+                    pages = rest_pages(
+                        "tasks/filter", cursor=position.get("page"), query=filter_query, limit=limit
+                    )
+                    batch, next_page = next(pages)
+                    return _querycache.put(
+                        page_key, [_listing.rest_task_row(t) for t in batch], next_page=next_page
+                    )
+
+                entry = _singleflight.do("filter_page", page_key, fetch_page)
+            tasks = [_listing.shape(t, fields, project_path) for t in entry.rows]
+            return {
+                "success": True,
+                "tasks": tasks,
+                "count": len(tasks),
+                "next_cursor": (
+                    _listing.encode_cursor(filter_query, sort, page=entry.next_page)
+                    if entry.next_page else None
+                ),
+                "as_of": _listing.as_of(entry.as_of),
+            }
+
+        def compute() -> _querycache.Entry:
+            if compiled is not None:
+                replica = _replica.get_replica(refresh=refresh)
+                ctx = FilterContext(
+                    now=replica.now(),
+                    projects=replica.projects,
+                    projects_by_name=replica.projects_by_name,
+                )
+                predicate = build_predicate(compiled, ctx)
+                return _querycache.put(
+                    key, replica.select_tasks(predicate), predicate, ttl=_agenda.ttl_for(key)
+                )
+            return _querycache.put(key, [
+                _listing.rest_task_row(t)
+                for batch, _ in rest_pages(
+                    "tasks/filter", query=filter_query, limit=_listing.MAX_LIMIT
+                )
+                for t in batch
+            ])
+
+        entry = None if refresh else _querycache.get(key)
+        if entry is None:
+            entry = _singleflight.do("list_tasks", (key, refresh), compute)
+        rows = list(entry.rows)
+
+        if sort:
+            def project_key(project_id: Optional[str]) -> tuple:
+                project = index.projects.get(project_id, {}) if index else {}
+                return (not project.get("inbox_project"), (project_path(project_id) or "").lower())
+
+            rows.sort(key=_listing.sort_key(sort, project_key))
+        offset = int(position.get("offset", 0))
+        page = rows[offset:offset + limit]
+        more = offset + limit < len(rows)
         return {
             "success": True,
-            "tasks": [
-                {
-                    "id": t.id,
-                    "content": t.content,
-                    "url": t.url,
-                    "due": str(t.due) if t.due else None,
-                    "priority": getattr(t, "priority", None),
-                    "project_id": getattr(t, "project_id", None),
-                }
-                for t in all_tasks
-            ],
-            "count": len(all_tasks),
+            "tasks": [_listing.shape(t, fields, project_path) for t in page],
+            "count": len(page),
+            "total": len(rows),
+            "next_cursor": (
+                _listing.encode_cursor(filter_query, sort, offset=offset + limit) if more else None
+            ),
+            "as_of": _listing.as_of(entry.as_of),
         }
     except Exception as e:
         return {
@@ -164,8 +527,15 @@ def _list_tasks_with_filter(filter_query: str) -> dict:
         }
 
 
-@mcp.tool()
-def list_tasks_by_filter(filter_query: str) -> dict:
+@_tool()
+def list_tasks_by_filter(
+    filter_query: str,
+    refresh: bool = False,
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> dict:
     """
     List tasks matching a Todoist filter query.
 
@@ -182,55 +552,233 @@ def list_tasks_by_filter(filter_query: str) -> dict:
 
     Args:
         filter_query: A Todoist filter string (see https://todoist.com/help/articles/introduction-to-filters-V98wIH).
+        refresh: Re-sync with Todoist before answering instead of using the
+            local copy (only needed if the user just changed something in Todoist).
+        fields: Task fields to return (default id, content, due, priority,
+            project_id). Also available: project (name/path), labels,
+            description, due_string (e.g. "every monday"), url.
+        limit: Page size, 1-200 (default 50).
+        cursor: next_cursor from the previous response, to fetch the next page.
+        sort: "priority" (most urgent first), "due" (earliest first) or
+            "project". Default is Todoist's own order.
 
     Returns:
-        List of tasks with id, content, url, due date, and priority.
+        One page of tasks. "due" is an ISO date or datetime, plus
+        "recurring": true on recurring tasks. next_cursor is set when more
+        tasks match; as_of says when the rows were computed (UTC).
     """
-    return _list_tasks_with_filter(filter_query)
+    return _list_tasks_with_filter(
+        filter_query, refresh=refresh, fields=fields, limit=limit, cursor=cursor, sort=sort
+    )
 
 
-@mcp.tool()
-def list_tasks_today() -> dict:
+@_tool()
+def list_tasks_today(
+    refresh: bool = False,
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> dict:
     """
     List tasks due today.
 
     Use when the user asks what they need to do today, what's on their plate today,
     or what tasks are due today.
 
+    Args:
+        refresh: Re-sync with Todoist before answering instead of using the
+            local copy (only needed if the user just changed something in Todoist).
+        fields: Task fields to return (default id, content, due, priority,
+            project_id). Also available: project (name/path), labels,
+            description, due_string (e.g. "every monday"), url.
+        limit: Page size, 1-200 (default 50).
+        cursor: next_cursor from the previous response, to fetch the next page.
+        sort: "priority" (most urgent first), "due" (earliest first) or
+            "project". Default is Todoist's own order.
+
     Returns:
-        List of tasks with id, content, url, due date, and priority.
+        One page of tasks. "due" is an ISO date or datetime, plus
+        "recurring": true on recurring tasks. next_cursor is set when more
+        tasks match; as_of says when the rows were computed (UTC).
     """
-    return _list_tasks_with_filter("today")
+    return _list_tasks_with_filter("today", refresh=refresh, fields=fields, limit=limit, cursor=cursor, sort=sort)
 
 
-@mcp.tool()
-def list_tasks_overdue() -> dict:
+@_tool()
+def list_tasks_overdue(
+    refresh: bool = False,
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> dict:
     """
     List overdue tasks (past their due date).
 
     Use when the user asks about late tasks, overdue items, or what they've missed.
 
+    Args:
+        refresh: Re-sync with Todoist before answering instead of using the
+            local copy (only needed if the user just changed something in Todoist).
+        fields: Task fields to return (default id, content, due, priority,
+            project_id). Also available: project (name/path), labels,
+            description, due_string (e.g. "every monday"), url.
+        limit: Page size, 1-200 (default 50).
+        cursor: next_cursor from the previous response, to fetch the next page.
+        sort: "priority" (most urgent first), "due" (earliest first) or
+            "project". Default is Todoist's own order.
+
     Returns:
-        List of tasks with id, content, url, due date, and priority.
+        One page of tasks. "due" is an ISO date or datetime, plus
+        "recurring": true on recurring tasks. next_cursor is set when more
+        tasks match; as_of says when the rows were computed (UTC).
     """
-    return _list_tasks_with_filter("overdue")
+    return _list_tasks_with_filter("overdue", refresh=refresh, fields=fields, limit=limit, cursor=cursor, sort=sort)
 
 
-@mcp.tool()
-def list_tasks_this_week() -> dict:
+@_tool()
+def list_tasks_this_week(
+    refresh: bool = False,
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> dict:
     """
     List tasks due this week (including today and overdue).
 
     Use when the user asks what they need to do this week, their weekly tasks,
     or what's coming up this week.
 
+    Args:
+        refresh: Re-sync with Todoist before answering instead of using the
+            local copy (only needed if the user just changed something in Todoist).
+        fields: Task fields to return (default id, content, due, priority,
+            project_id). Also available: project (name/path), labels,
+            description, due_string (e.g. "every monday"), url.
+        limit: Page size, 1-200 (default 50).
+        cursor: next_cursor from the previous response, to fetch the next page.
+        sort: "priority" (most urgent first), "due" (earliest first) or
+            "project". Default is Todoist's own order.
+
+    Returns:
+        One page of tasks. "due" is an ISO date or datetime, plus
+        "recurring": true on recurring tasks. next_cursor is set when more
+        tasks match; as_of says when the rows were computed (UTC).
+    """
+    return _list_tasks_with_filter(
+        "due before: next week", refresh=refresh, fields=fields, limit=limit, cursor=cursor, sort=sort
+    )
+
+
+@_tool()
+def get_agenda(
+    refresh: bool = False,
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
+) -> dict:
+    """
+    Get the user's agenda in one call: due today, overdue, and this week.
+
+    Use for "what do I have today?", a morning briefing, or any question that
+    would otherwise need list_tasks_today and list_tasks_overdue together.
+    With the agenda scheduler on (TODOIST_AGENDA_TIMES) it is precomputed
+    and answers instantly.
+
+    Args:
+        refresh: Re-sync with Todoist and recompute instead of using the
+            precomputed agenda.
+        fields: Task fields to return (default id, content, due, priority,
+            project_id). Also available: project (name/path), labels,
+            description, due_string (e.g. "every monday"), url.
+        limit: Most tasks listed per section, 1-200 (default 50). Counts
+            always cover every task.
+
+    Returns:
+        today, overdue and this_week task lists (this_week includes today
+        and overdue), their full counts, by_project (this week's task count
+        per project path, largest first), the user's local date, and as_of
+        (UTC) saying when the agenda was computed.
+    """
+    try:
+        fields = _listing.check_fields(fields)
+        limit = _listing.check_limit(limit)
+        sections = _agenda.build(refresh=refresh)
+        replica = _replica.get_metadata()
+        index = replica.project_index
+
+        def project_path(project_id: Optional[str]) -> Optional[str]:
+            return index.path_of(project_id) if project_id else None
+
+        by_project: dict[str, int] = {}
+        for task in sections["this_week"].rows:
+            path = project_path(task.get("project_id")) or "(unknown project)"
+            by_project[path] = by_project.get(path, 0) + 1
+        result: dict = {"success": True, "date": replica.today().isoformat()}
+        for name, entry in sections.items():
+            result[name] = [_listing.shape(t, fields, project_path) for t in entry.rows[:limit]]
+        result["counts"] = {name: len(entry.rows) for name, entry in sections.items()}
+        result["by_project"] = dict(sorted(by_project.items(), key=lambda item: -item[1]))
+        result["as_of"] = _listing.as_of(min(entry.as_of for entry in sections.values()))
+        return result
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to get agenda: {e}",
+        }
+
+
+@_tool()
+def export_tasks(
+    name: str = "tasks.ndjson",
+    format: str = "ndjson",
+    include_completed: bool = True,
+    since: Optional[str] = None,
+    incremental: bool = False,
+    restart: bool = False,
+) -> dict:
+    """
+    Export all active (and completed) tasks to a file for analysis.
+
+    Use when the user wants their Todoist data out of Todoist, e.g. to analyze
+    completion rates or how long tasks stay overdue. Not for answering
+    questions directly; use the list tools for that. Tasks are streamed page
+    by page, so large accounts are fine. Calling again with the same name
+    resumes an interrupted export.
+
+    Args:
+        name: Output file name inside the server's export directory, e.g.
+            "tasks.ndjson" (a directory of part files for parquet).
+        format: "ndjson" (one JSON object per line) or "parquet" (columnar;
+            needs pyarrow on the server).
+        include_completed: Also export completed tasks.
+        since: ISO date the completed-task history starts at (default one
+            year ago). Ignored for incremental exports.
+        incremental: Only append tasks changed or completed since the last
+            finished export with this name.
+        restart: Start over instead of resuming an interrupted export.
+
     Returns:
-        List of tasks with id, content, url, due date, and priority.
+        The file path, rows written per status (active, completed, deleted),
+        whether it resumed or was incremental, and the time it covers up to.
     """
-    return _list_tasks_with_filter("due before: next week")
+    try:
+        result = _export.export_tasks(
+            _export.resolve_name(name), fmt=format, include_completed=include_completed,
+            since=since, incremental=incremental, restart=restart,
+        )
+        return {"success": True, **result}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to export tasks: {e}",
+        }
 
 
-@mcp.tool()
+@_tool()
 def complete_task(task_id: str) -> dict:
     """
     Mark a task as completed (close it).
@@ -245,10 +793,31 @@ def complete_task(task_id: str) -> dict:
 
     Returns:
         success and a message, or an error if the task could not be closed.
+        With the write queue on, the completion is journaled and sent in the
+        background (queued=true); if Todoist then rejects it, that shows in
+        get_write_queue_status.
     """
-    api = _get_api()
     try:
-        api.complete_task(task_id=task_id)
+        journal = _journal.get_journal()
+        if journal is not None:
+            if _journal.is_provisional(task_id) and not journal.has_task(task_id):
+                raise ValueError(f"Unknown provisional task id {task_id}")
+            journal.append("item_close", {"id": task_id}, target=task_id)
+            _replica.queue_write(closed=task_id)
+            _querycache.discard(task_ids=[task_id])
+            _journal.start_worker()
+            _dedupe.forget(task_id)
+            return {
+                "success": True,
+                "queued": True,
+                "message": f"Queued completion of task {task_id}",
+            }
+        if _journal.is_provisional(task_id):
+            raise ValueError(f"Task {task_id} is still queued; enable TODOIST_WRITE_QUEUE to complete it")
+        _get_api().complete_task(task_id=task_id)
+        _replica.invalidate()
+        _querycache.discard(task_ids=[task_id])
+        _dedupe.forget(task_id)
         return {
             "success": True,
             "message": f"Completed task {task_id}",
@@ -259,3 +828,379 @@ def complete_task(task_id: str) -> dict:
             "error": str(e),
             "message": f"Failed to complete task: {e}",
         }
+
+
+def _sync_item_args(item: dict) -> dict:
+    """Translate a create_task-style dict into Sync API item_add args."""
+    args = {"content": item["content"], "labels": ["nanobot"]}
+    if item.get("project_id"):
+        args["project_id"] = item["project_id"]
+    elif item.get("project"):
+        args["project_id"] = _resolve_project(item["project"])
+    if item.get("due_string"):
+        args["due"] = _sync_due(item["due_string"])
+    priority = item.get("priority")
+    if priority is not None and 1 <= int(priority) <= 4:
+        args["priority"] = int(priority)
+    if item.get("description"):
+        args["description"] = item["description"]
+    return args
+
+
+@_tool()
+def create_tasks_batch(tasks: list[dict]) -> dict:
+    """
+    Create many tasks in one call.
+
+    Use instead of repeated create_task calls when the user wants several tasks
+    added at once (e.g. action items from a meeting summary). Up to 100 tasks
+    are sent per Todoist request.
+
+    Args:
+        tasks: List of tasks. Each is an object with "content" (required) and
+            optional "project_id" or "project" (name or path), "due_string",
+            "priority" (1-4) and "description", with the same meaning as in create_task.
+
+    Returns:
+        Per-task results (index, success, id or error) and created/failed counts.
+    """
+    results: list[Optional[dict]] = [None] * len(tasks)
+    pending = []
+    for index, item in enumerate(tasks):
+        if not isinstance(item, dict) or not item.get("content"):
+            results[index] = {"index": index, "success": False, "error": "content is required"}
+            continue
+        try:
+            pending.append((index, item, _commands.item_add(_sync_item_args(item))))
+        except (TypeError, ValueError) as e:
+            results[index] = {"index": index, "success": False, "error": str(e)}
+
+    try:
+        statuses, temp_ids = _commands.run_commands([cmd for _, _, cmd in pending])
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to create tasks: {e}",
+        }
+    if pending:
+        _replica.invalidate()
+        # Todoist resolves the due strings, so any filter may now match.
+        _querycache.clear()
+
+    for index, item, cmd in pending:
+        status = statuses[cmd["uuid"]]
+        if status == "ok":
+            results[index] = {
+                "index": index,
+                "success": True,
+                "id": temp_ids.get(cmd["temp_id"]),
+                "content": item["content"],
+            }
+        else:
+            results[index] = {"index": index, "success": False, "error": status}
+
+    created = sum(1 for r in results if r["success"])
+    return {
+        "success": created == len(tasks),
+        "results": results,
+        "created": created,
+        "failed": len(tasks) - created,
+        "message": f"Created {created} of {len(tasks)} tasks",
+    }
+
+
+@_tool()
+def complete_tasks_batch(task_ids: list[str]) -> dict:
+    """
+    Mark many tasks as completed in one call.
+
+    Use instead of repeated complete_task calls, e.g. "complete everything
+    overdue" after listing the tasks. The same rules as complete_task apply:
+    only use real task IDs from a list tool or a prior create response.
+
+    Args:
+        task_ids: IDs of the tasks to complete.
+
+    Returns:
+        Per-task results (task_id, success, error) and completed/failed counts.
+    """
+    cmds = [_commands.item_close(task_id) for task_id in task_ids]
+    try:
+        statuses, _ = _commands.run_commands(cmds)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to complete tasks: {e}",
+        }
+    if cmds:
+        _replica.invalidate()
+        _querycache.discard(task_ids=task_ids)
+
+    results = []
+    for task_id, cmd in zip(task_ids, cmds):
+        status = statuses[cmd["uuid"]]
+        if status == "ok":
+            results.append({"task_id": task_id, "success": True})
+        else:
+            results.append({"task_id": task_id, "success": False, "error": status})
+
+    completed = sum(1 for r in results if r["success"])
+    return {
+        "success": completed == len(task_ids),
+        "results": results,
+        "completed": completed,
+        "failed": len(task_ids) - completed,
+        "message": f"Completed {completed} of {len(task_ids)} tasks",
+    }
+
+
+BULK_ACTIONS = ("reschedule", "set_priority", "move", "add_label", "complete")
+DEFAULT_BULK_MAX_TASKS = 100
+
+
+def _all_matching_tasks(filter_query: str) -> list[dict]:
+    """Every task matching filter_query (fresh from Todoist), page by page."""
+    fields = ["id", "content", "due", "priority", "project_id", "labels"]
+    tasks: list[dict] = []
+    cursor = None
+    while True:
+        page = _list_tasks_with_filter(
+            filter_query, refresh=cursor is None, fields=fields,
+            limit=_listing.MAX_LIMIT, cursor=cursor,
+        )
+        if not page["success"]:
+            raise RuntimeError(page["error"])
+        tasks.extend(page["tasks"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return tasks
+
+
+def _bulk_change(action: str, task: dict, target: Any) -> tuple[Optional[dict], Optional[str]]:
+    """Return (Sync API command, None) for one task, or (None, why it is skipped)."""
+    if action == "complete":
+        return _commands.item_close(task["id"]), None
+    if action == "reschedule":
+        if task.get("recurring"):
+            return None, "recurring task keeps its schedule"
+        return _commands.item_update(task["id"], due=target), None
+    if action == "set_priority":
+        if task.get("priority") == target:
+            return None, f"already priority {target}"
+        return _commands.item_update(task["id"], priority=target), None
+    if action == "move":
+        if task.get("project_id") == target:
+            return None, "already in that project"
+        return _commands.item_move(task["id"], target), None
+    labels = task.get("labels") or []
+    if target in labels:
+        return None, f"already labeled @{target}"
+    return _commands.item_update(task["id"], labels=labels + [target]), None
+
+
+@_tool()
+def bulk_update_tasks(
+    filter_query: str,
+    action: str,
+    due_string: Optional[str] = None,
+    priority: Optional[int] = None,
+    project: Optional[str] = None,
+    label: Optional[str] = None,
+    dry_run: bool = False,
+    max_tasks: int = DEFAULT_BULK_MAX_TASKS,
+) -> dict:
+    """
+    Apply one change to every task matching a filter, in a single call.
+
+    Use for requests like "push all my overdue tasks to tomorrow" or "make
+    everything in #Errands p2" instead of listing tasks and changing them one
+    by one. When more than a few tasks match, call with dry_run=true first and
+    confirm the list with the user. Changes are sent up to 100 per Todoist
+    request.
+
+    Args:
+        filter_query: Todoist filter selecting the tasks, e.g. "overdue" or "#Work & p4".
+        action: "reschedule" (needs due_string), "set_priority" (needs
+            priority), "move" (needs project), "add_label" (needs label) or
+            "complete".
+        due_string: New due date in natural language, e.g. "tomorrow".
+            Recurring tasks are skipped so they keep their schedule.
+        priority: New priority 1-4 (1=normal, 2=medium, 3=high, 4=urgent).
+        project: Target project name, path (e.g. "Work/Clients") or id.
+        label: Label to add, without the "@".
+        dry_run: Only report which tasks would change.
+        max_tasks: Refuse to change anything if more tasks match (default 100).
+
+    Returns:
+        matched/updated/skipped/failed counts and per-task results (task_id,
+        content, success, and error or skipped). With dry_run, the tasks that
+        would change and those that would be skipped.
+    """
+    try:
+        action = (action or "").strip().lower()
+        if action not in BULK_ACTIONS:
+            raise ValueError(f"action must be one of: {', '.join(BULK_ACTIONS)}")
+        if action == "reschedule":
+            if not due_string:
+                raise ValueError("reschedule needs due_string")
+            target: Any = _sync_due(due_string)
+        elif action == "set_priority":
+            if priority is None or not 1 <= int(priority) <= 4:
+                raise ValueError("set_priority needs priority 1-4")
+            target = int(priority)
+        elif action == "move":
+            if not project:
+                raise ValueError("move needs project")
+            target = _resolve_project(project)
+        elif action == "add_label":
+            target = (label or "").strip().lstrip("@")
+            if not target:
+                raise ValueError("add_label needs label")
+        else:
+            target = None
+
+        tasks = _all_matching_tasks(filter_query)
+        if len(tasks) > max_tasks:
+            raise ValueError(
+                f"{len(tasks)} tasks match {filter_query!r}, more than max_tasks={max_tasks}; "
+                "narrow the filter or raise max_tasks"
+            )
+
+        results = []
+        pending = []
+        for task in tasks:
+            result = {"task_id": task["id"], "content": task["content"]}
+            cmd, skipped = _bulk_change(action, task, target)
+            if skipped:
+                result.update(success=True, skipped=skipped)
+            else:
+                pending.append((result, cmd))
+            results.append(result)
+
+        if dry_run:
+            for result, _ in pending:
+                result["would_change"] = True
+            return {
+                "success": True,
+                "dry_run": True,
+                "action": action,
+                "matched": len(tasks),
+                "would_change": len(pending),
+                "results": results,
+                "message": f"Would {action.replace('_', ' ')} {len(pending)} of {len(tasks)} matching tasks",
+            }
+
+        statuses, _ = _commands.run_commands([cmd for _, cmd in pending])
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to update tasks: {e}",
+        }
+
+    for result, cmd in pending:
+        status = statuses[cmd["uuid"]]
+        result["success"] = status == "ok"
+        if status != "ok":
+            result["error"] = status
+    changed = [result["task_id"] for result, _ in pending if result["success"]]
+    if changed:
+        _replica.invalidate()
+        if action == "complete":
+            _querycache.discard(task_ids=changed)
+        else:
+            # New due dates, projects or labels may match any cached filter.
+            _querycache.clear()
+
+    failed = len(pending) - len(changed)
+    return {
+        "success": failed == 0,
+        "action": action,
+        "matched": len(tasks),
+        "updated": len(changed),
+        "skipped": len(tasks) - len(pending),
+        "failed": failed,
+        "results": results,
+        "message": f"Applied {action.replace('_', ' ')} to {len(changed)} of {len(tasks)} matching tasks",
+    }
+
+
+@_tool()
+def get_write_queue_status() -> dict:
+    """
+    Show the offline write queue: how many writes are waiting for Todoist.
+
+    Use when the user asks whether a queued task has reached Todoist yet, or
+    when create_task/complete_task answered with queued=true and Todoist seems
+    out of date.
+
+    Returns:
+        pending and failed counts, replay_lag_seconds (age of the oldest
+        unsent write), last_error, and the most recent failed writes.
+    """
+    try:
+        journal = _journal.get_journal()
+        if journal is None:
+            return {
+                "success": True,
+                "enabled": False,
+                "message": "Write queue is off; writes go straight to Todoist",
+            }
+        status = journal.status()
+        return {
+            "success": True,
+            "enabled": True,
+            **status,
+            "message": f"{status['pending']} pending, {status['failed']} failed",
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to read write queue status: {e}",
+        }
+
+
+@_tool()
+def get_server_stats() -> dict:
+    """
+    Report this server's performance counters.
+
+    Use when the user asks why Todoist answers are slow, or to check whether
+    time is spent in this server, in Todoist, or elsewhere.
+
+    Returns:
+        Per-tool calls, errors, latency (mean/p50/p95/max in ms) and mean
+        response size; per Todoist endpoint the same plus status counts and
+        retries; cache hit ratios; calls coalesced into an identical in-flight
+        request; connection pool / rate-limit counters; the size of the
+        cache shared with other processes; and duplicate-create checks.
+    """
+    try:
+        stats = _metrics.snapshot()
+        info = compile_filter.cache_info()
+        stats["caches"]["filter_compile"] = {
+            "hit": info.hits,
+            "miss": info.misses,
+            "hit_ratio": round(info.hits / (info.hits + info.misses), 3)
+            if info.hits + info.misses else None,
+        }
+        stats["caches"].setdefault("results", {})["entries"] = _querycache.size()
+        stats["connections"] = connection_stats()
+        store = get_store()
+        if store is not None:
+            stats["shared_cache"] = store.stats(account_key())
+        if _tenants.enabled():
+            stats["tenants"] = _tenants.stats()
+        if _agenda.enabled():
+            stats["agenda"] = _agenda.stats()
+        stats["dedupe"] = _dedupe.stats()
+        return {"success": True, **stats}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Failed to collect server stats: {e}",
+        }
@@ -0,0 +1,101 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+
+Parallel tool calls on the --http transport often ask the same thing at
+the same moment: several agents open with list_projects, or run the same
+filter. Without coordination each one fetches from Todoist. do() runs the
+first call for a key and makes every identical call that arrives while it
+is in flight wait for that result instead, so Todoist sees at most one
+request per distinct query at a time.
+
+Waiters get the leader's exception if it fails, and give up with
+TimeoutError after TODOIST_COALESCE_TIMEOUT seconds (default 90, enough
+for a request and its retries). Coalesced calls are counted per call name
+in metrics (coalesced_calls_total).
+
+Keys include the account (see client.account_key), so HTTP tenants never
+share results.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from . import client, metrics
+
+DEFAULT_TIMEOUT = 90.0
+
+
+def _timeout() -> float:
+    raw = os.environ.get("TODOIST_COALESCE_TIMEOUT")
+    try:
+        value = float(raw) if raw else DEFAULT_TIMEOUT
+    except ValueError:
+        return DEFAULT_TIMEOUT
+    return value if value > 0 else DEFAULT_TIMEOUT
+
+
+class _Call:
+    """One in-flight call and the outcome its waiters will share."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Map from key to the call currently computing it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, name: str, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Return fn(), shared with every identical call made while it runs.
+
+        Args:
+            name: Call name for the coalesced-calls counter.
+            key: Identity of the call; equal keys share one fn() run.
+            fn: The call itself (run in the first caller's thread).
+            timeout: Seconds a waiter waits (default TODOIST_COALESCE_TIMEOUT).
+
+        Raises:
+            TimeoutError: If this call waited for another that did not finish in time.
+            Whatever fn() raised, in the first caller and every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        metrics.record_coalesced(name)
+        wait = _timeout() if timeout is None else timeout
+        if not call.done.wait(wait):
+            raise TimeoutError(f"Timed out after {wait:g}s waiting for an identical {name} request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+_group = SingleFlight()
+
+
+def do(name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+    """Run fn() once for all concurrent calls with the same name and key (per account)."""
+    return _group.do(name, (client.account_key(), name, key), fn)
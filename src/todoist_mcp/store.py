@@ -0,0 +1,351 @@
+"""
+On-disk cache shared by every server process of the account.
+
+Nanobot respawns the stdio server per session, cron jobs run run.py CLI
+commands, and an HTTP server may run alongside. They all keep the replica
+(see replica.py) in one SQLite database: project, section and label
+metadata, the user's timezone, every active task and the Sync token they
+correspond to, plus recent list results (see querycache.py). A freshly
+started process loads that state instead of refetching it: within
+TODOIST_REPLICA_MAX_AGE of the last sync by any process it answers without
+touching Todoist, after that it only pulls the delta since the shared token.
+
+Concurrent access: the database is in WAL mode, so readers never block the
+single writer, and each process serializes its own use of its connection.
+Invalidation is versioned: every change any process saves (a sync, a
+webhook push, or a write that makes the replica stale) bumps the account's
+version, and task rows carry the version that last changed them. Before
+serving from memory a process compares versions and loads only the rows
+that changed since; cached results are only valid for the version they were
+computed at.
+
+The database lives in TODOIST_CACHE_DIR, else $XDG_CACHE_HOME/todoist-mcp,
+else ~/.cache/todoist-mcp. Rows are keyed by a hash of the API token, never
+the token itself. Set TODOIST_CACHE_DIR=off to disable the cache. Cache
+errors are never fatal: tools simply fall back to fetching from Todoist.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+METADATA_KINDS = ("projects", "sections", "labels")
+# Also saved: the user's id and timezone, so due phrases resolve before a sync.
+SNAPSHOT_KINDS = METADATA_KINDS + ("user",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    account TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, kind, id)
+);
+CREATE INDEX IF NOT EXISTS metadata_by_name ON metadata (account, kind, name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS snapshots (
+    account TEXT PRIMARY KEY,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS replica_state (
+    account TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    base_version INTEGER NOT NULL,
+    metadata_version INTEGER NOT NULL,
+    sync_token TEXT,
+    synced_at REAL NOT NULL,
+    stale INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    account TEXT NOT NULL,
+    id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    data TEXT,
+    PRIMARY KEY (account, id)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_version ON tasks (account, version);
+CREATE TABLE IF NOT EXISTS results (
+    account TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    as_of REAL NOT NULL,
+    next_page TEXT,
+    rows TEXT NOT NULL,
+    PRIMARY KEY (account, key)
+);
+"""
+
+# Removed tasks stay as NULL rows ("tombstones") so other processes learn of
+# the removal; past this many (and more than there are live tasks) they are
+# purged and every process reloads the tasks in full instead.
+MAX_TOMBSTONES = 1000
+
+
+@dataclass(frozen=True)
+class SharedState:
+    """Where an account's shared replica stands."""
+
+    # Bumped by every saved change.
+    version: int
+    # Processes older than this must reload all tasks (full sync or purge).
+    base_version: int
+    # Version of the last metadata (projects, sections, labels, user) change.
+    metadata_version: int
+    sync_token: Optional[str]
+    # Epoch seconds of the last sync by any process; 0 if none yet.
+    synced_at: float
+    # A write made the data outdated; the next read must sync.
+    stale: bool
+
+
+def cache_dir() -> Optional[Path]:
+    """Return the cache directory, or None if caching is disabled."""
+    configured = os.environ.get("TODOIST_CACHE_DIR")
+    if configured:
+        return None if configured.lower() == "off" else Path(configured).expanduser()
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg).expanduser() if xdg else Path.home() / ".cache"
+    return base / "todoist-mcp"
+
+
+class CacheStore:
+    """SQLite-backed replica snapshots and list results per account."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def load(self, account: str) -> Optional[dict]:
+        """
+        Return {"projects": [...], "sections": [...], "labels": [...],
+        "user": [...], "saved_at": epoch seconds} for the account, or None if never saved.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT saved_at FROM snapshots WHERE account = ?", (account,)
+            ).fetchone()
+            if row is None:
+                return None
+            snapshot: dict = {kind: [] for kind in SNAPSHOT_KINDS}
+            snapshot["saved_at"] = row[0]
+            for kind, data in conn.execute(
+                "SELECT kind, data FROM metadata WHERE account = ?", (account,)
+            ):
+                snapshot[kind].append(json.loads(data))
+            return snapshot
+
+    def state(self, account: str) -> Optional[SharedState]:
+        """Return the account's shared replica state, or None if never saved."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT version, base_version, metadata_version, sync_token, synced_at, stale"
+                " FROM replica_state WHERE account = ?",
+                (account,),
+            ).fetchone()
+        return None if row is None else SharedState(*row[:5], stale=bool(row[5]))
+
+    def load_tasks(self, account: str, after: Optional[int] = None) -> list[tuple[str, Optional[dict]]]:
+        """
+        Return (id, row) pairs of the account's tasks.
+
+        Args:
+            after: Only tasks changed after this version, including removed
+                ones (row None). None returns every active task.
+        """
+        with self._lock:
+            conn = self._connect()
+            if after is None:
+                rows = conn.execute(
+                    "SELECT id, data FROM tasks WHERE account = ? AND data IS NOT NULL", (account,)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT id, data FROM tasks WHERE account = ? AND version > ?", (account, after)
+                ).fetchall()
+        return [(task_id, json.loads(data) if data else None) for task_id, data in rows]
+
+    def save_changes(
+        self,
+        account: str,
+        tasks: Iterable[dict] = (),
+        removed: Iterable[str] = (),
+        full: bool = False,
+        metadata: Optional[dict] = None,
+        sync_token: Optional[str] = None,
+        stale: Optional[bool] = None,
+    ) -> int:
+        """
+        Record a change to the account's replica and return the new version.
+
+        Args:
+            tasks: Added or updated task rows.
+            removed: Ids of completed or deleted tasks.
+            full: tasks is the complete set; every other task is dropped.
+            metadata: New kind -> rows mapping of projects, sections, labels
+                and user, replacing the stored ones.
+            sync_token: The Sync token the data now corresponds to; None for
+                changes that did not come from a sync (pushes, writes).
+            stale: True marks the data outdated so every process syncs
+                first, False clears that (after a sync), None keeps it.
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO replica_state VALUES (?, 0, 0, 0, NULL, 0, 0)", (account,)
+                )
+                version, was_stale = conn.execute(
+                    "SELECT version, stale FROM replica_state WHERE account = ?", (account,)
+                ).fetchone()
+                tasks, removed = list(tasks), list(removed)
+                changed = full or tasks or removed or metadata is not None or (
+                    stale is not None and stale != bool(was_stale)
+                )
+                if changed:
+                    # Syncs that changed nothing only move the token on.
+                    version += 1
+                    conn.execute(
+                        "UPDATE replica_state SET version = ? WHERE account = ?", (version, account)
+                    )
+                if full:
+                    conn.execute("DELETE FROM tasks WHERE account = ?", (account,))
+                    conn.execute(
+                        "UPDATE replica_state SET base_version = ? WHERE account = ?", (version, account)
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)",
+                    [(account, row["id"], version, json.dumps(row)) for row in tasks],
+                )
+                if removed:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, NULL)",
+                        [(account, task_id, version) for task_id in removed],
+                    )
+                    self._purge_tombstones(conn, account, version)
+                if metadata is not None:
+                    self._save_metadata(conn, account, metadata)
+                    conn.execute(
+                        "UPDATE replica_state SET metadata_version = ? WHERE account = ?",
+                        (version, account),
+                    )
+                if sync_token is not None:
+                    conn.execute(
+                        "UPDATE replica_state SET sync_token = ?, synced_at = ? WHERE account = ?",
+                        (sync_token, time.time(), account),
+                    )
+                if stale is not None:
+                    conn.execute(
+                        "UPDATE replica_state SET stale = ? WHERE account = ?", (int(stale), account)
+                    )
+        return version
+
+    @staticmethod
+    def _purge_tombstones(conn: sqlite3.Connection, account: str, version: int) -> None:
+        removed, live = conn.execute(
+            "SELECT COUNT(*) - COUNT(data), COUNT(data) FROM tasks WHERE account = ?", (account,)
+        ).fetchone()
+        if removed > MAX_TOMBSTONES and removed > live:
+            conn.execute("DELETE FROM tasks WHERE account = ? AND data IS NULL", (account,))
+            conn.execute(
+                "UPDATE replica_state SET base_version = ? WHERE account = ?", (version, account)
+            )
+
+    @staticmethod
+    def _save_metadata(conn: sqlite3.Connection, account: str, collections: dict) -> None:
+        rows = [
+            (account, kind, row["id"], row.get("name", ""), json.dumps(row))
+            for kind in SNAPSHOT_KINDS
+            for row in collections.get(kind, ())
+        ]
+        conn.execute("DELETE FROM metadata WHERE account = ?", (account,))
+        conn.executemany("INSERT INTO metadata VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (account, time.time()))
+
+    def load_result(self, account: str, key: str) -> Optional[dict]:
+        """
+        Return a cached list result if it is still current, else None.
+
+        Returns:
+            {"rows": [...], "next_page": ..., "expires_at": ..., "as_of": ...}
+            for a result saved at the account's current version and not
+            expired yet.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT r.rows, r.next_page, r.expires_at, r.as_of FROM results r"
+                " JOIN replica_state s ON s.account = r.account AND s.version = r.version"
+                " WHERE r.account = ? AND r.key = ? AND r.expires_at > ?",
+                (account, key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        rows, next_page, expires_at, as_of = row
+        return {"rows": json.loads(rows), "next_page": next_page, "expires_at": expires_at, "as_of": as_of}
+
+    def save_result(
+        self, account: str, key: str, version: int, rows: list[dict],
+        next_page: Optional[str], expires_at: float, as_of: float,
+    ) -> None:
+        """Cache a list result computed from the data at version."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+                conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (account, key, version, expires_at, as_of, next_page, json.dumps(rows)),
+                )
+
+    def stats(self, account: str) -> dict:
+        """Size and version of the account's shared cache."""
+        with self._lock:
+            conn = self._connect()
+            (tasks,) = conn.execute(
+                "SELECT COUNT(data) FROM tasks WHERE account = ?", (account,)
+            ).fetchone()
+            (results,) = conn.execute(
+                "SELECT COUNT(*) FROM results WHERE account = ? AND expires_at > ?",
+                (account, time.time()),
+            ).fetchone()
+        state = self.state(account)
+        return {
+            "path": str(self.path),
+            "version": state.version if state else 0,
+            "tasks": tasks,
+            "results": results,
+        }
+
+
+_store: Optional[CacheStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[CacheStore]:
+    """Return the process-wide cache store, or None if caching is disabled."""
+    global _store
+    directory = cache_dir()
+    if directory is None:
+        return None
+    with _store_lock:
+        path = directory / "cache.sqlite3"
+        if _store is None or _store.path != path:
+            _store = CacheStore(path)
+        return _store
@@ -0,0 +1,226 @@
+"""
+Per-request Todoist accounts for the --http server.
+
+By default every tool call uses TODOIST_API_TOKEN. With tenants enabled, an
+HTTP client identifies itself with an `Authorization: Bearer <key>` header:
+
+    TODOIST_TENANT_MAP     Path to a JSON file {"<client key>": "<Todoist
+                           token>", ...}; the key is looked up there.
+    TODOIST_TENANT_TOKENS  "on" accepts a key that is not in the map as the
+                           caller's own Todoist API token.
+
+A key that matches neither is rejected. Requests without the header (and
+stdio / CLI calls) keep using TODOIST_API_TOKEN.
+
+Each tenant gets its own pooled session (and with it its own rate limiter
+and retry scheduler), replica and result cache. Modules keep these in
+tenant slots (see local()) instead of their process-wide singletons while a
+tenant is active. At most TODOIST_MAX_TENANTS tenants (default 8) are kept.
+When another one arrives the least recently used idle tenant is evicted,
+and tenants idle for more than TODOIST_TENANT_IDLE seconds (default 1800)
+are dropped. An evicted tenant simply starts cold next time. Its queued
+writes stay in the journal and are replayed once it is back.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+DEFAULT_MAX_TENANTS = 8
+DEFAULT_IDLE_SECONDS = 1800.0
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    try:
+        value = float(raw) if raw else default
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+class Tenant:
+    """One Todoist account served by this process, with its own state slots."""
+
+    def __init__(self, token: str) -> None:
+        self.token = token
+        self.key = hashlib.sha256(token.encode()).hexdigest()[:16]
+        self.last_used = time.monotonic()
+        self.active = 0
+        self._slots: dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def local(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return this tenant's instance of name, creating it on first use."""
+        with self._lock:
+            if name not in self._slots:
+                self._slots[name] = factory()
+            return self._slots[name]
+
+    def hold(self, delta: int, touch: bool = True) -> None:
+        """Count a tool call entering (+1) or leaving (-1) this tenant."""
+        with self._lock:
+            self.active += delta
+            if touch:
+                self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        session = self._slots.get("session")
+        if session is not None:
+            session.close()
+        self._slots.clear()
+
+
+class TenantRegistry:
+    """LRU of tenants keyed by token, bounded in count and idle time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, token: str) -> Tenant:
+        with self._lock:
+            tenant = self._tenants.get(token)
+            if tenant is None:
+                tenant = self._tenants[token] = Tenant(token)
+            self._tenants.move_to_end(token)
+            tenant.last_used = time.monotonic()
+            self._evict()
+            return tenant
+
+    def _evict(self) -> None:
+        limit = int(_env_number("TODOIST_MAX_TENANTS", DEFAULT_MAX_TENANTS))
+        idle_after = _env_number("TODOIST_TENANT_IDLE", DEFAULT_IDLE_SECONDS)
+        now = time.monotonic()
+        # Oldest first; the tenant just touched is last and never evicted.
+        for token, tenant in list(self._tenants.items())[:-1]:
+            if tenant.active:
+                continue
+            if len(self._tenants) > limit or now - tenant.last_used > idle_after:
+                del self._tenants[token]
+                tenant.close()
+                self.evictions += 1
+
+    def all(self) -> list[Tenant]:
+        with self._lock:
+            return list(self._tenants.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "max_tenants": int(_env_number("TODOIST_MAX_TENANTS", DEFAULT_MAX_TENANTS)),
+                "evictions": self.evictions,
+            }
+
+
+_registry = TenantRegistry()
+_current: ContextVar[Optional[Tenant]] = ContextVar("todoist_tenant", default=None)
+_map_cache: tuple[Optional[Path], float, dict] = (None, 0.0, {})
+_map_lock = threading.Lock()
+
+
+def _accept_tokens() -> bool:
+    return os.environ.get("TODOIST_TENANT_TOKENS", "").lower() in ("1", "on", "true", "yes")
+
+
+def enabled() -> bool:
+    """True if HTTP clients may select their own account."""
+    return bool(os.environ.get("TODOIST_TENANT_MAP")) or _accept_tokens()
+
+
+def _token_map() -> dict:
+    """Load TODOIST_TENANT_MAP, re-reading it when the file changes."""
+    global _map_cache
+    raw = os.environ.get("TODOIST_TENANT_MAP")
+    if not raw:
+        return {}
+    path = Path(raw).expanduser()
+    mtime = path.stat().st_mtime
+    with _map_lock:
+        cached_path, cached_mtime, mapping = _map_cache
+        if cached_path != path or cached_mtime != mtime:
+            mapping = json.loads(path.read_text(encoding="utf-8"))
+            if not isinstance(mapping, dict):
+                raise ValueError(f"{path} must map client keys to Todoist tokens")
+            _map_cache = (path, mtime, mapping)
+        return mapping
+
+
+def resolve(authorization: Optional[str]) -> Optional[Tenant]:
+    """
+    Pick the tenant for a request's Authorization header.
+
+    Returns:
+        None when tenants are off or the header is absent (use
+        TODOIST_API_TOKEN), otherwise the caller's tenant.
+
+    Raises:
+        PermissionError: If the bearer key is neither mapped nor accepted
+            as a token.
+    """
+    if not enabled() or not authorization:
+        return None
+    scheme, _, key = authorization.partition(" ")
+    key = key.strip()
+    if scheme.lower() != "bearer" or not key:
+        raise PermissionError("Authorization header must be 'Bearer <key>'")
+    token = _token_map().get(key)
+    if token is None:
+        if not _accept_tokens():
+            raise PermissionError("Unknown client key")
+        token = key
+    return _registry.get(token)
+
+
+def current() -> Optional[Tenant]:
+    """The tenant the running tool call serves, or None for the default account."""
+    return _current.get()
+
+
+def local(name: str, factory: Callable[[], Any]) -> Any:
+    """The active tenant's instance of name, or None outside a tenant."""
+    tenant = _current.get()
+    return tenant.local(name, factory) if tenant is not None else None
+
+
+@contextmanager
+def use(tenant: Optional[Tenant], touch: bool = True) -> Iterator[None]:
+    """
+    Serve the enclosed calls as tenant (None: the default account).
+
+    Background work passes touch=False so it does not keep an otherwise
+    idle tenant from being evicted.
+    """
+    token = _current.set(tenant)
+    if tenant is not None:
+        tenant.hold(1, touch)
+    try:
+        yield
+    finally:
+        if tenant is not None:
+            tenant.hold(-1, touch)
+        _current.reset(token)
+
+
+def run_as(tenant: Optional[Tenant], fn: Callable[[], Any]) -> Any:
+    with use(tenant):
+        return fn()
+
+
+def everyone() -> list[Optional[Tenant]]:
+    """Every account with local state: the default (if configured) and each tenant."""
+    accounts: list[Optional[Tenant]] = [None] if os.environ.get("TODOIST_API_TOKEN") else []
+    return accounts + _registry.all()
+
+
+def stats() -> dict:
+    return _registry.stats()
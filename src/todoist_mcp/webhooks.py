@@ -0,0 +1,129 @@
+"""
+Todoist webhook receiver for the --http server.
+
+Todoist can push changes to an HTTPS callback URL registered for an app in
+its App Management Console. With TODOIST_WEBHOOK_SECRET set to that app's
+client secret, the HTTP server accepts those events on TODOIST_WEBHOOK_PATH
+(default /todoist/webhook) and applies them to the local replica, so list
+tools keep answering from memory instead of polling Todoist.
+
+Every request must carry X-Todoist-Hmac-SHA256, the base64 HMAC-SHA256 of
+the raw body keyed with the client secret; anything else is rejected.
+Handled events:
+
+    item:added, item:updated, item:uncompleted    upsert the task
+    item:completed, item:deleted                  drop the task
+    project:added, project:updated,
+    project:unarchived                            upsert the project
+    project:deleted, project:archived             drop the project
+
+Other events (notes, labels, reminders, ...) are acknowledged and ignored.
+With HTTP tenants (see tenants.py), an event is applied to every local
+replica that belongs to the event's user_id.
+handle() is transport-independent, so tests can feed it fixture payloads
+directly; sign() produces the matching signature header.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+from typing import Optional
+
+from . import replica, tenants
+
+DEFAULT_PATH = "/todoist/webhook"
+SIGNATURE_HEADER = "X-Todoist-Hmac-SHA256"
+
+_REMOVING = {
+    "item:completed": "checked",
+    "item:deleted": "is_deleted",
+    "project:deleted": "is_deleted",
+    "project:archived": "is_archived",
+}
+_RESTORING = {
+    "item:uncompleted": "checked",
+    "project:unarchived": "is_archived",
+}
+
+
+def secret() -> Optional[str]:
+    """The app client secret used to verify events, or None if webhooks are off."""
+    return os.environ.get("TODOIST_WEBHOOK_SECRET") or None
+
+
+def path() -> str:
+    return os.environ.get("TODOIST_WEBHOOK_PATH") or DEFAULT_PATH
+
+
+def sign(body: bytes, key: str) -> str:
+    """Return the X-Todoist-Hmac-SHA256 value Todoist would send for body."""
+    digest = hmac.new(key.encode(), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def verify(body: bytes, signature: Optional[str], key: str) -> bool:
+    return bool(signature) and hmac.compare_digest(sign(body, key), signature.strip())
+
+
+def handle(body: bytes, signature: Optional[str]) -> tuple[int, dict]:
+    """
+    Verify and apply one webhook delivery.
+
+    Returns:
+        (HTTP status, JSON response body). 401 for a missing or wrong
+        signature, 400 for a malformed payload, otherwise 200 (also for
+        events that were ignored, so Todoist does not retry them).
+    """
+    key = secret()
+    if key is None:
+        return 404, {"error": "Webhooks are not enabled"}
+    if not verify(body, signature, key):
+        return 401, {"error": "Invalid signature"}
+    try:
+        event = json.loads(body)
+        name = event["event_name"]
+        data = dict(event["event_data"])
+        data["id"]
+    except (ValueError, KeyError, TypeError):
+        return 400, {"error": "Malformed webhook payload"}
+
+    outcomes = []
+    for account in _accounts_of(event.get("user_id")):
+        with tenants.use(account):
+            outcomes.append(_apply(event, name, dict(data)))
+    applied = [outcome for outcome in outcomes if outcome[1].get("applied")]
+    return (applied or outcomes)[0]
+
+
+def _accounts_of(user_id: object) -> list[Optional["tenants.Tenant"]]:
+    """Accounts whose replica belongs to user_id (default: the plain account)."""
+    matches = []
+    for account in tenants.everyone():
+        with tenants.use(account):
+            if user_id is not None and str(replica.user_id()) == str(user_id):
+                matches.append(account)
+    return matches or [None]
+
+
+def _apply(event: dict, name: str, data: dict) -> tuple[int, dict]:
+    owner = replica.user_id()
+    if owner and event.get("user_id") and str(event["user_id"]) != str(owner):
+        return 200, {"applied": False, "reason": "event for another account"}
+
+    kind, _, action = name.partition(":")
+    if kind not in ("item", "project") or not action:
+        return 200, {"applied": False, "reason": f"ignored event {name}"}
+    if name in _REMOVING:
+        data[_REMOVING[name]] = True
+    elif name in _RESTORING:
+        data[_RESTORING[name]] = False
+
+    if kind == "item":
+        applied = replica.apply_push(tasks=[data])
+    else:
+        applied = replica.apply_push(projects=[data])
+    if not applied:
+        return 200, {"applied": False, "reason": "replica not synced yet"}
+    return 200, {"applied": True, "event": name, "id": data["id"]}
@@ -5,8 +5,11 @@ Run with: python test_skill.py
 Loads TODOIST_API_TOKEN from .env (or environment variable)
 """
 
+import json
 import os
+import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
 # Resolve skill directory (same as run.py) so tests work from any CWD
@@ -52,10 +55,22 @@ if not token or token.strip() == "" or token == "your-api-token-here":
     print("  Get token: https://app.todoist.com/prefs/integrations")
     sys.exit(1)
 
+# Verify writes against Todoist directly; test_write_queue covers the queue.
+os.environ.setdefault("TODOIST_WRITE_QUEUE", "off")
+
+from todoist_mcp import agenda, journal, replica, tenants, webhooks
+from todoist_mcp.dates import parse_due_phrase
 from todoist_mcp.server import (
+    bulk_update_tasks,
     complete_task,
+    complete_tasks_batch,
     create_task,
+    create_tasks_batch,
     create_reminder_task,
+    export_tasks,
+    get_agenda,
+    get_server_stats,
+    get_write_queue_status,
     list_projects,
     list_tasks_by_filter,
     list_tasks_overdue,
@@ -107,14 +122,83 @@ def test_create_reminder_task():
         return False
 
 
+def test_dedupe():
+    """Test that a repeated reminder is reported, then blocked, as a duplicate."""
+    print("\n--- Testing duplicate detection (warn, then block) ---")
+    first = create_reminder_task(content="[Test] Dedupe verification - delete me", dedupe="off")
+    if not first.get("success"):
+        print("FAILED creating:", first.get("error"))
+        return False
+    created = [first["id"]]
+    try:
+        warned = create_reminder_task(content="[test] dedupe verification, delete me!", dedupe="warn")
+        if not warned.get("success"):
+            print("FAILED creating:", warned.get("error"))
+            return False
+        created.append(warned["id"])
+        if (warned.get("duplicate_of") or {}).get("id") not in created:
+            print("FAILED: duplicate not reported:", warned)
+            return False
+        blocked = create_reminder_task(content="[Test] Dedupe verification - delete me", dedupe="block")
+        if not blocked.get("duplicate") or blocked.get("id") not in created:
+            print("FAILED: duplicate created anyway:", blocked)
+            if blocked.get("success") and blocked.get("id") not in created:
+                created.append(blocked["id"])
+            return False
+    finally:
+        for task_id in created:
+            complete_task(task_id=task_id)
+    print("OK - Repeat reported, then blocked in favour of", blocked["id"])
+    return True
+
+
+def test_due_phrases():
+    """Test that common due phrases are resolved locally and land on the right day."""
+    print("\n--- Testing due phrases (resolved locally) ---")
+    list_projects()  # learn the user's timezone
+    now = replica.user_now()
+    if now is None:
+        print("FAILED: user timezone unknown after a sync")
+        return False
+    if parse_due_phrase("every monday", now) is not None:
+        print("FAILED: recurring phrase resolved locally")
+        return False
+    expected, _ = parse_due_phrase("in 2 days", now)
+    result = create_task(content="[Test] Due phrase verification - delete me", due_string="in 2 days")
+    if not result.get("success"):
+        print("FAILED:", result.get("error", result))
+        return False
+    if expected.isoformat() not in str(result.get("due")):
+        print("FAILED: expected due", expected, "got", result.get("due"))
+        return False
+    # A freshly started process must resolve phrases before it syncs,
+    # from the timezone in the snapshot the calls above saved.
+    probe = (
+        "import json\n"
+        "from todoist_mcp.server import create_task, complete_task, get_server_stats\n"
+        "r = create_task(content='[Test] Cold due phrase - delete me', due_string='tomorrow', dedupe='off')\n"
+        "complete_task(task_id=r['id'])\n"
+        "print(json.dumps(get_server_stats()['caches'].get('due_phrases')))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(_src), os.environ.get("PYTHONPATH")]))}
+    cold = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True)
+    counts = json.loads(cold.stdout.strip().splitlines()[-1]) if cold.returncode == 0 else None
+    if not counts or counts.get("hit") != 1:
+        print("FAILED: fresh process did not resolve 'tomorrow' locally:", counts or cold.stderr[-500:])
+        return False
+    print("OK - 'in 2 days' sent as", expected, "| fresh process resolved 'tomorrow' locally")
+    return True
+
+
 def test_create_task_with_params():
-    """Test create_task with specific date, description, and priority."""
-    print("\n--- Testing create_task (date, description, priority) ---")
+    """Test create_task with specific date, description, priority, and project name."""
+    print("\n--- Testing create_task (date, description, priority, project) ---")
     result = create_task(
         content="[Test] Full params verification - delete me",
         due_string="next friday",
         priority=3,  # high
         description="Test reminder note - verify all params work",
+        project="Inbox",
     )
     if not result.get("success"):
         print("FAILED:", result.get("error", result))
@@ -200,6 +284,321 @@ def test_complete_task():
         return False
 
 
+def test_batch_tools():
+    """Test batch create, then batch complete the created tasks."""
+    print("\n--- Testing create_tasks_batch / complete_tasks_batch ---")
+    result = create_tasks_batch(tasks=[
+        {"content": "[Test] Batch item 1 - delete me", "due_string": "today"},
+        {"content": "[Test] Batch item 2 - delete me", "priority": 2},
+    ])
+    if not result.get("success"):
+        print("FAILED creating batch:", result.get("error", result.get("results")))
+        return False
+    task_ids = [r["id"] for r in result["results"]]
+    result = complete_tasks_batch(task_ids=task_ids)
+    if result.get("success"):
+        print("OK - Created and completed", task_ids)
+        return True
+    else:
+        print("FAILED:", result.get("error", result.get("results")))
+        return False
+
+
+def test_bulk_update():
+    """Test bulk_update_tasks: dry run, reschedule, then complete by filter."""
+    print("\n--- Testing bulk_update_tasks (dry run, reschedule, complete) ---")
+    marker = "bulk verification"
+    batch = create_tasks_batch(tasks=[
+        {"content": f"[Test] {marker} {n} - delete me", "due_string": "today"} for n in (1, 2)
+    ])
+    if not batch.get("success"):
+        print("FAILED creating:", batch.get("error", batch.get("results")))
+        return False
+    query = f"search: {marker}"
+    preview = bulk_update_tasks(filter_query=query, action="reschedule", due_string="tomorrow", dry_run=True)
+    if preview.get("would_change") != 2:
+        print("FAILED: dry run should find 2 tasks:", preview)
+        return False
+    moved = bulk_update_tasks(filter_query=query, action="reschedule", due_string="tomorrow")
+    tomorrow = list_tasks_by_filter(filter_query=f"{query} & tomorrow")
+    done = bulk_update_tasks(filter_query=query, action="complete")
+    if moved.get("updated") != 2 or tomorrow.get("count") != 2 or done.get("updated") != 2:
+        print("FAILED:", moved.get("message"), tomorrow.get("count"), done.get("message"))
+        return False
+    print("OK -", moved["message"], "|", done["message"])
+    return True
+
+
+def test_write_queue():
+    """Test the offline write queue: queue a create and its completion, then replay."""
+    print("\n--- Testing write queue (create_task + complete_task, queued) ---")
+    previous = os.environ.get("TODOIST_WRITE_QUEUE")
+    os.environ["TODOIST_WRITE_QUEUE"] = "on"
+    try:
+        created = create_task(content="[Test] Queued verification - delete me", due_string="today")
+        if not created.get("queued") or not created.get("provisional") or created.get("url"):
+            print("FAILED: expected a queued create with a provisional id and no url:", created)
+            return False
+        completed = complete_task(task_id=created["id"])
+        if not completed.get("queued"):
+            print("FAILED: expected a queued completion:", completed)
+            return False
+        journal.get_journal().replay_pending()
+        status = get_write_queue_status()
+    finally:
+        if previous is None:
+            os.environ.pop("TODOIST_WRITE_QUEUE", None)
+        else:
+            os.environ["TODOIST_WRITE_QUEUE"] = previous
+    if status.get("pending") or status.get("recent_failures"):
+        print("FAILED: queue not drained:", status)
+        return False
+    print("OK - Replayed", created["id"], "| replayed entries:", status.get("replayed"))
+    return True
+
+
+def test_queued_writes_listed():
+    """Test that queued writes show in cached lists before they are replayed."""
+    print("\n--- Testing queued writes in cached lists (write queue on) ---")
+    previous = os.environ.get("TODOIST_WRITE_QUEUE")
+    os.environ["TODOIST_WRITE_QUEUE"] = "on"
+    try:
+        list_tasks_today(limit=200)
+        created = create_task(content="[Test] Queued listing verification - delete me", due_string="today")
+        if not created.get("queued"):
+            print("FAILED: expected a queued create:", created)
+            return False
+        # The worker may already have replayed it under its real id.
+        ids = {created["id"], journal.get_journal().real_id(created["id"])}
+        listed = [t["id"] for t in list_tasks_today(limit=200).get("tasks", [])]
+        if ids.isdisjoint(listed):
+            print("FAILED: queued task missing from list_tasks_today:", listed)
+            return False
+        complete_task(task_id=created["id"])
+        listed = [t["id"] for t in list_tasks_today(limit=200).get("tasks", [])]
+        journal.get_journal().replay_pending()
+    finally:
+        if previous is None:
+            os.environ.pop("TODOIST_WRITE_QUEUE", None)
+        else:
+            os.environ["TODOIST_WRITE_QUEUE"] = previous
+    if not ids.isdisjoint(listed):
+        print("FAILED: queued completion still listed:", listed)
+        return False
+    # A fresh process with no snapshot queues "today" before it knows the
+    # timezone; the task must still be listed once the list call has synced.
+    probe = (
+        "import json\n"
+        "from todoist_mcp import journal\n"
+        "from todoist_mcp.server import create_task, complete_task, list_tasks_today\n"
+        "r = create_task(content='[Test] Cold queued listing - delete me', due_string='today', dedupe='off')\n"
+        "listed = [t['id'] for t in list_tasks_today(limit=200).get('tasks', [])]\n"
+        "ids = {r['id'], journal.get_journal().real_id(r['id'])}\n"
+        "complete_task(task_id=r['id'])\n"
+        "journal.get_journal().replay_pending()\n"
+        "print(json.dumps({'queued': r.get('queued'), 'listed': not ids.isdisjoint(listed)}))\n"
+    )
+    env = {
+        **os.environ,
+        "TODOIST_WRITE_QUEUE": "on",
+        "TODOIST_CACHE_DIR": tempfile.mkdtemp(prefix="todoist-test-"),
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(_src), os.environ.get("PYTHONPATH")])),
+    }
+    cold = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True)
+    outcome = json.loads(cold.stdout.strip().splitlines()[-1]) if cold.returncode == 0 else None
+    if not outcome or not outcome["queued"] or not outcome["listed"]:
+        print("FAILED: fresh process did not list its queued 'today' task:", outcome or cold.stderr[-500:])
+        return False
+    print("OK - Queued create and completion of", created["id"], "were listed right away, also from a fresh process")
+    return True
+
+
+def test_result_cache():
+    """Test that equivalent queries agree and a write is visible right away."""
+    print("\n--- Testing result cache (today / due: today, then create + complete) ---")
+    first = list_tasks_today(limit=200)
+    alias = list_tasks_by_filter(filter_query="due: today", limit=200)
+    if not first.get("success") or [t["id"] for t in first["tasks"]] != [t["id"] for t in alias["tasks"]]:
+        print("FAILED: today and due: today differ:", first, alias)
+        return False
+    created = create_task(content="[Test] Result cache verification - delete me", due_string="today")
+    if not created.get("success"):
+        print("FAILED creating:", created.get("error"))
+        return False
+    listed = list_tasks_by_filter(filter_query="due today", limit=200)
+    if created["id"] not in [t["id"] for t in listed.get("tasks", [])]:
+        print("FAILED: new task missing from cached query:", listed)
+        return False
+    complete_task(task_id=created["id"])
+    listed = list_tasks_today(limit=200)
+    if created["id"] in [t["id"] for t in listed.get("tasks", [])]:
+        print("FAILED: completed task still listed:", listed)
+        return False
+    print("OK - Cached lists reflected create and complete of", created["id"])
+    return True
+
+
+def test_shared_cache():
+    """Test that a new process starts from the shared cache and sees another's writes."""
+    print("\n--- Testing shared cache (fresh replica, then a write elsewhere) ---")
+    current = replica.get_replica(refresh=True)
+    fresh = replica.Replica()  # What a newly spawned process starts with.
+    fresh.catch_up()
+    if set(fresh.tasks) != set(current.tasks) or not fresh.is_fresh():
+        print("FAILED: fresh replica did not load the shared state:", len(fresh.tasks), len(current.tasks))
+        return False
+    created = create_task(content="[Test] Shared cache verification - delete me")
+    if not created.get("success"):
+        print("FAILED creating:", created.get("error"))
+        return False
+    complete_task(task_id=created["id"])
+    fresh.catch_up()
+    if fresh.is_fresh():
+        print("FAILED: write in another replica did not invalidate this one")
+        return False
+    print("OK - Fresh replica loaded", len(fresh.tasks), "tasks and saw the write")
+    return True
+
+
+def test_agenda():
+    """Test that the precomputed agenda serves list_tasks_today and follows a write."""
+    print("\n--- Testing agenda (precompute, list from it, create) ---")
+    previous = os.environ.get("TODOIST_AGENDA_TIMES")
+    os.environ["TODOIST_AGENDA_TIMES"] = previous or "06:30"
+    try:
+        agenda.build(refresh=True)
+        result = get_agenda(limit=200)
+        today = list_tasks_today(limit=200)
+        if not result.get("success") or result["counts"]["today"] != today.get("total"):
+            print("FAILED: agenda and list_tasks_today differ:", result, today)
+            return False
+        if today.get("as_of") != result["as_of"]:
+            print("FAILED: list_tasks_today not served from the agenda:", today.get("as_of"), result["as_of"])
+            return False
+        if sum(result["by_project"].values()) != result["counts"]["this_week"]:
+            print("FAILED: by_project does not add up to this week:", result["by_project"])
+            return False
+        created = create_task(content="[Test] Agenda verification - delete me", due_string="today")
+        after = get_agenda(limit=200)
+        complete_task(task_id=created.get("id", ""))
+    finally:
+        if previous is None:
+            os.environ.pop("TODOIST_AGENDA_TIMES", None)
+        else:
+            os.environ["TODOIST_AGENDA_TIMES"] = previous
+    if created["id"] not in [t["id"] for t in after.get("today", [])]:
+        print("FAILED: new task missing from agenda:", after)
+        return False
+    print("OK - Agenda of", result["date"], "served list_tasks_today; counts:", after["counts"])
+    return True
+
+
+def test_coalescing():
+    """Test that concurrent identical list_projects calls all get the same answer."""
+    print("\n--- Testing coalescing (5 concurrent list_projects refreshes) ---")
+    from concurrent.futures import ThreadPoolExecutor
+
+    before = get_server_stats()["coalesced"].get("list_projects", 0)
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        answers = list(pool.map(lambda _: list_projects(refresh=True), range(5)))
+    if not all(a.get("success") for a in answers) or any(a != answers[0] for a in answers):
+        print("FAILED: concurrent answers differ or failed:", answers)
+        return False
+    coalesced = get_server_stats()["coalesced"].get("list_projects", 0) - before
+    print("OK - 5 identical answers |", coalesced, "calls shared another's request")
+    return True
+
+
+def test_export():
+    """Test a full export (last week of completions) followed by an incremental one."""
+    print("\n--- Testing export_tasks (full, then incremental) ---")
+    from datetime import date, timedelta
+
+    since = (date.today() - timedelta(days=7)).isoformat()
+    full = export_tasks(name="test-export.ndjson", since=since, restart=True)
+    if not full.get("success"):
+        print("FAILED:", full.get("error", full))
+        return False
+    with open(full["path"], encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+    if lines != sum(full["rows"].values()):
+        print("FAILED: file has", lines, "rows, export reported", full["rows"])
+        return False
+    incremental = export_tasks(name="test-export.ndjson", incremental=True)
+    if not incremental.get("success") or not incremental.get("incremental"):
+        print("FAILED: incremental export:", incremental)
+        return False
+    print("OK - Exported", full["rows"], "then", incremental["rows"], "to", full["path"])
+    return True
+
+
+def test_tenants():
+    """Test that an HTTP tenant is served with its own session and replica."""
+    print("\n--- Testing tenants (list_projects as a separate account) ---")
+    previous = os.environ.get("TODOIST_TENANT_TOKENS")
+    os.environ["TODOIST_TENANT_TOKENS"] = "on"
+    try:
+        tenant = tenants.resolve(f"Bearer {token}")
+        default = list_projects()
+        served = tenants.run_as(tenant, list_projects)
+    finally:
+        if previous is None:
+            os.environ.pop("TODOIST_TENANT_TOKENS", None)
+        else:
+            os.environ["TODOIST_TENANT_TOKENS"] = previous
+    if not served.get("success") or served.get("projects") != default.get("projects"):
+        print("FAILED: tenant saw different projects:", served.get("error"))
+        return False
+    if tenants.run_as(tenant, replica.get_metadata) is replica.get_metadata():
+        print("FAILED: tenant shares the default replica")
+        return False
+    print("OK - Tenant listed", len(served["projects"]), "projects from its own replica")
+    return True
+
+
+def test_webhook_fixtures():
+    """Test webhook handling: feed signed fixture events to the replica (no Todoist writes)."""
+    print("\n--- Testing webhook fixtures (item:added, item:deleted) ---")
+    fixtures = Path(__file__).parent / "benchmarks" / "fixtures" / "webhooks"
+    previous = os.environ.get("TODOIST_WEBHOOK_SECRET")
+    os.environ["TODOIST_WEBHOOK_SECRET"] = previous or "test-secret"
+
+    def deliver(name):
+        payload = json.loads((fixtures / f"{name}.json").read_text(encoding="utf-8"))
+        payload["user_id"] = replica.user_id()
+        body = json.dumps(payload).encode()
+        return webhooks.handle(body, webhooks.sign(body, os.environ["TODOIST_WEBHOOK_SECRET"]))
+
+    try:
+        list_tasks_today()  # make sure the replica has synced
+        status, _ = webhooks.handle(b"{}", "not-a-signature")
+        if status != 401:
+            print("FAILED: unsigned delivery accepted with status", status)
+            return False
+        for name in ("project_added", "item_added"):
+            status, result = deliver(name)
+            if status != 200 or not result.get("applied"):
+                print(f"FAILED: {name} not applied:", status, result)
+                return False
+        added = list_tasks_by_filter(filter_query="#Fixture Project")
+        if [t["id"] for t in added.get("tasks", [])] != ["fixture-task-1"]:
+            print("FAILED: pushed task not listed:", added)
+            return False
+        deliver("item_deleted")
+        deliver("project_archived")
+        remaining = list_tasks_by_filter(filter_query="#Fixture Project")
+    finally:
+        if previous is None:
+            os.environ.pop("TODOIST_WEBHOOK_SECRET", None)
+        else:
+            os.environ["TODOIST_WEBHOOK_SECRET"] = previous
+    if remaining.get("tasks"):
+        print("FAILED: deleted task still listed:", remaining)
+        return False
+    print("OK - Pushed task listed, then removed")
+    return True
+
+
 def main():
     print("Testing Todoist MCP skill...")
     results = []
@@ -212,6 +611,19 @@ def main():
     results.append(("create_task", test_create_task()))
     results.append(("create_task_with_params", test_create_task_with_params()))
     results.append(("create_reminder_task", test_create_reminder_task()))
+    results.append(("dedupe", test_dedupe()))
+    results.append(("due_phrases", test_due_phrases()))
+    results.append(("batch_tools", test_batch_tools()))
+    results.append(("bulk_update", test_bulk_update()))
+    results.append(("write_queue", test_write_queue()))
+    results.append(("queued_writes_listed", test_queued_writes_listed()))
+    results.append(("result_cache", test_result_cache()))
+    results.append(("shared_cache", test_shared_cache()))
+    results.append(("agenda", test_agenda()))
+    results.append(("coalescing", test_coalescing()))
+    results.append(("export", test_export()))
+    results.append(("webhook_fixtures", test_webhook_fixtures()))
+    results.append(("tenants", test_tenants()))
 
     print("\n" + "=" * 40)
     passed = sum(1 for _, ok in results if ok)